@@ -0,0 +1,122 @@
+"""Burst polling benchmark: detection lag and request count with and without precursor bursts.
+
+Runs the daemon loop in-process against the local fake API, once with bursts
+disabled (``BURST_INTERVAL=0``) and once enabled, over the same scenarios:
+``--events`` quiet events plus one event whose sale 3 changes ``state``
+(the precursor) ``--precursor-at`` seconds in and goes on resale a random
+one to two and a half base intervals later. Reports, per mode, the requests made, the lag from the
+flip to the first response showing it and to the first Telegram message.
+
+    python benchmarks/bench_burst.py [--interval 6] [--burst-interval 0.5] [--runs 3] [--seconds 30]
+"""
+import os
+import sys
+import json
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import contextlib
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_end_to_end import configure_environment, summarize  # noqa: E402
+from fake_services import EventScenario, FakeSMTP, FakeTelegram, FakeTixr, make_event_body  # noqa: E402
+
+def run_once(monitor, args, tixr, telegram, burst_interval, flip_after, first_event_id):
+    from burst import BurstPlanner
+    from watchlist import WatchEntry
+    tixr.events.clear()
+    entries = [WatchEntry(event_id=first_event_id + i, collections=['Festival Passes']) for i in range(args.events + 1)]
+    flip = entries[0]
+    tixr.events[flip.event_id] = EventScenario(
+        [make_event_body(flip.event_id), make_event_body(flip.event_id, states={3: 'ON_SALE'}),
+         make_event_body(flip.event_id, states={3: 'ON_SALE'}, available={3})],
+        switch_after=[args.precursor_at, args.precursor_at + flip_after],
+    )
+    for entry in entries[1:]:
+        tixr.events[entry.event_id] = EventScenario([make_event_body(entry.event_id)])
+    monitor._burst_planner = BurstPlanner(burst_interval, args.half_life, args.budget)
+
+    telegram_before = len(telegram.messages)
+    scheduler = monitor.DaemonScheduler(args.interval, 0.0, run_for=args.seconds, entries=entries)
+    scheduler.consume_updates = False
+    asyncio.run(scheduler.run())
+
+    scenario = tixr.events[flip.event_id]
+    flipped_at = scenario.switch_at[1]
+    seen_at = scenario.first_served(2)
+    messages = [at for at, _ in telegram.messages[telegram_before:]]
+    requests = sum(s.requests for s in tixr.events.values())
+    return {
+        'requests': requests,
+        'detect_lag': seen_at - flipped_at if seen_at is not None else None,
+        'notify_lag': min(messages) - flipped_at if messages else None,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=20, help="Quiet events polled alongside the flipping one")
+    parser.add_argument('--interval', type=float, default=6.0, help="Base polling interval in seconds")
+    parser.add_argument('--burst-interval', type=float, default=0.5)
+    parser.add_argument('--half-life', type=float, default=10.0)
+    parser.add_argument('--budget', type=float, default=0.8)
+    parser.add_argument('--rate', type=float, default=10.0, help="TIXR_RATE (bursts stay within this budget)")
+    parser.add_argument('--precursor-at', type=float, default=2.0)
+    parser.add_argument('--seconds', type=float, default=30.0, help="Daemon run time per scenario")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args(argv)
+    output = os.path.abspath(args.output) if args.output else None
+    rng = random.Random(args.seed)
+    flips = [rng.uniform(args.interval, 2.5 * args.interval) for _ in range(args.runs)]
+
+    tixr, telegram, smtp = FakeTixr().start(), FakeTelegram().start(), FakeSMTP().start()
+    cwd = os.getcwd()
+    modes = {}
+    with tempfile.TemporaryDirectory(prefix='tixr-burst-') as workdir:
+        configure_environment(tixr, telegram, smtp, workdir)
+        os.environ.update({'TIXR_RATE': str(args.rate), 'TIXR_BURST': str(max(1.0, args.rate))})
+        import monitor  # imported after the environment points at the fakes
+        logging.getLogger().setLevel(logging.WARNING)
+        store = monitor.get_subscriber_store()
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                store.add(1000000)
+                store.flush()
+                for mode, (name, burst_interval) in enumerate((('baseline', 0.0), ('burst', args.burst_interval))):
+                    print(f"running {name}...")
+                    # Fresh event ids per run, so the alert cooldown of an earlier run never applies
+                    runs = [run_once(monitor, args, tixr, telegram, burst_interval, flip,
+                                     100000 * (mode * args.runs + index + 1))
+                            for index, flip in enumerate(flips)]
+                    modes[name] = {
+                        'burst_interval': burst_interval,
+                        'requests_per_run': sum(run['requests'] for run in runs) / len(runs),
+                        'requests_per_second': sum(run['requests'] for run in runs) / (len(runs) * args.seconds),
+                        'flip_to_detect_seconds': summarize([run['detect_lag'] for run in runs
+                                                             if run['detect_lag'] is not None]),
+                        'flip_to_telegram_seconds': summarize([run['notify_lag'] for run in runs
+                                                               if run['notify_lag'] is not None]),
+                        'missed_flips': sum(run['detect_lag'] is None for run in runs),
+                    }
+        finally:
+            store.close()
+            os.chdir(cwd)
+            for server in (tixr, telegram, smtp):
+                server.stop()
+
+    text = json.dumps({'config': vars(args), 'flip_after_precursor_seconds': flips, 'modes': modes}, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,338 @@
+"""Offline end-to-end benchmark against local fake Tixr, Telegram and SMTP servers.
+
+Starts the stand-ins from ``fake_services.py``, points the monitor at them
+through ``TIXR_BASE_URL``/``TELEGRAM_API_BASE``/``SMTP_*`` and runs:
+
+- ``steady``: a watchlist of unchanged events, checked for several rounds (events/s)
+- ``slow``: the same with a delayed API, showing how well checks overlap
+- ``flip``: an event flipping to AVAILABLE via ``check_festival_passes_resale``;
+  detect-to-notify is measured from the flipped payload leaving the fake API
+  to the Telegram messages and email arriving (through the alert outbox)
+- ``forbidden``: a 403 storm, timing how long a check takes to give up
+- ``process_api_response`` and ``send_telegram_notification`` on their own
+
+Results (seconds, events/s and peak traced bytes) are written as JSON. With
+``--baseline`` a previous result file is compared and the run fails if any
+timing regressed by more than ``--tolerance``.
+
+    python benchmarks/bench_end_to_end.py [--output results.json] [--baseline old.json]
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_services import EventScenario, FakeSMTP, FakeTelegram, FakeTixr, make_event_body  # noqa: E402
+
+EVENT_ID_BASE = 900000
+
+def drain_outbox(monitor, timeout=60.0):
+    """Wait until the outbox workers have sent every due alert"""
+    outbox = monitor.get_outbox()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not any(n for (_, state), n in outbox.counts().items() if state in ('pending', 'inflight')):
+            return
+        time.sleep(0.005)
+
+def load_recorded_body(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def configure_environment(tixr, telegram, smtp, workdir):
+    """Point every external endpoint and state file at the fakes and a scratch dir"""
+    os.environ.update({
+        'TIXR_BASE_URL': tixr.base_url,
+        'TELEGRAM_API_BASE': telegram.base_url,
+        'TELEGRAM_BOT_TOKEN': 'bench-token',
+        'TELEGRAM_GLOBAL_RATE': '100000',
+        'TELEGRAM_PER_CHAT_INTERVAL': '0',
+        'SMTP_HOST': '127.0.0.1',
+        'SMTP_PORT': str(smtp.port),
+        'SMTP_STARTTLS': '0',
+        'SENDER_EMAIL': 'monitor@bench.invalid',
+        'RECIPIENT_EMAIL': 'alerts@bench.invalid',
+        'SUBSCRIBER_DB': os.path.join(workdir, 'subscribers.db'),
+        'STATE_DB': os.path.join(workdir, 'state.db'),
+        'OUTBOX_DB': os.path.join(workdir, 'outbox.db'),
+        'FETCH_STRATEGY_FILE': os.path.join(workdir, 'fetch_strategy.json'),
+        'COOKIE_JAR_FILE': os.path.join(workdir, 'cookies.json'),
+        'TIXR_RATE': '1000',
+        'TIXR_BURST': '1000',
+    })
+    os.environ.pop('METRICS_PORT', None)
+    os.chdir(workdir)  # keeps the repo's chat_ids.txt out of the scratch subscriber db
+
+def summarize(values):
+    from telegram_bot import percentile
+    if not values:
+        return {}
+    return {'p50': percentile(values, 50), 'p90': percentile(values, 90), 'max': max(values)}
+
+def traced(fn):
+    """Run ``fn`` under tracemalloc and return ``(result, peak_bytes)``"""
+    tracemalloc.start()
+    try:
+        result = fn()
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+class Bench:
+    def __init__(self, args, monitor, tixr, telegram, smtp):
+        self.args = args
+        self.monitor = monitor
+        self.tixr = tixr
+        self.telegram = telegram
+        self.smtp = smtp
+        self.next_event_id = EVENT_ID_BASE
+        self.recorded = load_recorded_body(args.payload) if args.payload else None
+
+    def add_event(self, available_after=None, forbidden=0, delay=0.0):
+        """Register a fake event; with ``available_after`` the payload flips after that many responses"""
+        from watchlist import WatchEntry
+        self.next_event_id += 1
+        event_id = self.next_event_id
+        quiet = self.recorded or make_event_body(event_id, self.args.sales)
+        bodies = [quiet]
+        if available_after is not None:
+            bodies = [quiet] * available_after + [make_event_body(event_id, self.args.sales, available={3})]
+        self.tixr.events[event_id] = EventScenario(bodies, forbidden=forbidden, delay=delay)
+        return WatchEntry(event_id=event_id, name=f'Bench {event_id}', collections=['Festival Passes'])
+
+    def reset_strategy(self):
+        """Forget learned transport stats so one scenario's blocks don't leak into the next"""
+        self.monitor._fetch_strategy = None
+        try:
+            os.remove(os.environ['FETCH_STRATEGY_FILE'])
+        except FileNotFoundError:
+            pass
+
+    def run_rounds(self, entries):
+        session = self.monitor.create_scraper_session()
+        self.monitor.prepare_session(session)
+        rounds = []
+        try:
+            for _ in range(self.args.rounds):
+                started = time.perf_counter()
+                self.monitor.check_watchlist(session, entries)
+                rounds.append(time.perf_counter() - started)
+        finally:
+            session.close()
+        return rounds
+
+    def scenario_steady(self):
+        self.reset_strategy()
+        entries = [self.add_event() for _ in range(self.args.events)]
+        rounds, peak = self.measure(lambda: self.run_rounds(entries))
+        return {
+            'events': len(entries),
+            'first_round_seconds': rounds[0],
+            'warm_round_seconds': min(rounds[1:] or rounds),
+            'events_per_second': len(entries) / min(rounds[1:] or rounds),
+            'peak_alloc_bytes': peak,
+        }
+
+    def scenario_slow(self):
+        self.reset_strategy()
+        entries = [self.add_event(delay=self.args.slow_delay) for _ in range(self.args.events)]
+        rounds, peak = self.measure(lambda: self.run_rounds(entries))
+        return {
+            'events': len(entries),
+            'response_delay_seconds_config': self.args.slow_delay,
+            'round_seconds': min(rounds),
+            'events_per_second': len(entries) / min(rounds),
+            'peak_alloc_bytes': peak,
+        }
+
+    def scenario_flip(self):
+        self.reset_strategy()
+        telegram_latency, email_latency, check_seconds = [], [], []
+        for _ in range(self.args.flip_runs):
+            entry = self.add_event(available_after=1)
+            scenario = self.tixr.events[entry.event_id]
+            telegram_start, smtp_start = len(self.telegram.messages), len(self.smtp.messages)
+            for _ in range(2):  # first check records the quiet state, the second sees the flip
+                started = time.perf_counter()
+                self.monitor.check_festival_passes_resale([entry])
+                check_seconds.append(time.perf_counter() - started)
+            drain_outbox(self.monitor)
+            flipped_at = scenario.first_served(1)
+            if flipped_at is None:
+                continue
+            telegram_latency.extend(at - flipped_at for at, _ in self.telegram.messages[telegram_start:])
+            email_latency.extend(at - flipped_at for at, _ in self.smtp.messages[smtp_start:])
+        return {
+            'runs': self.args.flip_runs,
+            'subscribers': self.args.subscribers,
+            'check_seconds': summarize(check_seconds),
+            'detect_to_telegram_seconds': summarize(telegram_latency),
+            'detect_to_email_seconds': summarize(email_latency),
+            'telegram_messages': len(telegram_latency),
+            'emails': len(email_latency),
+        }
+
+    def scenario_forbidden(self):
+        self.reset_strategy()
+        entry = self.add_event(forbidden=-1)
+        session = self.monitor.create_scraper_session()
+        self.monitor.prepare_session(session)
+        try:
+            started = time.perf_counter()
+            status, _ = self.monitor.check_once(session, entry)
+            elapsed = time.perf_counter() - started
+        finally:
+            session.close()
+        return {
+            'final_status': status,
+            'requests_made': self.tixr.events[entry.event_id].requests,
+            'give_up_seconds': elapsed,
+        }
+
+    def micro_process_api_response(self):
+        from watchlist import WatchEntry
+        self.next_event_id += 1
+        entry = WatchEntry(event_id=self.next_event_id, collections=['Festival Passes'])
+        data = json.loads(self.recorded or make_event_body(entry.event_id, self.args.sales))
+        self.monitor.process_api_response(data, entry)  # warm up and record the initial states
+        started = time.perf_counter()
+        for _ in range(self.args.repeat):
+            self.monitor.process_api_response(data, entry)
+        elapsed = (time.perf_counter() - started) / self.args.repeat
+        _, peak = traced(lambda: self.monitor.process_api_response(data, entry))
+        return {'sales': len(data.get('sales', [])), 'call_seconds': elapsed, 'peak_alloc_bytes': peak}
+
+    def micro_send_telegram_notification(self):
+        from telegram_bot import send_telegram_notification
+        started = time.perf_counter()
+        stats = send_telegram_notification('https://example.invalid/event', 'Bench', 'Bench Event')
+        elapsed = time.perf_counter() - started
+        _, peak = traced(lambda: send_telegram_notification('https://example.invalid/event', 'Bench', 'Bench Event'))
+        return {
+            'subscribers': self.args.subscribers,
+            'fanout_seconds': elapsed,
+            'messages_per_second': stats.get('sent', 0) / elapsed if elapsed else 0.0,
+            'delivery_seconds': {key: stats[key] for key in ('p50', 'p90', 'max') if key in stats},
+            'peak_alloc_bytes': peak,
+        }
+
+    def measure(self, fn):
+        if self.args.trace_memory:
+            return traced(fn)
+        return fn(), None
+
+SCENARIOS = {
+    'steady': Bench.scenario_steady,
+    'slow': Bench.scenario_slow,
+    'flip': Bench.scenario_flip,
+    'forbidden': Bench.scenario_forbidden,
+    'process_api_response': Bench.micro_process_api_response,
+    'send_telegram_notification': Bench.micro_send_telegram_notification,
+}
+
+def is_timing(key):
+    return key.endswith('_seconds') or key in ('p50', 'p90', 'max')
+
+def compare(baseline, current, tolerance, path=''):
+    """Return ``(name, old, new)`` for every timing in ``current`` slower than ``baseline`` by ``tolerance``"""
+    regressions = []
+    for key, new in current.items():
+        old = baseline.get(key) if isinstance(baseline, dict) else None
+        name = f'{path}.{key}' if path else key
+        if isinstance(new, dict):
+            regressions.extend(compare(old or {}, new, tolerance, name))
+        elif isinstance(new, (int, float)) and isinstance(old, (int, float)) and old > 0:
+            if (is_timing(key) or is_timing(path.rsplit('.', 1)[-1])) and new > old * tolerance:
+                regressions.append((name, old, new))
+            elif key.endswith('_per_second') and new < old / tolerance:
+                regressions.append((name, old, new))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="Comma-separated subset to run")
+    parser.add_argument('--events', type=int, default=50, help="Watchlist size for steady/slow")
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--sales', type=int, default=200, help="Sales per synthetic event payload")
+    parser.add_argument('--payload', default=None, help="Recorded event JSON to serve instead of synthetic payloads")
+    parser.add_argument('--subscribers', type=int, default=200)
+    parser.add_argument('--slow-delay', type=float, default=0.25)
+    parser.add_argument('--flip-runs', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Also trace peak memory of the end-to-end scenarios (slows their timings)")
+    parser.add_argument('--output', default=None, help="Write JSON results here instead of stdout")
+    parser.add_argument('--baseline', default=None, help="Previous results to compare against")
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help="Fail when a timing exceeds the baseline by this factor")
+    args = parser.parse_args(argv)
+    if args.payload:
+        args.payload = os.path.abspath(args.payload)
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    tixr, telegram, smtp = FakeTixr().start(), FakeTelegram().start(), FakeSMTP().start()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='tixr-bench-') as workdir:
+        configure_environment(tixr, telegram, smtp, workdir)
+        import monitor  # imported after the environment points at the fakes
+        logging.getLogger().setLevel(logging.WARNING)
+
+        store = monitor.get_subscriber_store()
+        for chat_id in range(args.subscribers):
+            store.add(1000000 + chat_id)
+        with contextlib.redirect_stdout(sys.stderr):
+            store.flush()
+
+        bench = Bench(args, monitor, tixr, telegram, smtp)
+        results = {
+            'python': platform.python_version(),
+            'started_at': time.time(),
+            'config': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+            'scenarios': {},
+        }
+        try:
+            # The Telegram module prints per message; keep stdout for the JSON results
+            with contextlib.redirect_stdout(sys.stderr):
+                for name in args.scenarios.split(','):
+                    print(f"running {name}...")
+                    results['scenarios'][name] = SCENARIOS[name](bench)
+            import http_client
+            results['http_connections'] = http_client.connection_stats()
+        finally:
+            monitor.close_outbox()
+            monitor.close_email_notifier()
+            monitor.close_browser_pool()
+            store.close()
+            os.chdir(cwd)
+            for server in (tixr, telegram, smtp):
+                server.stop()
+
+    text = json.dumps(results, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if baseline_path:
+        with open(baseline_path, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline.get('scenarios', {}), results['scenarios'], args.tolerance)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: {old:.4f} -> {new:.4f}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
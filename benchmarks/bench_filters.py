@@ -0,0 +1,132 @@
+"""Alert routing benchmark for per-subscriber filters.
+
+Fills a temporary subscriber database with ``--subscribers`` chats holding
+one to three random filters over ``--events`` events (event, collection,
+sale name, max price, min quantity; a share of chats keep no filter), then
+times ``SubscriberStore.subscribers_for`` for random detections against a
+linear scan of every filter, and checks both pick the same chats.
+
+    python benchmarks/bench_filters.py [--subscribers 20000] [--events 200] [--detections 500]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import contextlib
+import tempfile
+import statistics
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from subscriber_store import SubscriberStore  # noqa: E402
+
+COLLECTIONS = ('Festival Passes', 'VIP', 'Camping', 'Parking')
+SALE_NAMES = ('GA', 'GA+', 'VIP', 'Platinum', 'Shuttle')
+
+def random_filter(rng, events):
+    fields = {}
+    if rng.random() < 0.9:
+        fields['event_id'] = rng.choice(events)
+    if rng.random() < 0.5:
+        fields['collection'] = rng.choice(COLLECTIONS)
+    if rng.random() < 0.3:
+        fields['sale'] = rng.choice(SALE_NAMES)
+    if rng.random() < 0.6:
+        fields['max_price'] = float(rng.randrange(100, 1000, 25))
+    if rng.random() < 0.3:
+        fields['min_quantity'] = rng.randint(1, 4)
+    return fields
+
+def random_detection(rng, events):
+    sales = [{'id': rng.randint(1, 50), 'name': rng.choice(SALE_NAMES), 'price': float(rng.randrange(80, 1200)),
+              'quantity': rng.randint(1, 4)} for _ in range(rng.randint(1, 3))]
+    return rng.choice(events), [rng.choice(COLLECTIONS)], sales
+
+def linear_match(store, event_id, collections, sales):
+    """Reference result: every subscriber against every one of their filters"""
+    matched = set()
+    for chat_id in store.list_chat_ids():
+        filters = store.get_filters(chat_id)
+        if not filters:
+            matched.add(chat_id)
+            continue
+        for f in filters:
+            if f.event_id not in (None, event_id) or f.collection not in ('', *collections):
+                continue
+            if any(f.matches_sale(sale) for sale in sales):
+                matched.add(chat_id)
+                break
+    return matched
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subscribers', type=int, default=20000)
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--detections', type=int, default=500)
+    parser.add_argument('--unfiltered', type=float, default=0.05, help="Share of subscribers without filters")
+    parser.add_argument('--linear-checks', type=int, default=5, help="Detections also run through the linear scan")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    events = list(range(700000, 700000 + args.events))
+    with tempfile.TemporaryDirectory(prefix='tixr-filters-') as workdir:
+        store = SubscriberStore(os.path.join(workdir, 'subscribers.db'), legacy_file=None)
+        rows = []
+        for chat_id in range(1, args.subscribers + 1):
+            store.add(chat_id)
+            if rng.random() >= args.unfiltered:
+                rows.extend((str(chat_id), random_filter(rng, events)) for _ in range(rng.randint(1, 3)))
+        with contextlib.redirect_stdout(sys.stderr):
+            store.flush()
+        with store._conn:
+            store._conn.executemany(
+                'INSERT INTO subscriber_filters (chat_id, event_id, collection, sale, max_price, min_quantity)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                [(chat_id, f.get('event_id'), f.get('collection', ''), f.get('sale', ''), f.get('max_price'),
+                  f.get('min_quantity')) for chat_id, f in rows]
+            )
+
+        started = time.perf_counter()
+        store.subscribers_for(events[0], [COLLECTIONS[0]], [])
+        load_seconds = time.perf_counter() - started
+
+        detections = [random_detection(rng, events) for _ in range(args.detections)]
+        timings, matched = [], []
+        for event_id, collections, sales in detections:
+            started = time.perf_counter()
+            chat_ids = store.subscribers_for(event_id, collections, sales)
+            timings.append(time.perf_counter() - started)
+            matched.append(len(chat_ids))
+
+        linear_timings, mismatches = [], 0
+        for event_id, collections, sales in detections[:args.linear_checks]:
+            started = time.perf_counter()
+            expected = linear_match(store, event_id, collections, sales)
+            linear_timings.append(time.perf_counter() - started)
+            mismatches += expected != set(store.subscribers_for(event_id, collections, sales))
+        store.close()
+
+    results = {
+        'config': vars(args),
+        'filters': len(rows),
+        'index_load_seconds': load_seconds,
+        'match_seconds': {'p50': statistics.median(timings), 'max': max(timings)},
+        'matched_subscribers': {'p50': statistics.median(matched), 'max': max(matched)},
+        'linear_scan_seconds': statistics.median(linear_timings) if linear_timings else None,
+        'mismatches': mismatches,
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 1 if mismatches else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""HTML fallback benchmark: streamed single-pass scan vs the old three-pass soup.
+
+Runs ``html_scan.scan_event_page`` and the previous BeautifulSoup approach
+(``find_all`` on ``data-state``, a text-node search for "resale", then
+``select``) over each page fixture and reports the median time, peak
+allocations and verdict of both. Fixtures are built with
+``fake_services.make_event_page``: a page embedding the event state with no
+resale (its FAQ text mentions resale), one with an available sale in the
+embedded state, and one with a RESALE-marked element near the top. Add saved
+pages with ``--page file.html``; a JSON file of expected verdicts keyed by
+fixture name can be passed with ``--expect``. The soup side needs
+beautifulsoup4 (``pip install beautifulsoup4``), which is not in
+requirements.txt since the monitor no longer uses it; without it only the
+streamed scan is measured.
+
+    python benchmarks/bench_html_scan.py [--repeat 20] [--filler-kb 200] [--page saved.html ...]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import importlib.util
+import statistics
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_services import make_event_body, make_event_page  # noqa: E402
+from html_scan import SCAN_CHUNK_SIZE, scan_event_page  # noqa: E402
+
+def three_pass_soup(page):
+    """The fallback as it was: a full tree and up to three full passes; returns found"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(page, 'html.parser')
+    return bool(soup.find_all(attrs={'data-state': 'RESALE'}) or
+                soup.find_all(string=lambda x: x and 'resale' in x.lower()) or
+                soup.select('[state="RESALE"]'))
+
+def streamed_scan(page):
+    """The current fallback; returns found (an available sale in the embedded state or a RESALE marker)"""
+    scan = scan_event_page(page[i:i + SCAN_CHUNK_SIZE] for i in range(0, len(page), SCAN_CHUNK_SIZE))
+    if scan.payload is not None:
+        return any(sale.get('resaleState') == 'AVAILABLE' for sale in scan.payload.get('sales', []))
+    return bool(scan.markers)
+
+def measure(function, page, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        verdict = function(page)
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    function(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds_p50': statistics.median(timings), 'peak_alloc_bytes': peak, 'found': verdict}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--filler-kb', type=int, default=200, help="Markup before the embedded state in fixtures")
+    parser.add_argument('--page', action='append', default=[], help="Saved event page to add as a fixture")
+    parser.add_argument('--expect', default=None, help="JSON {fixture: found} to check verdicts against")
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args(argv)
+    with_soup = importlib.util.find_spec('bs4') is not None
+    if not with_soup:
+        print("beautifulsoup4 is not installed (pip install beautifulsoup4); skipping the three-pass soup comparison",
+              file=sys.stderr)
+
+    fixtures = {
+        'embedded_state_no_resale': (make_event_page(make_event_body(1), args.filler_kb), False),
+        'embedded_state_available': (make_event_page(make_event_body(1, available={3}), args.filler_kb), True),
+        'resale_marker': (make_event_page(make_event_body(1), args.filler_kb, markers=[3]), True),
+    }
+    for path in args.page:
+        with open(path, 'rb') as f:
+            fixtures[os.path.basename(path)] = (f.read(), None)
+    if args.expect:
+        with open(args.expect) as f:
+            for name, found in json.load(f).items():
+                if name in fixtures:
+                    fixtures[name] = (fixtures[name][0], found)
+
+    results, wrong = {}, []
+    for name, (page, expected) in fixtures.items():
+        result = {
+            'bytes': len(page),
+            'expected': expected,
+            'streamed_scan': measure(streamed_scan, page, args.repeat),
+        }
+        if with_soup:
+            result['three_pass_soup'] = measure(three_pass_soup, page, args.repeat)
+            result['speedup'] = result['three_pass_soup']['seconds_p50'] / result['streamed_scan']['seconds_p50']
+        if expected is not None and result['streamed_scan']['found'] != expected:
+            wrong.append(name)
+        results[name] = result
+
+    text = json.dumps({'config': vars(args), 'fixtures': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    for name in wrong:
+        print(f"FAIL streamed scan verdict wrong for {name}", file=sys.stderr)
+    return 1 if wrong else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
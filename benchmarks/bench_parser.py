@@ -0,0 +1,67 @@
+"""Micro-benchmark for the event payload parser.
+
+Builds synthetic Tixr event payloads with a growing number of sales and times
+``select_watched_sales`` on each. The time per sale should stay flat as the
+payload grows, showing the parser scales linearly.
+
+    python benchmarks/bench_parser.py [--sizes 1000,2000,5000,10000] [--repeat 20]
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monitor import select_watched_sales  # noqa: E402
+from watchlist import WatchEntry  # noqa: E402
+
+def make_payload(num_sales, num_collections=20, watched_fraction=0.5):
+    """Return a synthetic event payload with ``num_sales`` sales split over collections"""
+    sales = []
+    collections = [{'id': c, 'name': f'Collection {c}', 'sales': []} for c in range(num_collections)]
+    for sale_id in range(1, num_sales + 1):
+        sales.append({
+            'id': sale_id,
+            'name': f'Tier {sale_id}',
+            'state': 'SOLD_OUT',
+            'resaleState': 'AVAILABLE' if sale_id % 97 == 0 else 'UNAVAILABLE',
+            'description': 'x' * 64,
+        })
+        collections[sale_id % num_collections]['sales'].append({'id': sale_id})
+    watched = [c['name'] for c in collections[:max(1, int(num_collections * watched_fraction))]]
+    return {'collectionConfiguration': {'collections': collections}, 'sales': sales}, watched
+
+def bench(num_sales, repeat):
+    payload, watched = make_payload(num_sales)
+    entry = WatchEntry(event_id=1, collections=watched)
+    select_watched_sales(payload, entry)  # warm up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        select_watched_sales(payload, entry)
+    elapsed = (time.perf_counter() - started) / repeat
+    return elapsed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,2000,5000,10000')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--max-growth', type=float, default=3.0,
+                        help="Fail if the per-sale cost of the largest payload exceeds the smallest by this factor")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    print(f"{'sales':>8} {'ms/parse':>10} {'us/sale':>9}")
+    per_sale = []
+    for size in (int(s) for s in args.sizes.split(',')):
+        elapsed = bench(size, args.repeat)
+        per_sale.append(elapsed / size)
+        print(f"{size:>8} {elapsed * 1000:>10.2f} {elapsed / size * 1e6:>9.3f}")
+
+    growth = per_sale[-1] / per_sale[0]
+    print(f"per-sale cost growth: {growth:.2f}x (limit {args.max_growth:.1f}x)")
+    return 0 if growth <= args.max_growth else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
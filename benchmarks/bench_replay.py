@@ -0,0 +1,131 @@
+"""Replay a capture archive through the parser and alert pipeline, offline.
+
+Reads the responses recorded with ``monitor.py --capture DIR`` (see
+``capture.py``) and feeds them in recorded order to the code a live check
+runs: API bodies through ``process_payload`` (fetch cache, streaming decode,
+transition tracking, price history, the alert outbox) and event pages
+through ``scan_event_page``. Alerts go to the local fake Telegram and SMTP
+servers from ``fake_services.py``. The gaps between responses are divided by
+``--speed`` (0, the default, replays back to back for throughput). Results
+report responses per second, per-response processing time, alerts, messages
+and emails. With ``--expect-alerts N`` the run fails when a different number of
+alerts is raised, which turns a captured drop into a regression test.
+
+    python benchmarks/bench_replay.py --archive state/capture [--speed 60] [--event 123456] [--expect-alerts 1]
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import contextlib
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_end_to_end import configure_environment, drain_outbox, summarize  # noqa: E402
+from capture import CaptureArchive  # noqa: E402
+from fake_services import FakeSMTP, FakeTelegram, FakeTixr  # noqa: E402
+
+def replay(monitor, archive, records, speed):
+    """Feed ``records`` to the monitor; returns per-response processing times and status counts"""
+    from html_scan import scan_event_page
+    from watchlist import WatchEntry
+    entries, timings, statuses = {}, [], {}
+    first_at = started = None
+    for record in records:
+        if speed > 0:
+            if first_at is None:
+                first_at, started = record['t'], time.monotonic()
+            delay = started + (record['t'] - first_at) / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        key = (record['event_id'], tuple(record['collections']), tuple(record['sale_ids']))
+        entry = entries.get(key)
+        if entry is None:
+            entry = entries[key] = WatchEntry(event_id=record['event_id'], collections=record['collections'],
+                                              sale_ids=set(record['sale_ids']))
+        status = record['status']
+        name = f"{record['transport']}:{status}"
+        statuses[name] = statuses.get(name, 0) + 1
+        body = archive.body(record['body'])
+        began = time.perf_counter()
+        if record['transport'] == 'html':
+            if status == 200:
+                monitor.process_page_scan(scan_event_page([body], entry.sale_ids), entry, record['url'])
+        elif status in (200, 304):
+            monitor.process_payload(status, record['headers'], body, entry)
+        timings.append(time.perf_counter() - began)
+    return timings, statuses
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--archive', required=True, help="Capture directory written by monitor.py --capture")
+    parser.add_argument('--speed', type=float, default=0.0, help="Time compression factor (0 replays back to back)")
+    parser.add_argument('--event', type=int, action='append', default=[], help="Only replay these event ids")
+    parser.add_argument('--since', type=float, default=None, help="Unix time of the first response to replay")
+    parser.add_argument('--until', type=float, default=None, help="Unix time to stop before")
+    parser.add_argument('--subscribers', type=int, default=10)
+    parser.add_argument('--expect-alerts', type=int, default=None, help="Fail unless exactly this many alerts fire")
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args(argv)
+    archive = CaptureArchive(os.path.abspath(args.archive))
+    output = os.path.abspath(args.output) if args.output else None
+    records = list(archive.records(args.since, args.until, args.event))
+
+    tixr, telegram, smtp = FakeTixr().start(), FakeTelegram().start(), FakeSMTP().start()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='tixr-replay-') as workdir:
+        configure_environment(tixr, telegram, smtp, workdir)
+        os.environ.pop('CAPTURE_DIR', None)  # never re-capture the replay
+        import monitor  # imported after the environment points at the fakes
+        logging.getLogger().setLevel(logging.WARNING)
+        store = monitor.get_subscriber_store()
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                for chat_id in range(args.subscribers):
+                    store.add(1000000 + chat_id)
+                store.flush()
+                started = time.perf_counter()
+                timings, statuses = replay(monitor, archive, records, args.speed)
+                replay_seconds = time.perf_counter() - started
+                drain_outbox(monitor)
+                alerts = sum(n for (channel, _), n in monitor.get_outbox().counts().items() if channel == 'telegram')
+        finally:
+            monitor.close_outbox()
+            monitor.close_email_notifier()
+            monitor.close_price_history()
+            store.close()
+            os.chdir(cwd)
+            for server in (tixr, telegram, smtp):
+                server.stop()
+
+    results = {
+        'config': vars(args),
+        'responses': len(records),
+        'responses_by_status': statuses,
+        'distinct_bodies': len({record['body'] for record in records if record['body']}),
+        'replay_seconds': replay_seconds,
+        'responses_per_second': len(records) / replay_seconds if replay_seconds else 0.0,
+        'process_seconds': summarize(timings),
+        'fetch_cache': dict(monitor.fetch_cache.stats),
+        'alerts': alerts,
+        'telegram_messages': len(telegram.messages),
+        'emails': len(smtp.messages),
+    }
+    text = json.dumps(results, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.expect_alerts is not None and alerts != args.expect_alerts:
+        print(f"FAIL expected {args.expect_alerts} alert(s), got {alerts}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
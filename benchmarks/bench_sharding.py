@@ -0,0 +1,111 @@
+"""Scaling benchmark for the sharded poller (``monitor.py --workers N``).
+
+Serves ``--events`` slow events from the local fake Tixr API, runs the
+coordinator with 1, 2, 4... workers for ``--seconds`` each and reports the
+event checks per second, the peak request rate the fake API saw in any one
+second (bounded by ``TIXR_RATE``), and how many alerts one
+flipping event produced (at most one per run, however many workers saw it).
+
+    python benchmarks/bench_sharding.py [--workers 1,2,4] [--events 100] [--seconds 10]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+import tempfile
+import subprocess
+from collections import Counter
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_services import EventScenario, FakeSMTP, FakeTelegram, FakeTixr, make_event_body  # noqa: E402
+from bench_end_to_end import configure_environment  # noqa: E402
+
+FLIP_EVENT_ID = 800000
+
+def write_watchlist(path, num_events):
+    events = [{'event_id': FLIP_EVENT_ID, 'name': 'Flip', 'collections': ['Festival Passes']}]
+    events += [{'event_id': 800001 + i, 'name': f'Event {i}', 'collections': ['Festival Passes']} for i in range(num_events)]
+    with open(path, 'w') as f:
+        json.dump({'events': events}, f)
+
+def run(workers, args, tixr, telegram, workdir):
+    tixr.events.clear()
+    for i in range(args.events):
+        tixr.events[800001 + i] = EventScenario([make_event_body(800001 + i)], delay=args.delay)
+    tixr.events[FLIP_EVENT_ID] = EventScenario([make_event_body(FLIP_EVENT_ID),
+                                                make_event_body(FLIP_EVENT_ID, available={3})])
+    # Fresh state per run so the flip alerts once in each
+    for name in ('state.db', 'shards.db'):
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(os.path.join(workdir, name + suffix))
+            except FileNotFoundError:
+                pass
+    telegram_before = len(telegram.messages)
+    started = time.time()
+    subprocess.run(
+        [sys.executable, os.path.join(REPO_DIR, 'monitor.py'), '--workers', str(workers), '--watchlist', 'watchlist.json',
+         '--interval', '0', '--jitter', '0', '--run-for', str(args.seconds)],
+        env=dict(os.environ, SHARD_DB=os.path.join(workdir, 'shards.db')), capture_output=True, check=True, cwd=workdir
+    )
+    served = sorted(at for scenario in tixr.events.values() for at, _ in scenario.served)
+    per_second = Counter(int(at) for at in served)
+    span = served[-1] - served[0] if len(served) > 1 else 0.0
+    return {
+        'workers': workers,
+        'checks_per_second': len(served) / span if span else 0.0,
+        'peak_requests_in_one_second': max(per_second.values()) if per_second else 0,
+        'alerts_for_flip': len(telegram.messages) - telegram_before,
+        'wall_seconds': time.time() - started,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--events', type=int, default=100)
+    parser.add_argument('--delay', type=float, default=0.2, help="Fake API response delay in seconds")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--rate', type=float, default=100.0,
+                        help="TIXR_RATE shared by all workers (caps the combined requests per second)")
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args(argv)
+    output = os.path.abspath(args.output) if args.output else None
+
+    tixr, telegram, smtp = FakeTixr().start(), FakeTelegram().start(), FakeSMTP().start()
+    cwd = os.getcwd()
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix='tixr-shards-') as workdir:
+            configure_environment(tixr, telegram, smtp, workdir)
+            os.environ['TIXR_RATE'] = str(args.rate)
+            os.environ['PYTHONPATH'] = REPO_DIR
+            write_watchlist(os.path.join(workdir, 'watchlist.json'), args.events)
+            # One subscriber, so the alert count is the number of notifications
+            from subscriber_store import SubscriberStore
+            with contextlib.redirect_stdout(sys.stderr):
+                store = SubscriberStore(os.environ['SUBSCRIBER_DB'], legacy_file=None)
+                store.add(1)
+                store.close()
+            for workers in (int(w) for w in args.workers.split(',')):
+                print(f"running {workers} worker(s)...", file=sys.stderr)
+                results.append(run(workers, args, tixr, telegram, workdir))
+    finally:
+        os.chdir(cwd)
+        for server in (tixr, telegram, smtp):
+            server.stop()
+
+    text = json.dumps({'config': vars(args), 'runs': results}, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
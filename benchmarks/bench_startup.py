@@ -0,0 +1,138 @@
+"""Cold-start benchmark for the one-shot monitor.
+
+Measures, in fresh interpreters:
+
+- ``import monitor`` with ``python -X importtime`` (median over ``--runs``),
+  plus the modules with the largest self time
+- which heavyweight optional modules the import pulls in; any of
+  ``DEFERRED_MODULES`` being loaded at import time fails the run
+- wall time of a whole process doing one no-change check of an event served
+  by the local fake Tixr API (see ``fake_services.py``)
+
+Results are printed (or written with ``--output``) as JSON so they can be
+tracked between commits.
+
+    python benchmarks/bench_startup.py [--runs 5] [--max-import-ms 300] [--max-check-ms 1000]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_services import EventScenario, FakeSMTP, FakeTelegram, FakeTixr, make_event_body  # noqa: E402
+from bench_end_to_end import configure_environment  # noqa: E402
+
+# Modules a one-shot check must only import on the code paths that use them
+DEFERRED_MODULES = ('asyncio', 'argparse', 'cloudscraper', 'html_scan', 'playwright', 'smtplib', 'email.mime', 'ijson',
+                    'http.server')
+
+CHECK_SCRIPT = """
+import sys, time
+started = time.perf_counter()
+import monitor
+from watchlist import WatchEntry
+entry = WatchEntry(event_id=int(sys.argv[1]), collections=['Festival Passes'])
+monitor.check_watchlist(None, [entry])
+print(time.perf_counter() - started)
+"""
+
+def parse_importtime(stderr):
+    """``{module: (self_us, cumulative_us)}`` from ``-X importtime`` output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+def measure_import(runs):
+    totals, runs_modules = [], []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import monitor'],
+                                cwd=REPO_DIR, capture_output=True, text=True, check=True)
+        modules = parse_importtime(result.stderr)
+        totals.append(modules['monitor'][1])
+        runs_modules.append(modules)
+    median_run = runs_modules[totals.index(sorted(totals)[len(totals) // 2])]
+    heaviest = sorted(median_run.items(), key=lambda item: item[1][0], reverse=True)[:10]
+    return {
+        'import_ms': statistics.median(totals) / 1000,
+        'import_ms_min': min(totals) / 1000,
+        'heaviest_self_ms': {name: self_us / 1000 for name, (self_us, _) in heaviest},
+    }
+
+def loaded_deferred_modules():
+    code = ('import sys, json, monitor; '
+            f'print(json.dumps([m for m in {DEFERRED_MODULES!r} if any(k == m or k.startswith(m + ".") for k in sys.modules)]))')
+    result = subprocess.run([sys.executable, '-c', code], cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def measure_check(runs):
+    tixr, telegram, smtp = FakeTixr().start(), FakeTelegram().start(), FakeSMTP().start()
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory(prefix='tixr-startup-') as workdir:
+            configure_environment(tixr, telegram, smtp, workdir)
+            env = dict(os.environ, PYTHONPATH=REPO_DIR)
+            tixr.events[900001] = EventScenario([make_event_body(900001)])
+            wall, in_process = [], []
+            # The first run records the sale states; the rest are no-change checks
+            for run in range(runs + 1):
+                started = time.perf_counter()
+                result = subprocess.run([sys.executable, '-c', CHECK_SCRIPT, '900001'], env=env,
+                                        capture_output=True, text=True, check=True)
+                if run:
+                    wall.append(time.perf_counter() - started)
+                    in_process.append(float(result.stdout.strip().splitlines()[-1]))
+    finally:
+        os.chdir(cwd)
+        for server in (tixr, telegram, smtp):
+            server.stop()
+    return {
+        'no_change_check_ms': statistics.median(wall) * 1000,
+        'no_change_check_in_process_ms': statistics.median(in_process) * 1000,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-import-ms', type=float, default=None, help="Fail if the median import is slower")
+    parser.add_argument('--max-check-ms', type=float, default=None,
+                        help="Fail if the median no-change check process is slower")
+    parser.add_argument('--output', default=None, help="Write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = {'python': sys.version.split()[0]}
+    results.update(measure_import(args.runs))
+    results['deferred_modules_loaded'] = loaded_deferred_modules()
+    results.update(measure_check(args.runs))
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    failures = []
+    if results['deferred_modules_loaded']:
+        failures.append(f"imported at startup: {', '.join(results['deferred_modules_loaded'])}")
+    if args.max_import_ms and results['import_ms'] > args.max_import_ms:
+        failures.append(f"import {results['import_ms']:.0f}ms > {args.max_import_ms:.0f}ms")
+    if args.max_check_ms and results['no_change_check_ms'] > args.max_check_ms:
+        failures.append(f"no-change check {results['no_change_check_ms']:.0f}ms > {args.max_check_ms:.0f}ms")
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Benchmark the streaming payload extractor against a full ``json.loads``.
+
+Serializes a synthetic multi-tier event (with descriptions and media padding
+like the real API) and compares wall time and peak traced memory for decoding
+it fully versus extracting only the watched collections and sales.
+
+    python benchmarks/bench_stream_parse.py [--sales 10000] [--repeat 10]
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import payload_stream  # noqa: E402
+from monitor import select_watched_sales  # noqa: E402
+from watchlist import WatchEntry  # noqa: E402
+from bench_parser import make_payload  # noqa: E402
+
+def make_body(num_sales):
+    payload, watched = make_payload(num_sales)
+    # Pad with the kind of data the monitor never reads
+    payload = dict(payload)
+    payload['description'] = '<p>' + 'Lorem ipsum dolor sit amet. ' * 2000 + '</p>'
+    payload['media'] = [{'url': f'https://cdn.tixr.com/media/{i}.jpg', 'width': 1200, 'height': 800} for i in range(500)]
+    for sale in payload['sales']:
+        sale['media'] = [{'url': f"https://cdn.tixr.com/sale/{sale['id']}/{i}.jpg"} for i in range(3)]
+    # Watch a single collection, as a typical entry does
+    return json.dumps(payload).encode(), watched[:1]
+
+def measure(fn, repeat):
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - started) / repeat
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sales', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    body, watched = make_body(args.sales)
+    entry = WatchEntry(event_id=1, collections=watched)
+
+    def full():
+        return select_watched_sales(json.loads(body), entry)
+
+    def streamed():
+        return select_watched_sales(payload_stream.extract_event_payload(body, entry.collections, entry.sale_ids), entry)
+
+    assert sorted(s['id'] for s in full()) == sorted(s['id'] for s in streamed())
+
+    ijson = payload_stream.load_ijson()
+    print(f"payload: {len(body) / 1e6:.1f} MB, {args.sales} sales, ijson backend: "
+          f"{ijson.backend if ijson else 'not installed'}")
+    print(f"{'path':>10} {'ms':>9} {'peak MB':>9}")
+    for name, fn in (('json.loads', full), ('streamed', streamed)):
+        elapsed, peak = measure(fn, args.repeat)
+        print(f"{name:>10} {elapsed * 1000:>9.1f} {peak / 1e6:>9.1f}")
+
+if __name__ == '__main__':
+    main()
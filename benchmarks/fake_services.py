@@ -0,0 +1,240 @@
+"""Local stand-ins for the Tixr event API, the Telegram Bot API and an SMTP server.
+
+Each server runs on a background thread bound to 127.0.0.1 on a free port and
+records when it served or received something (``time.perf_counter()``), so a
+benchmark in the same process can measure end-to-end latency. Point the
+monitor at them with ``TIXR_BASE_URL``, ``TELEGRAM_API_BASE`` and
+``SMTP_HOST``/``SMTP_PORT``.
+"""
+import re
+import json
+import time
+import hashlib
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def make_event_body(event_id, num_sales=20, collection='Festival Passes', available=(), states=None):
+    """Serialized event payload with ``num_sales`` sales in ``collection``; ids in ``available`` are on resale and
+    ``states`` maps sale ids to a ``state`` other than SOLD_OUT"""
+    available = set(available)
+    states = states or {}
+    sales = [{
+        'id': sale_id,
+        'name': f'Tier {sale_id}',
+        'state': states.get(sale_id, 'SOLD_OUT'),
+        'resaleState': 'AVAILABLE' if sale_id in available else 'UNAVAILABLE',
+        'price': 100.0 + sale_id,
+        'resaleQuantity': 2 if sale_id in available else 0,
+        'description': 'x' * 64,
+    } for sale_id in range(1, num_sales + 1)]
+    payload = {
+        'id': event_id,
+        'collectionConfiguration': {'collections': [{'name': collection, 'sales': [{'id': s['id']} for s in sales]}]},
+        'sales': sales,
+    }
+    return json.dumps(payload).encode()
+
+FAQ_FILLER = ('<div class="faq"><h3>Can I buy resale tickets?</h3><p>Resale opens once the event sells out; '
+              'check back often.</p></div>')
+
+def make_event_page(body, filler_kb=200, markers=()):
+    """Event page HTML embedding ``body`` (an event payload) as a ``__NEXT_DATA__`` island after ``filler_kb`` KiB of
+    markup, whose FAQ text mentions resale; ``markers`` are sale ids rendered as ``data-state="RESALE"`` elements"""
+    head = b'<!DOCTYPE html><html><head><title>Event</title><script src="/static/app.js"></script></head><body>'
+    marker_html = ''.join(f'<button data-state="RESALE" data-sale-id="{sale_id}">Buy resale</button>' for sale_id in markers)
+    filler = (FAQ_FILLER + '<ul>' + '<li><a href="/events/1">Another event</a></li>' * 20 + '</ul>').encode()
+    state = b'{"props":{"pageProps":{"event":' + body + b'}},"page":"/events/[id]"}'
+    return b''.join([head, marker_html.encode(), filler * max(1, filler_kb * 1024 // len(filler)),
+                     b'<script id="__NEXT_DATA__" type="application/json">', state, b'</script></body></html>'])
+
+_scenario_lock = threading.Lock()
+
+class EventScenario:
+    """How the fake API answers for one event.
+
+    ``bodies`` are served in turn, the last one repeating (a recorded payload
+    or ``make_event_body`` output). With ``switch_after`` (seconds since the
+    scenario was created, one per body after the first) bodies change on a
+    clock instead of per request. The first ``forbidden`` requests get a
+    DataDome-style 403 (``forbidden=-1`` forbids every request) and every
+    response is delayed by ``delay`` seconds.
+    """
+
+    def __init__(self, bodies, forbidden=0, delay=0.0, switch_after=None):
+        self.bodies = list(bodies)
+        self.forbidden = forbidden
+        self.delay = delay
+        self.created = time.perf_counter()
+        self.switch_at = [self.created + after for after in switch_after] if switch_after is not None else None
+        self.requests = 0
+        self.served = []  # (perf_counter, body index) per 200/304 response
+
+    def respond(self):
+        with _scenario_lock:
+            self.requests += 1
+            if self.forbidden < 0 or self.requests <= self.forbidden:
+                return 403, None, None
+            if self.switch_at is not None:
+                now = time.perf_counter()
+                index = min(sum(1 for at in self.switch_at if at <= now), len(self.bodies) - 1)
+            else:
+                index = min(len(self.served), len(self.bodies) - 1)
+            self.served.append((time.perf_counter(), index))
+        return 200, self.bodies[index], index
+
+    def first_served(self, index):
+        """When body ``index`` was first served, or None"""
+        return next((at for at, served in self.served if served == index), None)
+
+class _Server:
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name=type(self).__name__, daemon=True)
+        self.thread.start()
+        return self
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class FakeTixr(_Server):
+    """``/api/events/<id>`` and ``/events/<id>`` backed by per-event ``EventScenario``s"""
+
+    def __init__(self):
+        self.events = {}
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                match = re.match(r'^/(api/)?events/(\d+)', self.path)
+                scenario = fake.events.get(int(match.group(2))) if match else None
+                if scenario is None:
+                    return self._reply(404, b'{}', 'application/json')
+                status, body, _ = scenario.respond()
+                if scenario.delay:
+                    time.sleep(scenario.delay)
+                if status == 403:
+                    return self._reply(403, b'{"url":"https://geo.captcha-delivery.com/captcha/"}', 'application/json')
+                if not match.group(1):
+                    return self._reply(200, make_event_page(body), 'text/html')
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    return self._reply(304, b'', 'application/json', etag)
+                self._reply(200, body, 'application/json', etag)
+
+            def _reply(self, status, body, content_type, etag=None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                if etag:
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.port}'
+
+class FakeTelegram(_Server):
+    """Accepts ``sendMessage`` for any token and answers ``getUpdates`` with no updates"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.messages = []  # (perf_counter, chat_id)
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                if fake.delay:
+                    time.sleep(fake.delay)
+                if self.path.endswith('/sendMessage'):
+                    chat_id = json.loads(raw or b'{}').get('chat_id')
+                    with fake._lock:
+                        fake.messages.append((time.perf_counter(), chat_id))
+                    body = b'{"ok":true,"result":{}}'
+                else:
+                    body = b'{"ok":true,"result":[]}'
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = _handle
+            do_POST = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.port}'
+
+class FakeSMTP(_Server):
+    """Minimal plain-text SMTP server that accepts every message"""
+
+    def __init__(self):
+        self.messages = []  # (perf_counter, recipients)
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                self._send('220 fake-smtp ready')
+                recipients = []
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode(errors='replace').strip()
+                    verb = command[:4].upper()
+                    if verb in ('EHLO', 'HELO'):
+                        self._send('250 fake-smtp')
+                    elif verb == 'MAIL':
+                        recipients = []
+                        self._send('250 OK')
+                    elif verb == 'RCPT':
+                        recipients.append(command.split(':', 1)[-1].strip(' <>'))
+                        self._send('250 OK')
+                    elif verb == 'DATA':
+                        self._send('354 End data with <CR><LF>.<CR><LF>')
+                        while self.rfile.readline() not in (b'.\r\n', b'.\n', b''):
+                            pass
+                        with fake._lock:
+                            fake.messages.append((time.perf_counter(), recipients))
+                        self._send('250 OK queued')
+                    elif verb == 'QUIT':
+                        self._send('221 Bye')
+                        return
+                    else:
+                        # NOOP, RSET and anything else
+                        self._send('250 OK')
+
+            def _send(self, line):
+                self.wfile.write(line.encode() + b'\r\n')
+
+        class Server(socketserver.ThreadingTCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        self.server = Server(('127.0.0.1', 0), Handler)
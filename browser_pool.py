@@ -0,0 +1,239 @@
+import os
+import json
+import time
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Markers that show a response is a DataDome interstitial rather than API data
+DATADOME_MARKERS = (b'captcha-delivery.com', b'geo.captcha-delivery', b'datadome')
+
+class PooledResponse:
+    """Plain copy of a Playwright API response, safe to use from any thread"""
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 300
+
+    def json(self):
+        return json.loads(self.body)
+
+def is_datadome_challenge(status, headers, body) -> bool:
+    """Return True when a response looks like a DataDome challenge page"""
+    if status not in (403, 429):
+        return False
+    if any(name.lower().startswith('x-datadome') or name.lower() == 'x-dd-b' for name in headers):
+        return True
+    head = body[:4096].lower() if body else b''
+    return any(marker in head for marker in DATADOME_MARKERS)
+
+class _Lane:
+    """One browser and its warm context, owned by a single worker thread"""
+
+    def __init__(self, index):
+        self.index = index
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'browser-pool-{index}')
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.uses = 0
+
+class BrowserPool:
+    """Warm Playwright browsers with pre-seeded contexts, fetching concurrently.
+
+    Launching a browser costs seconds, so ``size`` browsers are kept alive for
+    the life of the process, each with a context that already carries the Tixr
+    cookies and fixed headers. A context that receives a DataDome challenge,
+    or has served ``max_requests_per_context`` requests, is closed and
+    replaced with a freshly seeded one. When a response sets cookies the
+    context's jar is passed to ``on_cookies`` so refreshed DataDome/session
+    cookies can be shared with other transports.
+
+    Sync Playwright objects may only be used from the thread that created them,
+    so each browser (a "lane") lives on its own worker thread and is launched
+    on first use. ``fetch`` can be called from any thread and takes the next
+    idle lane, so up to ``size`` fetches run at once and a slow page only holds
+    up its own lane.
+    """
+
+    def __init__(self, cookies=None, headers=None, browser_name=None, size=2, max_requests_per_context=500,
+                 on_cookies=None):
+        self.cookies = cookies or []
+        self.on_cookies = on_cookies
+        self.headers = headers or {}
+        self.browser_name = (browser_name or os.getenv('PLAYWRIGHT_BROWSER', 'firefox')).lower()
+        self.size = max(1, size)
+        self.max_requests_per_context = max_requests_per_context
+        self._lock = threading.Lock()
+        self._lanes = [_Lane(index) for index in range(self.size)]
+        self._idle = queue.Queue()
+        for lane in self._lanes:
+            self._idle.put(lane)
+        self._closed = False
+        self.stats = {
+            'requests': 0,
+            'browser_launches': 0,
+            'contexts_created': 0,
+            'contexts_recycled': 0,
+            'challenges': 0,
+            'launch_seconds': 0.0,
+            'request_seconds': 0.0,
+        }
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                self.stats[name] += value
+
+    # --- Lane helpers (only ever run on the lane's own thread) ---
+
+    def _launch(self, lane):
+        from playwright.sync_api import sync_playwright
+
+        started = time.perf_counter()
+        if lane.playwright is None:
+            lane.playwright = sync_playwright().start()
+        launcher = {
+            'firefox': lane.playwright.firefox,
+            'chromium': lane.playwright.chromium,
+            'webkit': lane.playwright.webkit
+        }.get(self.browser_name, lane.playwright.firefox)
+        lane.browser = launcher.launch(headless=True)
+        lane.context = self._new_context(lane)
+        elapsed = time.perf_counter() - started
+        self._count(browser_launches=1)
+        with self._lock:
+            self.stats['launch_seconds'] = elapsed
+        logger.info(f"Browser pool launched {self.browser_name} #{lane.index} in {elapsed:.2f}s")
+
+    def _new_context(self, lane):
+        context = lane.browser.new_context()
+        if self.cookies:
+            context.add_cookies(self.cookies)
+        if self.headers:
+            context.set_extra_http_headers(self.headers)
+        lane.uses = 0
+        self._count(contexts_created=1)
+        return context
+
+    def _healthy(self, lane):
+        return lane.browser is not None and lane.browser.is_connected()
+
+    def _ensure(self, lane):
+        if not self._healthy(lane):
+            if lane.browser is not None:
+                logger.warning(f"Browser #{lane.index} disconnected; relaunching it")
+            self._launch(lane)
+
+    def _recycle(self, lane, reason):
+        logger.info(f"Recycling browser context #{lane.index} ({reason})")
+        try:
+            lane.context.close()
+        except Exception as e:
+            logger.debug(f"Context close failed: {e}")
+        self._count(contexts_recycled=1)
+        lane.context = self._new_context(lane)
+
+    def _fetch(self, lane, url, headers):
+        self._ensure(lane)
+        context = lane.context
+        started = time.perf_counter()
+        try:
+            r = context.request.get(url, headers=headers)
+            response = PooledResponse(r.status, dict(r.headers), r.body())
+        except Exception:
+            # A context that errors mid-request is not trusted again
+            self._recycle(lane, 'request error')
+            raise
+        elapsed = time.perf_counter() - started
+
+        if self.on_cookies is not None and 'set-cookie' in {name.lower() for name in response.headers}:
+            try:
+                self.on_cookies(context.cookies())
+            except Exception as e:
+                logger.debug(f"Cookie harvest failed: {e}")
+
+        self._count(requests=1, request_seconds=elapsed)
+        lane.uses += 1
+
+        if is_datadome_challenge(response.status, response.headers, response.body):
+            self._count(challenges=1)
+            self._recycle(lane, 'DataDome challenge')
+        elif lane.uses >= self.max_requests_per_context:
+            self._recycle(lane, f'{lane.uses} requests served')
+        return response
+
+    def _set_cookies(self, lane, cookies):
+        if lane.context is not None:
+            lane.context.add_cookies(cookies)
+
+    def _close(self, lane):
+        try:
+            if lane.context is not None:
+                lane.context.close()
+        except Exception:
+            pass
+        try:
+            if lane.browser is not None:
+                lane.browser.close()
+            if lane.playwright is not None:
+                lane.playwright.stop()
+        except Exception as e:
+            logger.debug(f"Browser pool teardown error: {e}")
+        lane.context = lane.browser = lane.playwright = None
+
+    # --- Public API (safe from any thread) ---
+
+    def fetch(self, url, headers=None) -> PooledResponse:
+        """GET ``url`` through the next idle warm, seeded browser, waiting for one if all are busy"""
+        lane = self._idle.get()
+        try:
+            return lane.executor.submit(self._fetch, lane, url, headers).result()
+        finally:
+            self._idle.put(lane)
+
+    def set_cookies(self, cookies) -> None:
+        """Replace the seed cookies and push them into every live context"""
+        self.cookies = cookies
+        # Queued behind a lane's running fetch, if any, on that lane's own thread
+        for future in [lane.executor.submit(self._set_cookies, lane, cookies) for lane in self._lanes]:
+            future.result()
+
+    def warm(self):
+        """Launch every browser ahead of the first request"""
+        for future in [lane.executor.submit(self._ensure, lane) for lane in self._lanes]:
+            future.result()
+
+    def report(self) -> str:
+        """Return a one-line summary of pool usage and latency saved"""
+        with self._lock:
+            stats = dict(self.stats)
+        requests_served = stats['requests']
+        avg_ms = (stats['request_seconds'] / requests_served * 1000) if requests_served else 0.0
+        warm_requests = max(0, requests_served - stats['browser_launches'])
+        saved = warm_requests * stats['launch_seconds']
+        return (
+            f"browsers={self.size} requests={requests_served} avg={avg_ms:.0f}ms launches={stats['browser_launches']} "
+            f"recycled={stats['contexts_recycled']} challenges={stats['challenges']} "
+            f"saved≈{stats['launch_seconds'] * 1000:.0f}ms/request ({saved:.1f}s total)"
+        )
+
+    def close(self):
+        """Close every context and browser, then stop the lane threads"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for lane in self._lanes:
+            try:
+                lane.executor.submit(self._close, lane).result()
+            finally:
+                lane.executor.shutdown(wait=True)
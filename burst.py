@@ -0,0 +1,99 @@
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Heat below this counts as back at the baseline
+MIN_HEAT = 0.01
+
+class BurstPlanner:
+    """Per-event polling intervals that tighten on precursor signals and decay back to the baseline.
+
+    ``signal`` sets an event's heat to 1 (a sale changing ``state`` or
+    ``resaleState``, or a new sale id, usually comes shortly before listings
+    appear); heat halves every ``half_life`` seconds. An event's interval goes
+    geometrically from ``burst_interval`` at full heat to the daemon's base
+    interval at none. ``intervals`` keeps the whole plan within ``budget`` of
+    the allowed request rate: baseline polling is served first and bursting
+    events are slowed by a common factor until their extra requests fit in
+    what is left, so bursts never push past what the rate limiter allows.
+    """
+
+    def __init__(self, burst_interval: float = 2.0, half_life: float = 60.0, budget: float = 0.8):
+        self.burst_interval = burst_interval
+        self.half_life = half_life
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._signals = {}  # event_id -> monotonic time of the last signal
+        self.stats = {'signals': 0, 'bursts': 0}
+
+    @classmethod
+    def from_env(cls):
+        """Build from BURST_INTERVAL (0 disables bursts), BURST_HALF_LIFE and BURST_BUDGET"""
+        return cls(
+            burst_interval=float(os.getenv('BURST_INTERVAL', '2')),
+            half_life=float(os.getenv('BURST_HALF_LIFE', '60')),
+            budget=float(os.getenv('BURST_BUDGET', '0.8')),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.burst_interval > 0 and self.half_life > 0
+
+    def signal(self, event_id, reasons, now: float = None) -> None:
+        """Put ``event_id`` into burst mode because of ``reasons`` (short descriptions for the log)"""
+        if not self.enabled or not reasons:
+            return
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            started = self.heat(event_id, now) < MIN_HEAT
+            self._signals[event_id] = now
+            self.stats['signals'] += 1
+            if started:
+                self.stats['bursts'] += 1
+        if started:
+            logger.info(f"Burst polling event {event_id}: {'; '.join(reasons[:3])}"
+                        + (f" (+{len(reasons) - 3} more)" if len(reasons) > 3 else ""))
+
+    def heat(self, event_id, now: float = None) -> float:
+        signalled = self._signals.get(event_id)
+        if signalled is None:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        return 0.5 ** (max(0.0, now - signalled) / self.half_life)
+
+    def bursting(self, now: float = None):
+        """Event ids still above the baseline"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            expired = [event_id for event_id in self._signals if self.heat(event_id, now) < MIN_HEAT]
+            for event_id in expired:
+                del self._signals[event_id]
+            return list(self._signals)
+
+    def intervals(self, event_ids, base_interval: float, rate: float, now: float = None):
+        """Seconds until the next check of each of ``event_ids`` given ``rate`` allowed requests/second"""
+        plan = {event_id: base_interval for event_id in event_ids}
+        if not self.enabled or base_interval <= self.burst_interval:
+            return plan
+        now = time.monotonic() if now is None else now
+        hot = {event_id: heat for event_id, heat in ((e, self.heat(e, now)) for e in self.bursting(now)) if event_id in plan}
+        if not hot:
+            return plan
+        ratio = base_interval / self.burst_interval
+        for event_id, heat in hot.items():
+            plan[event_id] = self.burst_interval * ratio ** (1.0 - heat)
+        # Requests/second the bursts add on top of baseline polling, against what the budget leaves
+        extra = sum(1.0 / plan[event_id] - 1.0 / base_interval for event_id in hot)
+        spare = max(0.0, rate * self.budget - len(plan) / base_interval)
+        if extra > spare:
+            scale = spare / extra
+            for event_id in hot:
+                plan[event_id] = 1.0 / (1.0 / base_interval + scale * (1.0 / plan[event_id] - 1.0 / base_interval))
+        return plan
+
+    def report(self) -> str:
+        hot = self.bursting()
+        return f"bursting={len(hot)} bursts={self.stats['bursts']} signals={self.stats['signals']}"
@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Response headers worth keeping for replay (cache validators, throttling, body type)
+CAPTURED_HEADERS = ('content-type', 'etag', 'last-modified', 'retry-after', 'content-encoding')
+
+class CaptureArchive:
+    """Compressed, content-deduplicated archive of raw Tixr responses (capture mode).
+
+    Every response appends one JSON line to a daily index file
+    (``index-YYYYMMDD.jsonl``): wall time, event, the entry's collections and
+    sale ids, transport, URL, status, a few headers and the digest of the
+    body. Bodies are zlib-compressed and stored once per digest under
+    ``blobs/``, so the identical payload an unchanged event returns on every
+    poll costs a single index line. Index lines are written with one
+    ``O_APPEND`` write and blobs through a temporary file, so several threads
+    and processes can share a directory.
+    """
+
+    def __init__(self, path: str, level: int = 6):
+        self.path = path
+        self.level = level
+        self._known = set()
+        self._lock = threading.Lock()
+        self.stats = {'records': 0, 'blobs': 0, 'bytes_in': 0, 'bytes_stored': 0}
+        os.makedirs(os.path.join(path, 'blobs'), exist_ok=True)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.path, 'blobs', digest[:2], f'{digest}.z')
+
+    def _store(self, body: bytes) -> str:
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        with self._lock:
+            if digest in self._known:
+                return digest
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data = zlib.compress(body, self.level)
+            temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temporary, 'wb') as f:
+                f.write(data)
+            os.replace(temporary, path)
+            with self._lock:
+                self.stats['blobs'] += 1
+                self.stats['bytes_stored'] += len(data)
+        with self._lock:
+            self._known.add(digest)
+        return digest
+
+    def record(self, entry, transport: str, url: str, status, headers=None, body: bytes = b'', truncated: bool = False,
+               now: float = None) -> dict:
+        """Archive one response for ``entry``; ``truncated`` marks a body that was not read to the end"""
+        now = time.time() if now is None else now
+        headers = {name.lower(): value for name, value in (headers or {}).items()}
+        record = {
+            't': now,
+            'event_id': entry.event_id,
+            'collections': list(entry.collections),
+            'sale_ids': sorted(entry.sale_ids),
+            'transport': transport,
+            'url': url,
+            'status': status,
+            'headers': {name: headers.get(name) for name in CAPTURED_HEADERS if headers.get(name) is not None},
+            'body': self._store(body) if body else None,
+            'size': len(body or b''),
+        }
+        if truncated:
+            record['truncated'] = True
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode()
+        index = os.path.join(self.path, time.strftime('index-%Y%m%d.jsonl', time.gmtime(now)))
+        fd = os.open(index, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+        with self._lock:
+            self.stats['records'] += 1
+            self.stats['bytes_in'] += record['size']
+        return record
+
+    def records(self, since: float = None, until: float = None, event_ids=None):
+        """Archived responses in time order, optionally limited to a time range and events"""
+        event_ids = set(event_ids) if event_ids else None
+        names = sorted(name for name in os.listdir(self.path) if name.startswith('index-') and name.endswith('.jsonl'))
+        for name in names:
+            batch = []
+            with open(os.path.join(self.path, name), 'rb') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        logger.warning(f"Skipping a damaged line in {name}")
+                        continue
+                    if since is not None and record['t'] < since or until is not None and record['t'] >= until:
+                        continue
+                    if event_ids is not None and record['event_id'] not in event_ids:
+                        continue
+                    batch.append(record)
+            # Lines from concurrent writers can be slightly out of order
+            batch.sort(key=lambda record: record['t'])
+            yield from batch
+
+    def body(self, digest) -> bytes:
+        """The raw body stored under ``digest`` (empty for responses without one)"""
+        if not digest:
+            return b''
+        with open(self._blob_path(digest), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    def report(self) -> str:
+        with self._lock:
+            stats = dict(self.stats)
+        ratio = stats['bytes_in'] / stats['bytes_stored'] if stats['bytes_stored'] else 0.0
+        return (f"records={stats['records']} new_bodies={stats['blobs']} "
+                f"bytes_in={stats['bytes_in']} bytes_stored={stats['bytes_stored']} ({ratio:.0f}x)")
@@ -0,0 +1,139 @@
+import os
+import time
+import smtplib
+import logging
+import threading
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+import metrics
+
+logger = logging.getLogger(__name__)
+
+class EmailNotifier:
+    """SMTP sender that keeps one authenticated connection alive.
+
+    ``send`` delivers a message and reports which recipients were reached; it
+    is called from the outbox's email worker, so a slow mail server never
+    delays ticket checks. The connection is reused between messages, probed
+    with NOOP after it has been idle, and re-established on failure.
+    Recipients are sent as Bcc in batches of ``batch_size`` per SMTP
+    transaction.
+    """
+
+    def __init__(self, host='smtp.gmail.com', port=587, username=None, password=None, sender=None,
+                 starttls=True, batch_size=50, idle_check=30.0, max_retries=3):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender or username
+        self.starttls = starttls
+        self.batch_size = batch_size
+        self.idle_check = idle_check
+        self.max_retries = max_retries
+        self._smtp = None
+        self._last_used = 0.0
+        self._send_lock = threading.Lock()
+        self.stats = {'sent': 0, 'failed': 0, 'connects': 0}
+
+    @classmethod
+    def from_env(cls):
+        """Build a notifier from SENDER_EMAIL/SENDER_PASSWORD and SMTP_* settings, or None"""
+        sender_email = os.getenv('SENDER_EMAIL')
+        sender_password = os.getenv('SENDER_PASSWORD')
+        if not sender_email:
+            return None
+        return cls(
+            host=os.getenv('SMTP_HOST', 'smtp.gmail.com'),
+            port=int(os.getenv('SMTP_PORT', '587')),
+            username=sender_email if sender_password else None,
+            password=sender_password,
+            sender=sender_email,
+            starttls=os.getenv('SMTP_STARTTLS', '1') != '0',
+        )
+
+    # --- Connection handling (under _send_lock) ---
+
+    def _connect(self):
+        self._disconnect()
+        smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.starttls:
+            smtp.starttls()
+        if self.username and self.password:
+            smtp.login(self.username, self.password)
+        self._smtp = smtp
+        self.stats['connects'] += 1
+        logger.info(f"SMTP connected to {self.host}:{self.port}")
+
+    def _disconnect(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+    def _connection(self):
+        if self._smtp is not None and time.monotonic() - self._last_used > self.idle_check:
+            try:
+                if self._smtp.noop()[0] != 250:
+                    self._disconnect()
+            except (smtplib.SMTPException, OSError):
+                self._disconnect()
+        if self._smtp is None:
+            self._connect()
+        return self._smtp
+
+    def _deliver(self, subject, body, recipients, detected_at=None):
+        with self._send_lock:
+            return self._deliver_batches(subject, body, recipients, detected_at)
+
+    def _deliver_batches(self, subject, body, recipients, detected_at):
+        delivered = []
+        for start in range(0, len(recipients), self.batch_size):
+            batch = recipients[start:start + self.batch_size]
+            message = MIMEMultipart()
+            message["From"] = self.sender
+            message["To"] = batch[0] if len(batch) == 1 else self.sender
+            message["Subject"] = subject
+            message.attach(MIMEText(body, "plain"))
+
+            for attempt in range(self.max_retries):
+                try:
+                    with metrics.SMTP_SEND_SECONDS.time():
+                        self._connection().sendmail(self.sender, batch, message.as_string())
+                    self._last_used = time.monotonic()
+                    self.stats['sent'] += len(batch)
+                    delivered.extend(batch)
+                    metrics.SMTP_SENDS.inc(len(batch), result='sent')
+                    if detected_at is not None:
+                        metrics.DETECT_TO_NOTIFY_SECONDS.observe(self._last_used - detected_at, channel='email')
+                    logger.info(f"Notification email sent to {len(batch)} recipient(s)")
+                    break
+                except (smtplib.SMTPException, OSError) as e:
+                    logger.warning(f"SMTP send failed (attempt {attempt + 1}): {e}")
+                    self._disconnect()
+                    time.sleep(min(2 ** attempt, 10))
+            else:
+                self.stats['failed'] += len(batch)
+                metrics.SMTP_SENDS.inc(len(batch), result='failed')
+                logger.error(f"Failed to send email to {len(batch)} recipient(s)")
+        return delivered
+
+    # --- Public API ---
+
+    def send(self, subject, body, recipients, detected_at=None):
+        """Deliver a message now; returns the recipients it reached.
+
+        ``detected_at`` is the ``time.monotonic()`` of the detection, used to
+        record detect-to-notify latency.
+        """
+        recipients = [r for r in dict.fromkeys(recipients) if r]
+        if not recipients:
+            return []
+        return self._deliver(subject, body, recipients, detected_at)
+
+    def close(self) -> None:
+        """Close the SMTP connection"""
+        with self._send_lock:
+            self._disconnect()
@@ -0,0 +1,70 @@
+import hashlib
+import threading
+
+class ConditionalCache:
+    """Remembers validators and body hashes per watch entry to skip unchanged payloads.
+
+    When the server returns ``ETag``/``Last-Modified`` they are replayed as
+    ``If-None-Match``/``If-Modified-Since`` so an unchanged event costs a 304
+    with no body. When it does not, the raw body is hashed and an identical
+    hash means JSON decoding and evaluation can be skipped entirely.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.stats = {
+            'conditional_requests': 0,
+            'not_modified': 0,
+            'hash_hits': 0,
+            'misses': 0,
+        }
+
+    def request_headers(self, key) -> dict:
+        """Return conditional request headers for ``key`` (empty if none are known)"""
+        with self._lock:
+            cached = self._entries.get(key)
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        if headers:
+            with self._lock:
+                self.stats['conditional_requests'] += 1
+        return headers
+
+    def is_unchanged(self, key, status, headers, body) -> bool:
+        """Record a response and return True when its payload matches the last one seen.
+
+        A 304 is always unchanged. For a 200 the validators are stored and the
+        body hash is compared against the previous response for ``key``.
+        """
+        if status == 304:
+            with self._lock:
+                self.stats['not_modified'] += 1
+            return True
+
+        lowered = {name.lower(): value for name, value in (headers or {}).items()}
+        digest = hashlib.blake2b(body or b'', digest_size=16).digest()
+        with self._lock:
+            previous = self._entries.get(key)
+            self._entries[key] = {
+                'etag': lowered.get('etag'),
+                'last_modified': lowered.get('last-modified'),
+                'digest': digest,
+            }
+            if previous is not None and previous['digest'] == digest:
+                self.stats['hash_hits'] += 1
+                return True
+            self.stats['misses'] += 1
+            return False
+
+    def forget(self, key) -> None:
+        """Drop cached validators so the next fetch for ``key`` is unconditional"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def report(self) -> str:
+        return ' '.join(f"{name}={value}" for name, value in self.stats.items())
@@ -0,0 +1,104 @@
+import os
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Prior latency (seconds) per transport, cheapest first; learned values replace these
+DEFAULT_TRANSPORTS = {
+    'requests': 0.3,
+    'cloudscraper': 0.6,
+    'playwright': 1.5,
+    'html': 3.0,
+}
+
+class FetchStrategy:
+    """Learns which transport to try first from observed success rate and latency.
+
+    Each transport keeps an exponentially weighted success rate and latency;
+    transports are tried in order of expected cost (latency / success rate).
+    A transport that is blocked (403, 429 or a challenge page) is parked for a
+    back-off period that doubles on each consecutive block, so the engine
+    escalates to heavier transports and later re-probes the cheaper ones.
+    Stats are saved to JSON so the learned order survives restarts.
+    """
+
+    def __init__(self, path: str = None, transports: dict = None, alpha: float = 0.3,
+                 base_block_seconds: float = 60.0, max_block_seconds: float = 3600.0):
+        self.path = path or os.getenv('FETCH_STRATEGY_FILE', os.path.join('state', 'fetch_strategy.json'))
+        self.alpha = alpha
+        self.base_block_seconds = base_block_seconds
+        self.max_block_seconds = max_block_seconds
+        self._lock = threading.Lock()
+        self.stats = {
+            name: {'success': 1.0, 'latency': latency, 'blocks': 0, 'blocked_until': 0.0, 'attempts': 0}
+            for name, latency in (transports or DEFAULT_TRANSPORTS).items()
+        }
+        self.unavailable = set()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                saved = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        for name, values in saved.items():
+            if name in self.stats:
+                self.stats[name].update({k: v for k, v in values.items() if k in self.stats[name]})
+        logger.info(f"Loaded fetch strategy stats; order: {self.order()}")
+
+    def save(self):
+        with self._lock:
+            snapshot = json.dumps(self.stats, indent=2)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"  # sharded workers save concurrently
+        with open(tmp_path, 'w') as f:
+            f.write(snapshot)
+        os.replace(tmp_path, self.path)
+
+    def expected_cost(self, name) -> float:
+        stats = self.stats[name]
+        return stats['latency'] / max(stats['success'], 0.05)
+
+    def order(self, now: float = None):
+        """Transports to try, cheapest working first; parked transports come last"""
+        now = time.time() if now is None else now
+        with self._lock:
+            names = [name for name in self.stats if name not in self.unavailable]
+            return sorted(names, key=lambda name: (self.stats[name]['blocked_until'] > now, self.expected_cost(name)))
+
+    def mark_unavailable(self, name) -> None:
+        """Skip a transport for the rest of this process (e.g. its package is not installed)"""
+        with self._lock:
+            if name not in self.unavailable:
+                logger.info(f"Transport {name} unavailable; skipping it")
+                self.unavailable.add(name)
+
+    def record(self, name, ok: bool, latency: float, blocked: bool = False, now: float = None) -> None:
+        """Fold one attempt into the transport's stats"""
+        now = time.time() if now is None else now
+        with self._lock:
+            stats = self.stats[name]
+            stats['attempts'] += 1
+            stats['success'] += self.alpha * ((1.0 if ok else 0.0) - stats['success'])
+            if ok:
+                stats['latency'] += self.alpha * (latency - stats['latency'])
+                stats['blocks'] = 0
+                stats['blocked_until'] = 0.0
+            elif blocked:
+                stats['blocks'] += 1
+                park = min(self.base_block_seconds * 2 ** (stats['blocks'] - 1), self.max_block_seconds)
+                stats['blocked_until'] = now + park
+                logger.warning(f"Transport {name} blocked; parking it for {park:.0f}s")
+
+    def report(self) -> str:
+        with self._lock:
+            return ' '.join(
+                f"{name}(ok={stats['success']:.2f} lat={stats['latency']:.2f}s)"
+                for name, stats in self.stats.items()
+            )
@@ -0,0 +1,190 @@
+import bisect
+import shlex
+from typing import NamedTuple, Optional
+
+class SubscriberFilter(NamedTuple):
+    """One alert filter of a subscriber; unset fields match anything"""
+    id: int
+    chat_id: str
+    event_id: Optional[int] = None
+    collection: str = ''
+    sale: str = ''
+    max_price: Optional[float] = None
+    min_quantity: Optional[int] = None
+
+    def matches_sale(self, sale) -> bool:
+        """Whether ``sale`` (a dict with ``id``, ``name``, ``price``, ``quantity``) passes the sale, price and
+        quantity conditions; unknown prices and quantities pass so no alert is lost"""
+        if self.sale:
+            if self.sale.isdigit():
+                if str(sale.get('id')) != self.sale:
+                    return False
+            elif self.sale.lower() not in (sale.get('name') or '').lower():
+                return False
+        price = sale.get('price')
+        if self.max_price is not None and price is not None and price > self.max_price:
+            return False
+        quantity = sale.get('quantity')
+        if self.min_quantity is not None and quantity is not None and quantity < self.min_quantity:
+            return False
+        return True
+
+    def describe(self) -> str:
+        parts = []
+        if self.event_id is not None:
+            parts.append(f"event {self.event_id}")
+        if self.collection:
+            parts.append(f"'{self.collection}'")
+        if self.sale:
+            parts.append(f"sale {self.sale}")
+        if self.max_price is not None:
+            parts.append(f"under ${self.max_price:,.2f}")
+        if self.min_quantity is not None:
+            parts.append(f"{self.min_quantity}+ tickets")
+        return ', '.join(parts) or 'everything'
+
+FILTER_KEYS = {'event': 'event_id', 'collection': 'collection', 'sale': 'sale', 'max': 'max_price',
+               'price': 'max_price', 'qty': 'min_quantity', 'quantity': 'min_quantity'}
+
+def parse_filter(text: str) -> dict:
+    """Filter fields from ``key=value`` words, e.g. ``event=123 collection="Festival Passes" max=300 qty=2``.
+
+    Raises ``ValueError`` with a user-facing message on unknown keys or bad values.
+    """
+    try:
+        words = shlex.split(text)
+    except ValueError:
+        raise ValueError("Unbalanced quotes")
+    fields = {}
+    for word in words:
+        key, sep, value = word.partition('=')
+        field = FILTER_KEYS.get(key.lower())
+        if not sep or field is None or not value:
+            raise ValueError(f"Unknown filter '{word}'; use event=, collection=, sale=, max= or qty=")
+        try:
+            if field == 'event_id':
+                fields[field] = int(value)
+            elif field == 'max_price':
+                fields[field] = float(value.lstrip('$').replace(',', ''))
+            elif field == 'min_quantity':
+                fields[field] = int(value)
+            else:
+                fields[field] = value
+        except ValueError:
+            raise ValueError(f"'{value}' is not a valid {key}")
+    if not fields:
+        raise ValueError("Give at least one of event=, collection=, sale=, max= or qty=")
+    return fields
+
+class _Bucket:
+    """Filters of one (event, collection) key, the priced ones sorted by ``max_price``"""
+
+    def __init__(self):
+        self.unpriced = []
+        self.prices = []
+        self.priced = []
+
+    def add(self, f: SubscriberFilter) -> None:
+        if f.max_price is None:
+            self.unpriced.append(f)
+        else:
+            index = bisect.bisect_right(self.prices, f.max_price)
+            self.prices.insert(index, f.max_price)
+            self.priced.insert(index, f)
+
+    def remove(self, f: SubscriberFilter) -> None:
+        if f.max_price is None:
+            self.unpriced.remove(f)
+        else:
+            index = bisect.bisect_left(self.prices, f.max_price)
+            index += self.priced[index:].index(f)
+            del self.prices[index]
+            del self.priced[index]
+
+    def candidates(self, price):
+        """Filters whose price limit admits ``price`` (all of them when the price is unknown)"""
+        yield from self.unpriced
+        start = 0 if price is None else bisect.bisect_left(self.prices, price)
+        yield from self.priced[start:]
+
+    def __len__(self):
+        return len(self.unpriced) + len(self.priced)
+
+class FilterIndex:
+    """In-memory index of subscriber filters for alert routing.
+
+    Filters are bucketed by ``(event_id, collection)`` with ``None``/``''`` as
+    wildcards, so a detection only looks up the buckets of its event and
+    collections plus their wildcards. Within a bucket the filters with a price limit are sorted by
+    it and only those at or above a sale's price are checked, leaving the
+    sale-name and quantity conditions to a short candidate list. Subscribers
+    without any filter get every alert.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.filters = {}
+        self.by_chat = {}
+        self.subscribers = set()
+        self.unfiltered = set()
+
+    def add_subscriber(self, chat_id) -> None:
+        self.subscribers.add(chat_id)
+        if chat_id not in self.by_chat:
+            self.unfiltered.add(chat_id)
+
+    def remove_subscriber(self, chat_id) -> None:
+        for filter_id in list(self.by_chat.get(chat_id, ())):
+            self.remove_filter(filter_id)
+        self.subscribers.discard(chat_id)
+        self.unfiltered.discard(chat_id)
+
+    def add_filter(self, f: SubscriberFilter) -> None:
+        self.filters[f.id] = f
+        self.buckets.setdefault((f.event_id, f.collection), _Bucket()).add(f)
+        self.by_chat.setdefault(f.chat_id, set()).add(f.id)
+        self.unfiltered.discard(f.chat_id)
+
+    def remove_filter(self, filter_id) -> None:
+        f = self.filters.pop(filter_id, None)
+        if f is None:
+            return
+        key = (f.event_id, f.collection)
+        bucket = self.buckets[key]
+        bucket.remove(f)
+        if not bucket:
+            del self.buckets[key]
+        own = self.by_chat[f.chat_id]
+        own.discard(f.id)
+        if not own:
+            del self.by_chat[f.chat_id]
+            if f.chat_id in self.subscribers:
+                self.unfiltered.add(f.chat_id)
+
+    def filters_of(self, chat_id):
+        return sorted((self.filters[filter_id] for filter_id in self.by_chat.get(chat_id, ())), key=lambda f: f.id)
+
+    def match(self, event_id=None, collections=(), sales=()):
+        """Set of chat ids to alert about ``sales`` (summary dicts) of ``event_id`` in ``collections``.
+
+        With no ``sales`` (e.g. an HTML fallback hit) sale, price and quantity
+        conditions cannot be checked and are treated as met.
+        """
+        if event_id is None:
+            return set(self.subscribers)
+        matched = set(self.unfiltered)
+        event_id = int(event_id)
+        buckets = [self.buckets.get((event, collection)) for event in (event_id, None)
+                   for collection in ('', *(collections or ()))]
+        buckets = [bucket for bucket in buckets if bucket]
+        if not buckets:
+            return matched
+        for bucket in buckets:
+            if not sales:
+                matched.update(f.chat_id for f in bucket.candidates(None) if f.chat_id in self.subscribers)
+                continue
+            for sale in sales:
+                for f in bucket.candidates(sale.get('price')):
+                    if f.chat_id not in matched and f.chat_id in self.subscribers and f.matches_sale(sale):
+                        matched.add(f.chat_id)
+        return matched
@@ -0,0 +1,134 @@
+import os
+import re
+import json
+import codecs
+import logging
+from typing import List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# One compiled pass finds both decisive node kinds: <script> openings and RESALE-marked tags
+DECISIVE_TAG = re.compile(
+    r'<script\b(?P<script>[^>]*)>'
+    r'|<[a-zA-Z][^>]*?\b(?:data-state|state)\s*=\s*["\']RESALE["\'][^>]*>',
+    re.IGNORECASE
+)
+SCRIPT_END = re.compile(r'</script\s*>', re.IGNORECASE)
+SCRIPT_TYPE = re.compile(r'\btype\s*=\s*["\']?([^"\'\s>]+)', re.IGNORECASE)
+SCRIPT_SRC = re.compile(r'\bsrc\s*=', re.IGNORECASE)
+SALE_ID_ATTRIBUTE = re.compile(r'\b(?:data-sale-id|data-id)\s*=\s*["\']?(\d+)', re.IGNORECASE)
+# Scripts holding JSON state: data islands and `window.__STATE__ = {...}` assignments
+STATE_ASSIGNMENT = re.compile(r'^\s*(?:window\.|var\s+|const\s+|let\s+)?__[A-Z0-9_]+__\s*=\s*', re.ASCII)
+JSON_SCRIPT_TYPES = frozenset(('application/json', 'application/ld+json'))
+MAX_TAG_LENGTH = 4096
+MAX_SEARCH_DEPTH = 8
+SCAN_CHUNK_SIZE = 16384
+SCAN_MAX_BYTES = int(os.getenv('HTML_SCAN_MAX_BYTES', str(4 * 1024 * 1024)))
+
+class PageScan(NamedTuple):
+    """Result of ``scan_event_page``.
+
+    ``payload`` is the event object (with ``sales`` and, when present,
+    ``collectionConfiguration``) found in an embedded state blob, ready for
+    ``process_api_response``. ``markers`` holds the sale id (None when the
+    element carries none) of the element marked ``RESALE`` that ended the
+    scan. ``bytes_read`` shows
+    how much of the page was consumed before the scan stopped.
+    """
+    payload: Optional[dict]
+    markers: List[Optional[int]]
+    bytes_read: int
+    truncated: bool
+
+def find_event_payload(blob):
+    """The first object in ``blob`` holding a ``sales`` list of sale dicts, searched breadth-first"""
+    level = [blob]
+    depth = 0
+    while level and depth <= MAX_SEARCH_DEPTH:
+        next_level = []
+        for node in level:
+            if isinstance(node, dict):
+                sales = node.get('sales')
+                if isinstance(sales, list) and sales and isinstance(sales[0], dict) and 'id' in sales[0]:
+                    return node
+                next_level.extend(value for value in node.values() if isinstance(value, (dict, list)))
+            elif isinstance(node, list):
+                next_level.extend(value for value in node if isinstance(value, (dict, list)))
+        level = next_level
+        depth += 1
+    return None
+
+def _decode_script(text):
+    match = STATE_ASSIGNMENT.match(text)
+    start = match.end() if match else 0
+    try:
+        value, _ = json.JSONDecoder().raw_decode(text, start)
+    except ValueError:
+        return None
+    return value
+
+def _state_script(attributes) -> bool:
+    """Whether a <script> with these attributes can hold inline JSON state"""
+    match = SCRIPT_TYPE.search(attributes)
+    script_type = match.group(1).lower() if match else ''
+    if script_type in JSON_SCRIPT_TYPES:
+        return True
+    return (not script_type or 'javascript' in script_type) and not SCRIPT_SRC.search(attributes)
+
+def scan_event_page(chunks, sale_ids=(), max_bytes: int = None) -> PageScan:
+    """Scan an event page incrementally for its embedded event state or RESALE markers.
+
+    ``chunks`` is an iterable of bytes (e.g. ``response.iter_content()``),
+    decoded incrementally and searched with one precompiled pattern; only a
+    partial tag or an unfinished state script is carried between chunks.
+    Scanning stops at the first decisive node: an inline script holding the
+    event's sales, or an element marked ``data-state="RESALE"``/
+    ``state="RESALE"`` for one of ``sale_ids`` (any sale when empty). At most
+    ``max_bytes`` (``HTML_SCAN_MAX_BYTES``, default 4 MiB) are read. Free
+    text mentioning "resale" is deliberately not a signal.
+    """
+    max_bytes = max_bytes or SCAN_MAX_BYTES
+    sale_ids = set(sale_ids or ())
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    buffer = ''
+    pos = 0
+    pending = None  # 'state' or 'skip' while a script's end tag has not arrived yet
+    read = 0
+    for chunk in chunks:
+        read += len(chunk)
+        buffer += decoder.decode(chunk)
+        while True:
+            if pending is not None:
+                end = SCRIPT_END.search(buffer, pos)
+                if end is None:
+                    # A state script's body is kept (it starts the buffer); a skipped one is dropped
+                    if pending == 'skip':
+                        buffer = buffer[-16:]
+                    pos = max(0, len(buffer) - 16)
+                    break
+                if pending == 'state' and '"sales"' in buffer[:end.start()]:
+                    blob = _decode_script(buffer[:end.start()])
+                    payload = find_event_payload(blob) if blob is not None else None
+                    if payload is not None:
+                        return PageScan(payload, [], read, False)
+                pending, pos = None, end.end()
+                continue
+            match = DECISIVE_TAG.search(buffer, pos)
+            if match is None:
+                # Keep only a tag that may be cut off at the chunk boundary
+                cut = buffer.rfind('<', max(pos, len(buffer) - MAX_TAG_LENGTH))
+                buffer, pos = (buffer[cut:] if cut >= 0 else ''), 0
+                break
+            if match.group('script') is not None:
+                pending = 'state' if _state_script(match.group('script')) else 'skip'
+                buffer, pos = buffer[match.end():], 0
+                continue
+            pos = match.end()
+            sale_id = SALE_ID_ATTRIBUTE.search(match.group(0))
+            sale_id = int(sale_id.group(1)) if sale_id else None
+            if not sale_ids or sale_id is None or sale_id in sale_ids:
+                return PageScan(None, [sale_id], read, False)
+        if read >= max_bytes:
+            logger.warning(f"Event page scan stopped after {read} bytes without a decisive node")
+            return PageScan(None, [], read, True)
+    return PageScan(None, [], read, False)
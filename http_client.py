@@ -0,0 +1,110 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING as _URLLIB3_ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+import metrics
+
+# Connect failures are retried here; HTTP status handling (403/429 back-off, Telegram retry_after) stays with callers
+CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '20'))
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+CONNECT_RETRIES = int(os.getenv('HTTP_CONNECT_RETRIES', '2'))
+
+# Only advertise encodings urllib3 can decode here (``br`` needs the brotli package)
+ACCEPT_ENCODING = ', '.join(_URLLIB3_ACCEPT_ENCODING.split(','))
+
+def connect_retry_policy(retries: int = None) -> Retry:
+    """Retry refused/timed-out connects with a short back-off; never resend a request that reached the server"""
+    retries = CONNECT_RETRIES if retries is None else retries
+    return Retry(total=retries, connect=retries, read=0, status=0, other=0, redirect=5, backoff_factor=0.2,
+                 raise_on_status=False)
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter with keep-alive pools of ``pool_maxsize`` per host and a default ``(connect, read)`` timeout"""
+
+    def __init__(self, pool_maxsize: int = 10, timeout=DEFAULT_TIMEOUT, max_retries: Retry = None, hosts: int = 4):
+        self.timeout = timeout
+        super().__init__(pool_connections=hosts, pool_maxsize=pool_maxsize,
+                         max_retries=max_retries or connect_retry_policy())
+
+    def send(self, request, timeout=None, **kwargs):
+        return super().send(request, timeout=self.timeout if timeout is None else timeout, **kwargs)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def new_session(name: str, pool_maxsize: int = 10, timeout=DEFAULT_TIMEOUT, retries: int = None,
+                session: requests.Session = None) -> requests.Session:
+    """A pooled session registered under ``name`` for reuse stats.
+
+    ``pool_maxsize`` keep-alive connections are kept per host (size it to the
+    threads sharing the session); requests without an explicit ``timeout``
+    get ``timeout``, and failed connects are retried ``retries`` times.
+    """
+    session = session or requests.Session()
+    adapter = PooledAdapter(pool_maxsize, timeout, connect_retry_policy(retries))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+    return register(name, session)
+
+def register(name: str, session: requests.Session) -> requests.Session:
+    """Track a session built elsewhere (e.g. cloudscraper's, whose TLS adapter must stay) in the reuse stats"""
+    with _clients_lock:
+        _clients[name] = session
+    return session
+
+def unregister(name: str) -> None:
+    with _clients_lock:
+        _clients.pop(name, None)
+
+def _adapters(session):
+    seen = set()
+    for adapter in session.adapters.values():
+        if id(adapter) not in seen and isinstance(adapter, HTTPAdapter):
+            seen.add(id(adapter))
+            yield adapter
+
+def connection_stats():
+    """``{client: {host: {'requests': n, 'connections': n}}}`` for the open pools of every registered session.
+
+    ``requests - connections`` requests went over a reused keep-alive connection.
+    """
+    stats = {}
+    with _clients_lock:
+        clients = list(_clients.items())
+    for name, session in clients:
+        hosts = stats.setdefault(name, {})
+        for adapter in _adapters(session):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host = hosts.setdefault(f"{pool.scheme}://{pool.host}:{pool.port}", {'requests': 0, 'connections': 0})
+                host['requests'] += pool.num_requests
+                host['connections'] += pool.num_connections
+    return stats
+
+def _gauge_values():
+    values = {}
+    for name, hosts in connection_stats().items():
+        for stat in ('requests', 'connections'):
+            values[(name, stat)] = sum(host[stat] for host in hosts.values())
+    return values
+
+metrics.GaugeFunc('http_client', 'Requests and new connections per pooled HTTP client', _gauge_values,
+                  ['client', 'stat'])
+
+def report() -> str:
+    parts = []
+    for name, hosts in sorted(connection_stats().items()):
+        made = sum(host['requests'] for host in hosts.values())
+        opened = sum(host['connections'] for host in hosts.values())
+        reused = (made - opened) / made if made else 0.0
+        parts.append(f"{name}: {made} requests over {opened} connections ({reused:.0%} reused)")
+    return '; '.join(parts) or 'no HTTP clients'
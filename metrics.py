@@ -0,0 +1,189 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    """Monotonic counter, optionally split by labels"""
+    kind = 'counter'
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._series.get(self._key(labels), 0.0)
+
+    def render(self):
+        with self._lock:
+            series = dict(self._series)
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in sorted(series.items())
+        ]
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram of observed values (seconds by convention)"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][index] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the ``with`` block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        with self._lock:
+            series = {key: {'counts': list(v['counts']), 'sum': v['sum'], 'count': v['count']}
+                      for key, v in self._series.items()}
+        lines = self.header()
+        for key, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values['counts']):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', '+Inf')])} {values['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {values['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {values['count']}")
+        return lines
+
+class GaugeFunc(_Metric):
+    """Gauge whose labelled values are read from a callback at scrape time"""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, callback, labelnames=(), registry=None):
+        self.callback = callback
+        super().__init__(name, documentation, labelnames, registry)
+
+    def render(self):
+        lines = self.header()
+        try:
+            values = self.callback() or {}
+        except Exception as e:
+            logger.debug(f"Gauge {self.name} callback failed: {e}")
+            values = {}
+        for key, value in sorted(values.items()):
+            key = key if isinstance(key, tuple) else (key,)
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = []
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        """Prometheus text exposition of every registered metric"""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+# Hot-path metrics shared by the monitor, Telegram and email modules
+FETCH_SECONDS = Histogram('tixr_fetch_seconds', 'Event API fetch time by transport', ['transport'])
+FETCH_RESPONSES = Counter('tixr_fetch_responses_total', 'Event API responses by transport and status', ['transport', 'status'])
+FETCH_BLOCKED = Counter('tixr_fetch_blocked_total', 'Fetches blocked with 403/429 or a challenge', ['transport'])
+DECODE_SECONDS = Histogram('tixr_decode_seconds', 'Payload JSON decode time')
+PAYLOAD_UNCHANGED = Counter('tixr_payload_unchanged_total', 'Payloads skipped as unchanged', ['reason'])
+EVALUATE_SECONDS = Histogram('tixr_evaluate_seconds', 'Watch entry evaluation time')
+TICK_SECONDS = Histogram('monitor_tick_seconds', 'Full watchlist cycle time')
+DETECTIONS = Counter('tixr_detections_total', 'Resale availability alerts raised', ['event'])
+TELEGRAM_FANOUT_SECONDS = Histogram('telegram_fanout_seconds', 'Time to deliver one alert to every Telegram subscriber')
+TELEGRAM_SENDS = Counter('telegram_messages_total', 'Telegram sendMessage results', ['result'])
+SMTP_SEND_SECONDS = Histogram('smtp_send_seconds', 'SMTP transaction time per recipient batch')
+SMTP_SENDS = Counter('smtp_messages_total', 'Email recipient deliveries', ['result'])
+DETECT_TO_NOTIFY_SECONDS = Histogram('detect_to_notify_seconds', 'Time from detection to delivery', ['channel'])
+
+_server = None
+
+def start_metrics_server(port: int, host: str = '127.0.0.1'):
+    """Serve ``/metrics`` in Prometheus text format on a background thread"""
+    global _server
+    if _server is not None:
+        return _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = REGISTRY.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    _server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=_server.serve_forever, name='metrics-server', daemon=True).start()
+    logger.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+    return _server
+
+def stop_metrics_server():
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
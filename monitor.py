@@ -1,17 +1,21 @@
 import requests
+import signal
+import socket
 import urllib.parse
-try:
-    import cloudscraper  # Optional
-except ImportError:  # pragma: no cover
-    cloudscraper = None
+import importlib.util
 import time
 import random
 import os
-import smtplib
 import logging
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from telegram_bot import check_telegram_registrations, send_telegram_notification
+import threading
+from telegram_bot import check_telegram_registrations, get_subscriber_store, send_telegram_notification, start_update_consumer
+from watchlist import DEFAULT_WATCH_ENTRY, TIXR_BASE_URL, WatchEntry, load_watchlist, run_watchlist
+from fetch_cache import ConditionalCache
+from payload_stream import extract_event_payload
+from session_manager import parse_cookie_header
+from rate_limiter import AdaptiveRateLimiter, parse_retry_after
+import http_client
+import metrics
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -31,9 +35,9 @@ def get_random_headers(user_agent: str = None):
         'User-Agent': user_agent or random.choice(user_agents),
         'Accept': 'application/json, text/plain, */*',
         'Accept-Language': 'en-US,en;q=0.9',
-        'Accept-Encoding': 'gzip, deflate, br',
+        'Accept-Encoding': http_client.ACCEPT_ENCODING,
         'DNT': '1',
-        'Origin': 'https://www.tixr.com',
+        'Origin': TIXR_BASE_URL,
         'Connection': 'keep-alive',
         'Sec-Fetch-Dest': 'empty',
         'Sec-Fetch-Mode': 'cors',
@@ -42,6 +46,10 @@ def get_random_headers(user_agent: str = None):
 
 def create_scraper_session():
     """Create a Cloudflare-capable session to reduce 403 responses"""
+    try:
+        import cloudscraper  # Optional; only loaded once a check escalates past plain requests
+    except ImportError:  # pragma: no cover
+        cloudscraper = None
     if cloudscraper is not None:
         scraper = cloudscraper.create_scraper(
             browser={
@@ -53,14 +61,14 @@ def create_scraper_session():
         logger.info("Using cloudscraper session")
         return scraper
     logger.info("cloudscraper not available; falling back to requests Session")
-    return requests.Session()
+    return http_client.new_session('tixr-scraper', pool_maxsize=int(os.getenv('WATCHLIST_CONCURRENCY', '4')))
 
-# Event-specific constants and helpers
-EVENT_PATH = "/groups/100x/events/valley-of-the-seven-stars-135703"
-EVENT_QUERY = "col=&a=L&filter=55:NA|56:NA&sort=RECOMMENDED"
-EVENT_PAGE_URL = f"https://www.tixr.com{EVENT_PATH}?{EVENT_QUERY}"
+# Event-specific constants and helpers for the default watchlist entry
+EVENT_PATH = DEFAULT_WATCH_ENTRY.event_path
+EVENT_QUERY = DEFAULT_WATCH_ENTRY.event_query
+EVENT_PAGE_URL = DEFAULT_WATCH_ENTRY.page_url
 FESTIVAL_SITE_REFERER = "https://www.sevenstarsfest.com/"
-EVENT_API_URL = "https://www.tixr.com/api/events/135703"
+EVENT_API_URL = DEFAULT_WATCH_ENTRY.api_url
 
 # Hardcoded Tixr cookie header (provided by user). Used for browser/API calls directly.
 HARDCODED_TIXR_COOKIE = (
@@ -73,357 +81,769 @@ HARDCODED_TIXR_COOKIE = (
 def build_requirements_url():
     url_param = urllib.parse.quote(EVENT_PATH, safe="")
     qp_param = urllib.parse.quote("?" + EVENT_QUERY, safe="")
-    return f"https://www.tixr.com/api/page/requirements?url={url_param}&queryParams={qp_param}"
+    return f"{TIXR_BASE_URL}/api/page/requirements?url={url_param}&queryParams={qp_param}"
+
+# Guards the first call of every lazy getter below: watchlist checks run on
+# worker threads, and two racing first calls would build (and leak) two
+# stores, browsers or SMTP connections. Re-entrant because getters nest.
+_singletons_lock = threading.RLock()
+
+_cookie_jar = None
+
+def get_cookie_jar(seed_header: str = None):
+    """Return the shared cookie jar, seeded from TIXR_COOKIE or the hardcoded header on first use"""
+    global _cookie_jar
+    if _cookie_jar is None:
+        with _singletons_lock:
+            if _cookie_jar is None:
+                from session_manager import CookieJarManager
+                _cookie_jar = CookieJarManager(seed_header=seed_header or os.getenv('TIXR_COOKIE') or HARDCODED_TIXR_COOKIE)
+    return _cookie_jar
+
+def save_cookie_jar():
+    if _cookie_jar is not None:
+        try:
+            _cookie_jar.save()
+        except OSError as e:
+            logger.error(f"Could not save cookie jar: {e}")
 
 def seed_cookies_from_string(session: requests.Session, raw_cookie: str) -> None:
     """Seed session cookies from a raw Cookie header string."""
-    if not raw_cookie:
-        return
-    try:
-        parts = [p.strip() for p in raw_cookie.split(';') if p.strip()]
-        seeded_names = []
-        for part in parts:
-            if '=' in part:
-                name, value = part.split('=', 1)
-                session.cookies.set(name.strip(), value.strip(), domain='.tixr.com')
-                seeded_names.append(name.strip())
-        if seeded_names:
-            logger.info(f"Seeded cookies: {', '.join(seeded_names)}")
-    except Exception:
-        # Best effort; ignore malformed cookie strings
-        pass
+    seeded_names = []
+    for name, value in parse_cookie_header(raw_cookie):
+        session.cookies.set(name, value, domain='.tixr.com')
+        seeded_names.append(name)
+    if seeded_names:
+        logger.info(f"Seeded cookies: {', '.join(seeded_names)}")
 
 def parse_cookie_header_to_playwright(raw_cookie: str):
     """Convert a Cookie header string into a list of Playwright cookie dicts."""
-    cookies = []
-    if not raw_cookie:
-        return cookies
+    return [
+        {'name': name, 'value': value, 'domain': '.tixr.com', 'path': '/', 'secure': True, 'httpOnly': False}
+        for name, value in parse_cookie_header(raw_cookie)
+    ]
+
+PLAYWRIGHT_API_HEADERS = {
+    'Accept': 'application/json, text/javascript, */*; q=0.01',
+    'X-Requested-With': 'XMLHttpRequest',
+    'Sec-Fetch-Dest': 'empty',
+    'Sec-Fetch-Mode': 'cors',
+    'Sec-Fetch-Site': 'same-origin'
+}
+
+_browser_pool = None
+_browser_pool_cookie_version = None
+_state_store = None
+_price_history = None
+
+# Validators and body hashes of the last payload seen for each watch entry
+fetch_cache = ConditionalCache()
+metrics.GaugeFunc('tixr_fetch_cache', 'Conditional fetch cache counters', lambda: fetch_cache.stats, ['result'])
+metrics.GaugeFunc('browser_pool', 'Warm browser pool counters',
+                  lambda: _browser_pool.stats if _browser_pool is not None else {}, ['stat'])
+
+def get_browser_pool(raw_cookie: str = None):
+    """Return the process-wide warm browser pool, creating it on first use.
+
+    Contexts are seeded from the shared cookie jar, cookies the browser
+    receives are harvested back into it, and newer jar cookies (e.g. a
+    DataDome refresh seen by the HTTP session) are pushed into the pool.
+    """
+    global _browser_pool, _browser_pool_cookie_version
+    jar = get_cookie_jar(raw_cookie)
+    if _browser_pool is not None and _browser_pool_cookie_version == jar.version:
+        return _browser_pool
+    with _singletons_lock:
+        if _browser_pool is None:
+            from browser_pool import BrowserPool
+
+            # Consistent headers
+            fixed_user_agent = os.getenv('TIXR_USER_AGENT') or 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:142.0) Gecko/20100101 Firefox/142.0'
+            headers = dict(PLAYWRIGHT_API_HEADERS, **{'User-Agent': fixed_user_agent})
+            pw_cookies = jar.playwright_cookies()
+            if pw_cookies:
+                logger.info(f"Playwright seeded cookies: {[c['name'] for c in pw_cookies]}")
+            _browser_pool = BrowserPool(
+                cookies=pw_cookies,
+                headers=headers,
+                size=int(os.getenv('PLAYWRIGHT_CONTEXTS', '2')),
+                on_cookies=jar.harvest_playwright
+            )
+            _browser_pool_cookie_version = jar.version
+        elif _browser_pool_cookie_version != jar.version:
+            _browser_pool.set_cookies(jar.playwright_cookies())
+            _browser_pool_cookie_version = jar.version
+        return _browser_pool
+
+def close_browser_pool():
+    """Shut down the warm browser pool if one was started"""
+    global _browser_pool
+    with _singletons_lock:
+        pool, _browser_pool = _browser_pool, None
+    if pool is not None:
+        logger.info(f"Browser pool stats: {pool.report()}")
+        pool.close()
+
+_tixr_limiter = None
+
+def get_tixr_limiter():
+    """Return the adaptive rate limiter every request to Tixr goes through (see ``AdaptiveRateLimiter``)"""
+    global _tixr_limiter
+    if _tixr_limiter is None:
+        with _singletons_lock:
+            if _tixr_limiter is None:
+                _tixr_limiter = AdaptiveRateLimiter.from_env()
+    return _tixr_limiter
+
+def set_tixr_limiter(limiter) -> None:
+    """Pace requests to Tixr through ``limiter`` (e.g. a shard worker's ``SharedRateLimiter``) instead"""
+    global _tixr_limiter
+    with _singletons_lock:
+        _tixr_limiter = limiter
+
+def retry_after_seconds(headers):
+    """``Retry-After`` from requests (case-insensitive) or Playwright (lower-case) response headers"""
+    return parse_retry_after(headers.get('Retry-After') or headers.get('retry-after'))
+
+metrics.GaugeFunc('tixr_rate_limit', 'Adaptive Tixr request limiter state',
+                  lambda: dict(_tixr_limiter.stats, rate=_tixr_limiter.rate) if _tixr_limiter is not None else {},
+                  ['stat'])
+
+_burst_planner = None
+
+def get_burst_planner():
+    """Return the per-event burst polling planner (see ``BurstPlanner``), creating it on first use"""
+    global _burst_planner
+    if _burst_planner is None:
+        with _singletons_lock:
+            if _burst_planner is None:
+                from burst import BurstPlanner
+                _burst_planner = BurstPlanner.from_env()
+    return _burst_planner
+
+metrics.GaugeFunc('burst_polling', 'Events in burst mode and precursor signals seen',
+                  lambda: dict(_burst_planner.stats, bursting=len(_burst_planner.bursting()))
+                  if _burst_planner is not None else {}, ['stat'])
+
+def get_state_store():
+    """Return the process-wide sale state store, opening it on first use"""
+    global _state_store
+    if _state_store is None:
+        with _singletons_lock:
+            if _state_store is None:
+                from state_store import SaleStateStore
+                _state_store = SaleStateStore()
+    return _state_store
+
+def get_price_history():
+    """Return the process-wide resale price/quantity history, opening it on first use"""
+    global _price_history
+    if _price_history is None:
+        with _singletons_lock:
+            if _price_history is None:
+                from price_history import PriceHistory
+                _price_history = PriceHistory()
+    return _price_history
+
+def close_price_history():
+    global _price_history
+    with _singletons_lock:
+        history, _price_history = _price_history, None
+    if history is not None:
+        history.close()
+
+_capture = None
+
+def get_capture():
+    """Return the raw response archive when capture mode is on (``CAPTURE_DIR``/``--capture``), else None"""
+    global _capture
+    if _capture is None and os.getenv('CAPTURE_DIR'):
+        with _singletons_lock:
+            if _capture is None:
+                from capture import CaptureArchive
+                _capture = CaptureArchive(os.getenv('CAPTURE_DIR'))
+                logger.info(f"Capturing raw Tixr responses to {_capture.path}")
+    return _capture
+
+def capture_response(entry: WatchEntry, transport, url, status, headers, body: bytes, truncated=False) -> None:
+    """Archive a raw response in capture mode; a no-op otherwise"""
+    archive = get_capture()
+    if archive is None:
+        return
     try:
-        parts = [p.strip() for p in raw_cookie.split(';') if p.strip()]
-        for part in parts:
-            if '=' in part:
-                name, value = part.split('=', 1)
-                cookies.append({
-                    'name': name.strip(),
-                    'value': value.strip(),
-                    'domain': '.tixr.com',
-                    'path': '/',
-                    'secure': True,
-                    'httpOnly': False
-                })
-    except Exception:
-        return []
-    return cookies
-
-def fetch_api_with_playwright(api_url: str, raw_cookie: str) -> bool:
-    """Use Playwright to call the API directly, seeding cookies if provided. No HTML navigation."""
+        archive.record(entry, transport, url, status, headers, body, truncated)
+    except OSError as e:
+        logger.error(f"Could not capture response for {entry.display_name}: {e}")
+
+def fetch_api_with_playwright(api_url: str, raw_cookie: str, entry: WatchEntry = None):
+    """Use Playwright to call the API directly, seeding cookies if provided. No HTML navigation.
+
+    Requests go through the shared warm browser pool, so only the first call in a
+    process pays for a browser launch. ``raw_cookie`` seeds the shared cookie
+    jar if it has not been created yet. Returns a ``(status_code, found)`` tuple, or
+    ``None`` when Playwright is not installed.
+    """
     try:
-        from playwright.sync_api import sync_playwright
+        import playwright.sync_api  # noqa: F401
     except Exception as e:
         logger.warning(f"Playwright not available ({e}), falling back to HTTP client")
         return None
 
+    entry = entry or DEFAULT_WATCH_ENTRY
     try:
-        with sync_playwright() as p:
-            browser_name = os.getenv('PLAYWRIGHT_BROWSER', 'firefox').lower()
-            launch = {
-                'firefox': p.firefox,
-                'chromium': p.chromium,
-                'webkit': p.webkit
-            }.get(browser_name, p.firefox)
-            browser = launch.launch(headless=True)
-            context = browser.new_context()
-
-            # Seed cookies
-            if raw_cookie:
-                pw_cookies = parse_cookie_header_to_playwright(raw_cookie)
-                if pw_cookies:
-                    context.add_cookies(pw_cookies)
-                    logger.info(f"Playwright seeded cookies: {[c['name'] for c in pw_cookies]}")
+        pool = get_browser_pool(raw_cookie)
 
-            # Consistent headers
-            fixed_user_agent = os.getenv('TIXR_USER_AGENT') or 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:142.0) Gecko/20100101 Firefox/142.0'
-            context.set_extra_http_headers({
-                'User-Agent': fixed_user_agent,
-                'Accept': 'application/json, text/javascript, */*; q=0.01',
-                'X-Requested-With': 'XMLHttpRequest',
-                'Sec-Fetch-Dest': 'empty',
-                'Sec-Fetch-Mode': 'cors',
-                'Sec-Fetch-Site': 'same-origin'
-            })
-
-            # Direct API request
-            r = context.request.get(api_url)
-            logger.info(f"Playwright API status: {r.status}")
-            if r.ok:
-                data = r.json()
-                browser.close()
-                return process_api_response(data)
-
-            browser.close()
-            return False
+        # Direct API request
+        limiter = get_tixr_limiter()
+        limiter.acquire()
+        r = pool.fetch(api_url, headers=fetch_cache.request_headers(entry.cache_key))
+        limiter.record(r.status, retry_after_seconds(r.headers))
+        capture_response(entry, 'playwright', api_url, r.status, r.headers, r.body)
+        logger.info(f"Playwright API status: {r.status}")
+        if r.ok or r.status == 304:
+            return r.status, process_payload(r.status, r.headers, r.body, entry)
+        return r.status, False
     except Exception as e:
         logger.error(f"Playwright API call failed: {e}")
+        return None, False
+
+def process_payload(status, headers, body: bytes, entry: WatchEntry):
+    """Evaluate a raw API payload unless it is unchanged since the last fetch.
+
+    304 responses and bodies whose hash matches the previous one for ``entry``
+    skip JSON decoding and ``process_api_response`` entirely. Otherwise only the
+    collections and watched sales are decoded (see ``extract_event_payload``).
+    A body that fails to decode or evaluate is forgotten, so the next
+    identical one is evaluated again.
+    """
+    if fetch_cache.is_unchanged(entry.cache_key, status, headers, body):
+        logger.info(f"Payload for {entry.display_name} unchanged ({status}); skipping parse")
+        metrics.PAYLOAD_UNCHANGED.inc(reason='not_modified' if status == 304 else 'same_hash')
         return False
+    try:
+        with metrics.DECODE_SECONDS.time():
+            data = extract_event_payload(body, entry.collections, entry.sale_ids)
+    except Exception as e:
+        # Make sure a corrupt body is not treated as "unchanged" next time
+        fetch_cache.forget(entry.cache_key)
+        logger.error(f"Invalid JSON from API for {entry.display_name}: {e}")
+        return False
+    return process_api_response(data, entry)
 
-def check_festival_passes_resale():
-    """Check for resale tickets in Festival Passes collection via API"""
-    
-    api_url = EVENT_API_URL
-    session = create_scraper_session()
-    logger.info(f"HTTP session: {session.__class__.__name__}")
+def build_api_headers(user_agent: str = None):
+    """Return XHR-style headers for direct calls to the event API"""
+    fixed_user_agent = user_agent or os.getenv('TIXR_USER_AGENT') or 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:142.0) Gecko/20100101 Firefox/142.0'
+    api_headers = get_random_headers(user_agent=fixed_user_agent)
+    api_headers['Accept'] = 'application/json, text/javascript, */*; q=0.01'
+    # No Referer since we are going direct; keep XHR-like headers
+    api_headers['X-Requested-With'] = 'XMLHttpRequest'
+    api_headers['X-NewRelic-ID'] = 'Ug8CWVVXGwcEUlFVDwM='
+    api_headers['Sec-GPC'] = '1'
+    api_headers['Sec-Fetch-Dest'] = 'empty'
+    api_headers['Sec-Fetch-Mode'] = 'cors'
+    api_headers['Sec-Fetch-Site'] = 'same-origin'
+    return api_headers
+
+def prepare_session(session: requests.Session) -> None:
+    """Seed a freshly created session with the monitor cookie and the shared Tixr cookie jar"""
+    session.cookies.set('session_id', f'monitor_{random.randint(100000, 999999)}')
+    get_cookie_jar().apply_to_session(session)
+
+def fetch_with_session(session: requests.Session, entry: WatchEntry, transport: str = 'requests'):
+    """GET the event API with a requests-compatible session; returns ``(status_code, found)``"""
+    jar = get_cookie_jar()
+    jar.apply_to_session(session)
+    api_headers = build_api_headers()
+    api_headers.update(fetch_cache.request_headers(entry.cache_key))
+    limiter = get_tixr_limiter()
+    limiter.acquire()
+    response = session.get(entry.api_url, headers=api_headers, timeout=http_client.DEFAULT_TIMEOUT)
+    limiter.record(response.status_code, retry_after_seconds(response.headers))
+    capture_response(entry, transport, entry.api_url, response.status_code, response.headers, response.content)
+    logger.info(f"API response status for {entry.display_name}: {response.status_code}")
+    jar.harvest_session(session)
+
+    if response.status_code in (200, 304):
+        return response.status_code, process_payload(response.status_code, response.headers, response.content, entry)
+    return response.status_code, False
+
+_plain_session = None
+
+def get_plain_session():
+    """Return a shared pooled requests Session for the cheapest transport (one keep-alive connection per check worker)"""
+    global _plain_session
+    if _plain_session is None:
+        with _singletons_lock:
+            if _plain_session is None:
+                session = http_client.new_session('tixr', pool_maxsize=int(os.getenv('WATCHLIST_CONCURRENCY', '4')))
+                prepare_session(session)
+                _plain_session = session
+    return _plain_session
+
+_scraper_session = None
+
+def get_scraper_session():
+    """Return the shared cloudscraper (or plain) session, created the first time a transport needs it"""
+    global _scraper_session
+    if _scraper_session is None:
+        with _singletons_lock:
+            if _scraper_session is None:
+                session = create_scraper_session()
+                logger.info(f"HTTP session: {session.__class__.__name__}")
+                # cloudscraper mounts its own TLS adapter, so it is only tracked, not re-pooled
+                http_client.register('tixr-scraper', session)
+                prepare_session(session)
+                _scraper_session = session
+    return _scraper_session
+
+def close_http_sessions():
+    """Close the shared plain and scraper sessions if they were opened"""
+    global _plain_session, _scraper_session
+    with _singletons_lock:
+        sessions = (_plain_session, _scraper_session)
+        _plain_session = _scraper_session = None
+    for session in sessions:
+        if session is not None:
+            session.close()
+    http_client.unregister('tixr')
+    http_client.unregister('tixr-scraper')
+
+def fetch_via_requests(session, entry):
+    return fetch_with_session(get_plain_session(), entry)
+
+def fetch_via_cloudscraper(session, entry):
+    if importlib.util.find_spec('cloudscraper') is None:
+        return None
+    return fetch_with_session(session or get_scraper_session(), entry, 'cloudscraper')
+
+def fetch_via_playwright(session, entry):
+    return fetch_api_with_playwright(entry.api_url, None, entry)
+
+def fetch_via_html(session, entry):
+    return try_web_scraping_fallback(session or get_scraper_session(), entry)
+
+# Transport name -> callable(session, entry) returning (status_code, found), or None if unavailable
+TRANSPORTS = {
+    'requests': fetch_via_requests,
+    'cloudscraper': fetch_via_cloudscraper,
+    'playwright': fetch_via_playwright,
+    'html': fetch_via_html,
+}
+
+_fetch_strategy = None
+
+def get_fetch_strategy():
+    """Return the process-wide transport ordering engine, loading saved stats on first use"""
+    global _fetch_strategy
+    if _fetch_strategy is None:
+        with _singletons_lock:
+            if _fetch_strategy is None:
+                from fetch_strategy import FetchStrategy
+                _fetch_strategy = FetchStrategy()
+    return _fetch_strategy
+
+def save_fetch_strategy():
+    if _fetch_strategy is not None:
+        try:
+            _fetch_strategy.save()
+        except OSError as e:
+            logger.error(f"Could not save fetch strategy stats: {e}")
+
+def check_once(session: requests.Session, entry: WatchEntry = None):
+    """Run a single API check for one watch entry with an already prepared session.
+
+    Transports are tried cheapest-first in the order learned by
+    ``FetchStrategy``; the next one is only tried after a 403/429 or a
+    network failure. ``session`` is used by the cloudscraper and HTML
+    transports; when it is None they share a lazily created session, so a
+    check answered by plain requests never builds one. Returns a
+    ``(status_code, found)`` tuple so callers such
+    as the daemon scheduler can react to 403/429 responses. ``status_code`` is
+    ``None`` when no HTTP response was received.
+    """
+    entry = entry or DEFAULT_WATCH_ENTRY
+    strategy = get_fetch_strategy()
+    status_code, found = None, False
+
+    for transport in strategy.order():
+        logger.info(f"Requesting event data for {entry.display_name} via {transport}")
+        started = time.monotonic()
+        try:
+            result = TRANSPORTS[transport](session, entry)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request error via {transport}: {e}")
+            elapsed = time.monotonic() - started
+            strategy.record(transport, False, elapsed)
+            metrics.FETCH_SECONDS.observe(elapsed, transport=transport)
+            metrics.FETCH_RESPONSES.inc(transport=transport, status='error')
+            continue
+        if result is None:
+            strategy.mark_unavailable(transport)
+            continue
+
+        status_code, found = result
+        elapsed = time.monotonic() - started
+        blocked = status_code in (403, 429)
+        ok = status_code is not None and status_code < 400
+        strategy.record(transport, ok, elapsed, blocked)
+        # Includes evaluation of the payload, which is measured separately below
+        metrics.FETCH_SECONDS.observe(elapsed, transport=transport)
+        metrics.FETCH_RESPONSES.inc(transport=transport, status=status_code or 'none')
+        if blocked:
+            metrics.FETCH_BLOCKED.inc(transport=transport)
+        if ok:
+            return status_code, found
+        if status_code is not None and not blocked:
+            # Errors like 404/500 are not caused by the transport, so escalating won't help
+            logger.error(f"API request failed with status: {status_code}")
+            return status_code, found
+        logger.warning(f"{transport} got {status_code or 'no response'}; escalating to the next transport")
+
+    return status_code, found
+
+def check_watchlist(session: requests.Session, entries=None):
+    """Check every watchlist entry concurrently; returns ``(worst_status, found)``.
+
+    ``worst_status`` is 429 or 403 if any entry was throttled, otherwise the
+    last status seen, so the scheduler can back off for the whole cycle.
+    """
+    entries = entries or load_watchlist()
+    if len(entries) == 1:
+        # A single event needs no event loop, which keeps asyncio off the cold-start path
+        entry = entries[0]
+        try:
+            status_code, found = check_once(session, entry)
+        except Exception as e:
+            logger.error(f"Check failed for {entry.display_name}: {e}")
+            status_code, found = None, False
+        return summarize_results([(entry, status_code, found)])
+    import asyncio
+    results = asyncio.run(run_watchlist(entries, lambda entry: check_once(session, entry)))
+    return summarize_results(results)
+
+def summarize_results(results):
+    """Collapse per-entry ``(entry, status, found)`` results into ``(worst_status, found)``"""
+    statuses = [status for _, status, _ in results]
+    found = any(found for _, _, found in results)
+    for throttled in (429, 403):
+        if throttled in statuses:
+            return throttled, found
+    known = [status for status in statuses if status is not None]
+    return (known[-1] if known else None), found
+
+def check_festival_passes_resale(entries=None):
+    """Check every watchlist entry (by default the Festival Passes collection) via API"""
     
     try:
-        # Add random delay to be respectful
-        delay = random.uniform(2, 5)
-        logger.info(f"Waiting {delay:.1f} seconds before API request...")
-        time.sleep(delay)
-        
-        # Set up session with realistic browsing behavior
-        session.cookies.set('session_id', f'monitor_{random.randint(100000, 999999)}')
-        # Seed the HTTP session as well (fallback path)
-        seed_cookies_from_string(session, HARDCODED_TIXR_COOKIE)
-        
-        # Direct API approach: skip navigation and requirements
-        fixed_user_agent = os.getenv('TIXR_USER_AGENT') or 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:142.0) Gecko/20100101 Firefox/142.0'
-        logger.info("Skipping navigation; calling API directly with cloudscraper")
-        
-        # Try Playwright first with hardcoded cookie; otherwise use HTTP client
-        logger.info("Using Playwright to request API directly with hardcoded cookie")
-        pw_result = fetch_api_with_playwright(api_url, HARDCODED_TIXR_COOKIE)
-        if pw_result is not None:
-            return pw_result
-
-        logger.info("Making API request to get event data (HTTP client)...")
-        api_headers = get_random_headers(user_agent=fixed_user_agent)
-        api_headers['Accept'] = 'application/json, text/javascript, */*; q=0.01'
-        # No Referer since we are going direct; keep XHR-like headers
-        api_headers['X-Requested-With'] = 'XMLHttpRequest'
-        api_headers['X-NewRelic-ID'] = 'Ug8CWVVXGwcEUlFVDwM='
-        api_headers['Sec-GPC'] = '1'
-        api_headers['Sec-Fetch-Dest'] = 'empty'
-        api_headers['Sec-Fetch-Mode'] = 'cors'
-        api_headers['Sec-Fetch-Site'] = 'same-origin'
-
-        response = session.get(api_url, headers=api_headers, timeout=30)
-        logger.info(f"API response status: {response.status_code}")
-        
-        if response.status_code == 200:
-            return process_api_response(response.json())
-        elif response.status_code == 403:
-            logger.warning("Got 403 (direct API). Skipping HTML fallbacks per config.")
-            return False
-        else:
-            logger.error(f"API request failed with status: {response.status_code}. Skipping HTML fallbacks per config.")
-            return False
+        # Direct API approach: skip navigation and requirements. Sessions are
+        # created by the transports that need them (see check_once)
+        logger.info("Skipping navigation; calling the API directly")
+        _, found = check_watchlist(None, entries)
+        save_fetch_strategy()
+        save_cookie_jar()
+        return found
             
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error: {e}")
-        return try_web_scraping_fallback(session)
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
         return False
     finally:
-        session.close()
+        close_http_sessions()
+
+def collection_sale_ids(collection):
+    """Return the sale ids of a collection, accepting lists of ids or of sale objects"""
+    sale_ids = collection.get('sales', [])
+    if isinstance(sale_ids, list) and len(sale_ids) > 0:
+        # Handle both formats: list of IDs or list of objects with 'id' field
+        if isinstance(sale_ids[0], dict):
+            sale_ids = [sale.get('id') for sale in sale_ids if sale.get('id')]
+    return sale_ids
+
+def build_sale_index(data):
+    """Index a payload once: sale id -> sale dict, collection name -> set of sale ids"""
+    sales_by_id = {}
+    for sale in data.get('sales') or []:
+        sale_id = sale.get('id')
+        if sale_id is not None:
+            sales_by_id[sale_id] = sale
+
+    collection_ids = {}
+    for collection in data.get('collectionConfiguration', {}).get('collections', []):
+        name = collection.get('name', 'Unknown')
+        collection_ids.setdefault(name, set()).update(collection_sale_ids(collection))
+    return sales_by_id, collection_ids
+
+def select_watched_sales(data, entry: WatchEntry):
+    """Return the ``{'id', 'state', 'resaleState', 'name', 'price', 'quantity'}`` summaries of the sales ``entry`` watches.
+
+    Builds the payload index once and then only touches the watched ids, so the
+    cost is linear in the payload size regardless of how many ids are watched.
+    Returns ``None`` when none of the entry's collections are present.
+    """
+    sales_by_id, collection_ids = build_sale_index(data)
+
+    if entry.collections:
+        present = [name for name in entry.collections if name in collection_ids]
+        if not present:
+            logger.warning(f"{entry.label} collection not found")
+            # Log available collections for debugging
+            logger.info(f"Available collections: {list(collection_ids)}")
+            return None
+        watched_ids = set().union(*(collection_ids[name] for name in present))
+        # Sale-id filters narrow the watched collections further
+        if entry.sale_ids:
+            watched_ids &= entry.sale_ids
+    else:
+        watched_ids = set(entry.sale_ids)
+
+    logger.info(f"Found {len(watched_ids)} {entry.label} sales to check out of {len(sales_by_id)} in response")
+
+    from price_history import listing_details
+
+    watched_sales = []
+    for sale_id in watched_ids:
+        sale = sales_by_id.get(sale_id)
+        if sale is None:
+            continue
+        name, price, quantity = listing_details(sale)
+        watched_sales.append({
+            'id': sale_id,
+            'state': sale.get('state', ''),
+            'resaleState': sale.get('resaleState', ''),
+            'name': name,
+            'price': price,
+            'quantity': quantity,
+        })
+    return watched_sales
 
-def process_api_response(data):
-    """Process the API response to check for Festival Passes resale availability"""
+# Set in sharded worker processes, which hand detections to the notifier process
+_alert_sink = None
+
+def set_alert_sink(sink) -> None:
+    """Route alerts to ``sink(entry, event_url, num_tickets, sales, detected_at)`` instead of sending them"""
+    global _alert_sink
+    _alert_sink = sink
+
+def lowest_price(sales):
+    """Lowest known price among sale summaries, or None"""
+    prices = [sale['price'] for sale in sales if sale.get('price') is not None]
+    return min(prices) if prices else None
+
+def dispatch_alert(entry: WatchEntry, event_url, num_tickets, sales=(), detected_at=None, transition=None):
+    """Queue Telegram and email alerts for ``entry`` in the outbox, or hand them to the notifier in worker mode.
+
+    ``sales`` are the summaries (see ``select_watched_sales``) of the sales
+    that became available; subscriber filters are matched against them and
+    the lowest price goes into the message. ``detected_at`` is a
+    ``time.monotonic()`` value; the sink receives it as wall-clock time so it
+    can cross process boundaries. ``transition`` is the state store's id of
+    the alerting transition (see ``SaleStateStore.record``) and keys the
+    outbox entry, so replaying the same transition does not alert twice.
+    """
+    detected_wall = time.time() - (time.monotonic() - detected_at) if detected_at is not None else time.time()
+    if _alert_sink is not None:
+        _alert_sink(entry, event_url, num_tickets, sales, detected_wall)
+        return
+    if transition is None:
+        transition = ','.join(f"{sale['id']}@{detected_wall:.6f}" for sale in sorted(sales, key=lambda sale: sale['id']))
+    enqueue_alert(f"{entry.event_id}:{transition}",
+                  alert_payload(entry.event_id, entry.label, entry.display_name, event_url, entry.collections,
+                                num_tickets, sales),
+                  detected_wall)
+
+def process_api_response(data, entry: WatchEntry = None):
+    """Process the API response to check a watch entry for resale availability"""
+    entry = entry or DEFAULT_WATCH_ENTRY
+    label = entry.label
     try:
-        logger.info("Processing API response for Festival Passes resale tickets...")
+        logger.info(f"Processing API response for {entry.display_name} ({label}) resale tickets...")
+        started = time.monotonic()
         
-        # Find the Festival Passes collection
-        collections = data.get('collectionConfiguration', {}).get('collections', [])
-        festival_passes_collection = None
-        
-        for collection in collections:
-            if collection.get('name') == 'Festival Passes':
-                festival_passes_collection = collection
-                logger.info(f"Found Festival Passes collection with ID: {collection.get('id')}")
-                break
-        
-        if not festival_passes_collection:
-            logger.warning("Festival Passes collection not found")
-            # Log available collections for debugging
-            collection_names = [col.get('name', 'Unknown') for col in collections]
-            logger.info(f"Available collections: {collection_names}")
+        watched_sales = select_watched_sales(data, entry)
+        if watched_sales is None:
             return False
-        
-        # Get the sales IDs from the Festival Passes collection
-        festival_sales_ids = festival_passes_collection.get('sales', [])
-        if isinstance(festival_sales_ids, list) and len(festival_sales_ids) > 0:
-            # Handle both formats: list of IDs or list of objects with 'id' field
-            if isinstance(festival_sales_ids[0], dict):
-                festival_sales_ids = [sale.get('id') for sale in festival_sales_ids if sale.get('id')]
-        
-        logger.info(f"Found {len(festival_sales_ids)} Festival Passes sales to check")
-        
-        if not festival_sales_ids:
-            logger.warning("No sales found in Festival Passes collection")
+        if not watched_sales:
+            logger.warning(f"No sales found for {label}")
             return False
         
-        # Get all sales data
-        all_sales = data.get('sales', [])
-        logger.info(f"Total sales in response: {len(all_sales)}")
+        # Single pass over the watched sales serves both logging and evaluation
+        still_available = 0
+        for sale in watched_sales:
+            logger.info(f"Sale ID {sale['id']}: state='{sale['state']}', resaleState='{sale['resaleState']}'"
+                        + (f", price={sale['price']:.2f}" if sale['price'] is not None else "")
+                        + (f", quantity={sale['quantity']}" if sale['quantity'] is not None else ""))
+            if sale['resaleState'] == 'AVAILABLE':
+                still_available += 1
         
-        # Check Festival Passes sales for resale availability
-        available_resales = []
-        
-        for sale in all_sales:
-            sale_id = sale.get('id')
-            if sale_id in festival_sales_ids:
-                sale_state = sale.get('state', '')
-                resale_state = sale.get('resaleState', '')
-                
-                logger.info(f"Sale ID {sale_id}: state='{sale_state}', resaleState='{resale_state}'")
-                
-                if resale_state == 'AVAILABLE':
-                    available_resales.append({
-                        'id': sale_id,
-                        'state': sale_state,
-                        'resaleState': resale_state
-                    })
+        # Only UNAVAILABLE -> AVAILABLE transitions (or new sale ids) alert; they
+        # are queued before the new states are stored so a crash cannot drop them
+        changes = []
+        available_resales = get_state_store().record(
+            entry.event_id, watched_sales, changes=changes,
+            before_commit=lambda alerts, transition: dispatch_alert(entry, entry.page_url, len(alerts), alerts,
+                                                                    detected_at=time.monotonic(), transition=transition)
+        )
+        evaluated_at = time.monotonic()
+        # Any state change is a precursor worth polling this event faster for
+        get_burst_planner().signal(entry.event_id, changes)
+        try:
+            get_price_history().record(entry.event_id, watched_sales)
+        except OSError as e:
+            logger.error(f"Could not record price history: {e}")
+        metrics.EVALUATE_SECONDS.observe(evaluated_at - started)
+        still_available -= len(available_resales)
+        if still_available:
+            logger.info(f"{still_available} {label} resale(s) still available; already notified")
         
         if available_resales:
-            logger.info(f"🎉 FOUND {len(available_resales)} FESTIVAL PASSES RESALE TICKETS AVAILABLE!")
+            logger.info(f"🎉 FOUND {len(available_resales)} {label.upper()} RESALE TICKETS AVAILABLE FOR {entry.display_name.upper()}!")
             
             # Log details of available resales
             for resale in available_resales:
                 logger.info(f"Available resale - ID: {resale['id']}, State: {resale['state']}")
             
-            # Send notifications
-            event_url = EVENT_PAGE_URL
-            send_telegram_notification(event_url)
-            send_notification(event_url, len(available_resales))
+            metrics.DETECTIONS.inc(len(available_resales), event=entry.event_id)
             return True
         else:
-            logger.info("No Festival Passes resale tickets currently available")
-            
-            # Log status of all Festival Passes for debugging
-            for sale in all_sales:
-                if sale.get('id') in festival_sales_ids:
-                    logger.debug(f"Festival Pass {sale.get('id')}: {sale.get('state')} / {sale.get('resaleState')}")
-            
+            logger.info(f"No new {label} resale tickets available for {entry.display_name}")
             return False
             
     except Exception as e:
+        # The body was recorded as seen before evaluation; let the next identical one be evaluated again
+        fetch_cache.forget(entry.cache_key)
         logger.error(f"Error processing API response: {e}")
         return False
 
-def try_api_fallback_methods(session, api_url):
-    """Try alternative methods when API returns 403"""
-    
-    logger.info("Trying API fallback methods...")
-    
-    # Method 1: Try with different headers
-    try:
-        logger.info("Trying with minimal headers...")
-        minimal_headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'application/json',
-            'Origin': 'https://www.tixr.com',
-            'Referer': EVENT_PAGE_URL
-        }
-        
-        time.sleep(random.uniform(3, 6))
-        response = session.get(api_url, headers=minimal_headers, timeout=30)
-        
-        if response.status_code == 200:
-            logger.info("✅ Success with minimal headers")
-            return process_api_response(response.json())
-            
-    except Exception as e:
-        logger.error(f"Minimal headers method failed: {e}")
-    
-    # Method 2: Fresh session with longer delay
-    try:
-        logger.info("Trying with fresh session and longer delay...")
-        session.close()
-        session = create_scraper_session()
-        
-        delay = random.uniform(10, 20)
-        logger.info(f"Waiting {delay:.1f} seconds...")
-        time.sleep(delay)
-        
-        # Try to establish session more naturally
-        event_page_url = EVENT_PAGE_URL
-        page_headers = get_random_headers()
-        page_headers['Accept'] = 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
-        
-        page_response = session.get(event_page_url, headers=page_headers, timeout=30)
-        
-        if page_response.status_code == 200:
-            logger.info("Successfully loaded event page, now trying API...")
-            time.sleep(random.uniform(2, 4))
-            
-            api_headers = get_random_headers()
-            response = session.get(api_url, headers=api_headers, timeout=30)
-            
-            if response.status_code == 200:
-                logger.info("✅ Success after loading event page first")
-                return process_api_response(response.json())
-                
-    except Exception as e:
-        logger.error(f"Fresh session method failed: {e}")
-    
-    logger.warning("All API fallback methods failed")
+def process_page_scan(scan, entry: WatchEntry, url: str) -> bool:
+    """Alert on what ``scan_event_page`` found in an event page; returns whether resale tickets were found"""
+    logger.info(f"Scanned {scan.bytes_read} bytes of the event page")
+    if scan.payload is not None:
+        logger.info("Found embedded event state in HTML")
+        return process_api_response(scan.payload, entry)
+    if scan.markers:
+        # Markers go through the state store like API sales (sale 0 when the
+        # element carries no id), so a marker that stays on the page alerts once
+        sales = [{'id': sale_id or 0, 'resaleState': 'AVAILABLE', 'name': None, 'price': None, 'quantity': None}
+                 for sale_id in scan.markers]
+        available_resales = get_state_store().record(
+            entry.event_id, sales,
+            before_commit=lambda alerts, transition: dispatch_alert(entry, url, len(alerts), alerts, transition=transition)
+        )
+        if not available_resales:
+            logger.info(f"Resale indicators in HTML for {entry.display_name} already notified")
+            return False
+        logger.info("🎉 Found resale indicators in HTML!")
+        metrics.DETECTIONS.inc(len(available_resales), event=entry.event_id)
+        return True
+    store = get_state_store()
+    if not scan.truncated and store.resale_state(entry.event_id, 0) == 'AVAILABLE':
+        # The whole page carries no marker: the id-less one seen earlier is gone and may alert again
+        store.record(entry.event_id, [{'id': 0, 'resaleState': 'UNAVAILABLE'}])
+    logger.info("No resale indicators found in HTML")
     return False
 
-def try_web_scraping_fallback(session):
-    """Fallback to web scraping if API completely fails"""
+def try_web_scraping_fallback(session, entry: WatchEntry = None):
+    """Fallback to web scraping if API completely fails; returns ``(status_code, found)``.
+
+    The page is streamed through ``scan_event_page``: when it embeds the
+    event state, that payload goes through ``process_api_response`` like an
+    API response (transition tracking, prices, filters); otherwise an element
+    marked RESALE alerts for its sale. Reading stops at the first such node.
+    """
+    entry = entry or DEFAULT_WATCH_ENTRY
     logger.info("Falling back to web scraping...")
     
-    from bs4 import BeautifulSoup
+    from html_scan import SCAN_CHUNK_SIZE, scan_event_page
     
     try:
-        url = EVENT_PAGE_URL
+        url = entry.page_url
         headers = get_random_headers()
         headers['Accept'] = 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
         
-        time.sleep(random.uniform(3, 7))
-        response = session.get(url, headers=headers, timeout=30)
+        limiter = get_tixr_limiter()
+        limiter.acquire()
+        response = session.get(url, headers=headers, timeout=http_client.DEFAULT_TIMEOUT, stream=True)
+        limiter.record(response.status_code, retry_after_seconds(response.headers))
         
         if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Look for resale indicators in HTML
-            resale_elements = soup.find_all(attrs={'data-state': 'RESALE'}) or \
-                            soup.find_all(text=lambda x: x and 'resale' in x.lower()) or \
-                            soup.select('[state="RESALE"]')
-            
-            if resale_elements:
-                logger.info("🎉 Found resale indicators in HTML!")
-                send_telegram_notification(url)
-                send_notification(url, 1)
-                return True
-            else:
-                logger.info("No resale indicators found in HTML")
-                return False
+            chunks = response.iter_content(chunk_size=SCAN_CHUNK_SIZE)
+            # In capture mode keep the part of the page the scan read
+            read = [] if get_capture() is not None else None
+            if read is not None:
+                chunks = (read.append(chunk) or chunk for chunk in chunks)
+            try:
+                with metrics.DECODE_SECONDS.time():
+                    scan = scan_event_page(chunks, entry.sale_ids)
+            finally:
+                response.close()
+            if read is not None:
+                capture_response(entry, 'html', url, response.status_code, response.headers, b''.join(read),
+                                 truncated=scan.payload is not None or bool(scan.markers) or scan.truncated)
+            return response.status_code, process_page_scan(scan, entry, url)
         else:
+            capture_response(entry, 'html', url, response.status_code, response.headers, response.content)
             logger.error(f"Web scraping failed with status: {response.status_code}")
-            return False
+            return response.status_code, False
             
+    except requests.exceptions.RequestException:
+        raise
     except Exception as e:
         logger.error(f"Web scraping fallback failed: {e}")
-        return False
+        return None, False
 
-def send_notification(event_url, num_tickets=1):
-    """Send email notification when resale tickets are found"""
-    
-    sender_email = os.getenv('SENDER_EMAIL')
-    sender_password = os.getenv('SENDER_PASSWORD')
-    recipient_email = os.getenv('RECIPIENT_EMAIL')
+_email_notifier = None
+
+def get_email_notifier():
+    """Return the shared SMTP email notifier, or None if email is not configured"""
+    global _email_notifier
+    if _email_notifier is None:
+        with _singletons_lock:
+            if _email_notifier is None:
+                from email_notifier import EmailNotifier
+                _email_notifier = EmailNotifier.from_env()
+    return _email_notifier
+
+def close_email_notifier():
+    """Close the email notifier's SMTP connection"""
+    global _email_notifier
+    with _singletons_lock:
+        notifier, _email_notifier = _email_notifier, None
+    if notifier is not None:
+        notifier.close()
+        logger.info(f"Email notifier stats: {notifier.stats}")
+
+def send_notification(event_url, num_tickets=1, label='Festival Passes', event_name='Valley of the Seven Stars',
+                      event_id=None, collections=(), detected_at=None, price=None, sales=(), exclude=()):
+    """Email a notification when resale tickets are found.
+
+    Goes to every address in ``RECIPIENT_EMAIL`` (comma-separated) plus the
+    subscribers who set an email with /email and whose filters match
+    ``sales``, except those in ``exclude``. Sends synchronously over the
+    notifier's kept-alive connection (alerts reach it through the outbox's
+    email worker) and returns ``{'sent', 'failed', 'delivered'}``, empty when
+    email is not configured or nobody is due. ``price`` (the lowest listed
+    price) is mentioned when known.
+    """
     
-    if not all([sender_email, sender_password, recipient_email]):
+    notifier = get_email_notifier()
+    if notifier is None:
         logger.warning("Email credentials not configured")
-        return
+        return {}
+    
+    recipients = [r.strip() for r in os.getenv('RECIPIENT_EMAIL', '').split(',') if r.strip()]
+    try:
+        recipients.extend(get_subscriber_store().emails_for(event_id, collections, sales))
+    except Exception as e:
+        logger.error(f"Could not load subscriber emails: {e}")
+    recipients = [r for r in dict.fromkeys(recipients) if r not in exclude]
+    if not recipients:
+        logger.warning("No email recipients due")
+        return {}
     
-    message = MIMEMultipart()
-    message["From"] = sender_email
-    message["To"] = recipient_email
-    message["Subject"] = f"🎟️ {num_tickets} Festival Passes Resale Ticket(s) Available!"
+    subject = f"🎟️ {num_tickets} {label} Resale Ticket(s) Available!"
+    price_line = f"\n    Listed from ${price:,.2f}." if price is not None else ""
     
     body = f"""
-    Great news! {num_tickets} Festival Passes resale ticket(s) are now available for Valley of the Seven Stars!
+    Great news! {num_tickets} {label} resale ticket(s) are now available for {event_name}!{price_line}
     
     Check them out here: {event_url}
     
@@ -432,21 +852,408 @@ def send_notification(event_url, num_tickets=1):
     This alert was sent by your Tixr ticket monitor.
     """
     
-    message.attach(MIMEText(body, "plain"))
-    
+    delivered = notifier.send(subject, body, recipients, detected_at=detected_at)
+    return {'sent': len(delivered), 'failed': len(recipients) - len(delivered), 'delivered': delivered}
+
+# Alerts are written to a durable outbox and sent by one worker thread per channel
+OUTBOX_WORKERS = int(os.getenv('OUTBOX_WORKERS', '1'))
+_outbox = None
+_outbox_workers = []
+metrics.GaugeFunc('alert_outbox', 'Alert deliveries in the outbox by channel and state',
+                  lambda: _outbox.counts() if _outbox is not None else {}, ['channel', 'state'])
+
+def _monotonic(wall):
+    """A wall-clock timestamp as the matching ``time.monotonic()`` value (for latency metrics)"""
+    return time.monotonic() - (time.time() - wall) if wall is not None else None
+
+def alert_payload(event_id, label, display_name, event_url, collections, num_tickets, sales, price=None):
+    """The JSON-serialisable alert the outbox stores and its channel workers render"""
+    sales = [{key: sale.get(key) for key in ('id', 'name', 'price', 'quantity')} for sale in sales]
+    return {'event_id': event_id, 'label': label, 'display_name': display_name, 'event_url': event_url,
+            'collections': list(collections), 'num_tickets': num_tickets, 'sales': sales,
+            'price': lowest_price(sales) if price is None else price}
+
+def deliver_telegram_alert(job):
+    """Outbox delivery for the ``telegram`` channel; returns ``(chat ids reached, error or None)``"""
+    alert = job['payload']
+    stats = send_telegram_notification(alert['event_url'], alert['label'], alert['display_name'], alert['event_id'],
+                                       alert['collections'], detected_at=_monotonic(job['detected_at']),
+                                       price=alert['price'], sales=alert['sales'], exclude=job['delivered'])
+    failed = stats.get('failed', 0)
+    return stats.get('delivered', []), (f"{failed} chat(s) not reached" if failed else None)
+
+def deliver_email_alert(job):
+    """Outbox delivery for the ``email`` channel; returns ``(addresses reached, error or None)``"""
+    alert = job['payload']
+    stats = send_notification(alert['event_url'], alert['num_tickets'], alert['label'], alert['display_name'],
+                              alert['event_id'], alert['collections'], detected_at=_monotonic(job['detected_at']),
+                              price=alert['price'], sales=alert['sales'], exclude=job['delivered'])
+    failed = stats.get('failed', 0)
+    return stats.get('delivered', []), (f"{failed} address(es) not reached" if failed else None)
+
+OUTBOX_CHANNELS = {'telegram': deliver_telegram_alert, 'email': deliver_email_alert}
+
+def get_outbox():
+    """Return the process-wide alert outbox, opening it and starting its channel workers on first use.
+
+    Deliveries left by an earlier run (pending, or leased by a process that
+    died) are picked up as soon as the workers start.
+    """
+    global _outbox
+    if _outbox is None:
+        with _singletons_lock:
+            if _outbox is None:
+                from outbox import AlertOutbox, OutboxWorker
+                outbox = AlertOutbox()
+                for channel, deliver in OUTBOX_CHANNELS.items():
+                    for index in range(max(1, OUTBOX_WORKERS)):
+                        worker = OutboxWorker(outbox, channel, deliver, name=f'outbox-{channel}-{index}')
+                        worker.start()
+                        _outbox_workers.append(worker)
+                _outbox = outbox
+    return _outbox
+
+def close_outbox(timeout: float = 30.0):
+    """Deliver what is due, stop the channel workers and close the outbox; retries not yet due wait for the next run"""
+    global _outbox
+    if _outbox is None:
+        return
+    for worker in _outbox_workers:
+        worker.stop(drain=True, timeout=timeout)
+    counts = _outbox.counts()
+    left = sum(n for (_, state), n in counts.items() if state in ('pending', 'inflight'))
+    if left:
+        logger.warning(f"{left} alert delivery(ies) left in the outbox for the next run")
+    logger.info(f"Alert outbox: {', '.join(f'{c}/{s}={n}' for (c, s), n in sorted(counts.items())) or 'empty'}")
+    _outbox_workers.clear()
+    _outbox.close()
+    _outbox = None
+
+def enqueue_alert(key, payload, detected_wall=None):
+    """Write an alert to the outbox for every configured channel; returns its id, or None if ``key`` was seen.
+
+    If the outbox cannot be written the alert is sent inline instead, so a
+    full disk does not swallow it.
+    """
+    channels = []
+    if os.getenv('TELEGRAM_BOT_TOKEN'):
+        channels.append('telegram')
+    if get_email_notifier() is not None:
+        channels.append('email')
+    if not channels:
+        logger.warning("No notification channel configured; alert not sent")
+        return None
+    import sqlite3
     try:
-        server = smtplib.SMTP("smtp.gmail.com", 587)
-        server.starttls()
-        server.login(sender_email, sender_password)
-        server.sendmail(sender_email, recipient_email, message.as_string())
-        server.quit()
-        logger.info("Notification email sent!")
-    except Exception as e:
-        logger.error(f"Failed to send email: {e}")
+        return get_outbox().enqueue(key, payload, channels, detected_at=detected_wall)
+    except sqlite3.Error as e:
+        logger.error(f"Could not write alert {key} to the outbox ({e}); sending it directly")
+        job = {'payload': payload, 'detected_at': detected_wall, 'delivered': set()}
+        for channel in channels:
+            OUTBOX_CHANNELS[channel](job)
+        return None
 
-if __name__ == "__main__":
-    logger.info("Starting Tixr Festival Passes resale monitor...")
-    
+class DaemonScheduler:
+    """Asyncio polling loop that keeps one session and browser alive across ticks.
+
+    Each tick evaluates the entries that are due concurrently through
+    ``run_watchlist``, sharing one HTTP session; the browser stays warm in the
+    shared pool (see ``get_browser_pool``). The interval grows multiplicatively
+    on 403/429 responses and shrinks back towards the base interval once
+    requests succeed again. Events with recent precursor signals are checked
+    more often (see ``get_burst_planner``) within the Tixr rate budget; all
+    others are checked together every interval.
+    """
+
+    # Whether this process answers bot commands and sends alerts (sharded workers leave both to the coordinator)
+    consume_updates = True
+
+    def __init__(self, interval: float, jitter: float, max_backoff: float = 600.0,
+                 run_for: float = None, entries=None, metrics_port: int = None):
+        self.interval = interval
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.run_for = run_for
+        self.metrics_port = metrics_port
+        self.entries = entries or load_watchlist()
+        self.backoff = 1.0
+        self.stop_event = None
+        self.next_due = {}  # event_id -> time.monotonic() of its next check
+        self._tracked = []
+        self._checked = []
+
+    def next_delay(self, status_code):
+        """Update the backoff factor from the last status and return the next delay"""
+        if status_code in (403, 429):
+            self.backoff = min(self.backoff * 2, self.max_backoff / max(self.interval, 0.001))
+            logger.warning(f"Got {status_code}; backing off to {self.interval * self.backoff:.1f}s")
+        elif status_code is not None and status_code < 400:
+            self.backoff = max(1.0, self.backoff / 2)
+        return self.interval * self.backoff + random.uniform(0, self.jitter)
+
+    def _due(self, entries):
+        """The entries whose next check time has come; remembers them for ``_schedule``"""
+        # A little slack so an entry due a moment after wake-up is not left for another round
+        now = time.monotonic() + 0.05
+        self._tracked = entries
+        self._checked = [entry for entry in entries if self.next_due.get(entry.event_id, 0.0) <= now]
+        return self._checked
+
+    def _request_budget(self) -> float:
+        """Tixr requests per second this process may plan for"""
+        return get_tixr_limiter().rate
+
+    def _schedule(self, delay: float) -> float:
+        """Set the next check time of the entries just checked; returns seconds until the first entry is due.
+
+        ``delay`` is the baseline delay (interval with backoff and jitter);
+        burst intervals are scaled by the same factor, so 403/429 backoff slows
+        bursting events too.
+        """
+        now = time.monotonic()
+        scale = delay / self.interval if self.interval > 0 else 1.0
+        intervals = get_burst_planner().intervals([entry.event_id for entry in self._tracked], self.interval,
+                                                  self._request_budget())
+        for entry in self._checked:
+            self.next_due[entry.event_id] = now + intervals.get(entry.event_id, self.interval) * scale
+        upcoming = min((self.next_due.get(entry.event_id, now) for entry in self._tracked), default=now + delay)
+        return max(0.0, min(upcoming - now, delay))
+
+    async def _tick(self):
+        import asyncio
+        due = self._due(self.entries)
+        with metrics.TICK_SECONDS.time():
+            results = await run_watchlist(due, lambda entry: check_once(None, entry))
+        await asyncio.to_thread(save_fetch_strategy)
+        await asyncio.to_thread(save_cookie_jar)
+        return summarize_results(results)
+
+    def _shutdown(self):
+        close_outbox()
+        logger.info(f"HTTP connections: {http_client.report()}")
+        close_http_sessions()
+        close_browser_pool()
+        close_email_notifier()
+        close_price_history()
+        save_cookie_jar()
+        if _fetch_strategy is not None:
+            logger.info(f"Fetch strategy: {_fetch_strategy.report()}")
+        logger.info(f"Fetch cache stats: {fetch_cache.report()}")
+        if _tixr_limiter is not None:
+            logger.info(f"Tixr rate limiter: {_tixr_limiter.report()}")
+        if _capture is not None:
+            logger.info(f"Response capture: {_capture.report()}")
+        if _burst_planner is not None:
+            logger.info(f"Burst polling: {_burst_planner.report()}")
+
+    async def _sleep(self, delay):
+        """Sleep for ``delay`` seconds, returning early when a stop is requested"""
+        import asyncio
+        try:
+            await asyncio.wait_for(self.stop_event.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _poll_loop(self):
+        while not self.stop_event.is_set():
+            started = time.monotonic()
+            try:
+                status_code, found = await self._tick()
+                if found:
+                    logger.info("✅ Resale tickets found and notifications sent!")
+            except Exception as e:
+                logger.error(f"Error in daemon tick: {e}")
+                status_code = None
+            delay = self._schedule(self.next_delay(status_code))
+            elapsed = time.monotonic() - started
+            bursting = len(get_burst_planner().bursting())
+            logger.info(f"Tick over {len(self._checked)} event(s) took {elapsed:.2f}s; next check in {delay:.1f}s"
+                        + (f" ({bursting} event(s) in burst mode)" if bursting else ""))
+            logger.debug(f"Fetch cache stats: {fetch_cache.report()}")
+            await self._sleep(delay)
+
+    async def run(self):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        self.stop_event = asyncio.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.stop_event.set)
+            except (NotImplementedError, RuntimeError):  # pragma: no cover - non-Unix
+                pass
+        if self.run_for:
+            loop.call_later(self.run_for, self.stop_event.set)
+
+        logger.info(f"Daemon started: {len(self.entries)} event(s), interval={self.interval}s jitter={self.jitter}s")
+        if self.metrics_port:
+            metrics.start_metrics_server(self.metrics_port)
+        # Bot commands are handled on their own thread as they arrive
+        consumer = start_update_consumer() if self.consume_updates else None
+        if self.consume_updates:
+            # Start the outbox workers now so deliveries left by an earlier run go out
+            await asyncio.to_thread(get_outbox)
+        try:
+            await self._poll_loop()
+        finally:
+            if consumer is not None:
+                consumer.stop()
+            await asyncio.to_thread(self._shutdown)
+            metrics.stop_metrics_server()
+            logger.info("Daemon stopped")
+
+class ShardWorkerScheduler(DaemonScheduler):
+    """Daemon loop of one sharded worker process.
+
+    Each tick renews the worker's lease, checks only the entries the hash
+    ring assigns to it. Its Tixr limiter is a ``SharedRateLimiter``, so every
+    request, whichever transport sends it, takes the coordinator's shared
+    per-host slot at one adaptive rate and the combined rate toward Tixr stays
+    bounded however many workers run. Detections go to the coordinator's
+    queue via ``set_alert_sink``.
+    """
+
+    consume_updates = False
+
+    def __init__(self, coordinator, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.coordinator = coordinator
+        self.owned = set()
+
+    def _owned_entries(self):
+        self.coordinator.heartbeat()
+        owned = self.coordinator.owned(self.entries)
+        owned_ids = {entry.event_id for entry in owned}
+        gained = owned_ids - self.owned
+        if gained or owned_ids != self.owned:
+            logger.info(f"Worker {self.coordinator.worker_id} owns {len(owned)} of {len(self.entries)} event(s)")
+        for event_id in gained:
+            # Another worker may have recorded newer states while it owned the event
+            get_state_store().forget(event_id)
+        self.owned = owned_ids
+        return owned
+
+    def _request_budget(self) -> float:
+        # The shared per-host slot splits the rate between the live workers
+        return get_tixr_limiter().rate / max(1, len(self.coordinator.live_workers()))
+
+    async def _tick(self):
+        import asyncio
+        owned = await asyncio.to_thread(self._owned_entries)
+        due = self._due(owned)
+        if not due:
+            return None, False
+        with metrics.TICK_SECONDS.time():
+            results = await run_watchlist(due, lambda entry: check_once(None, entry))
+        await asyncio.to_thread(save_fetch_strategy)
+        await asyncio.to_thread(save_cookie_jar)
+        return summarize_results(results)
+
+    def _shutdown(self):
+        self.coordinator.release()
+        super()._shutdown()
+        self.coordinator.close()
+
+def run_shard_worker(worker_id, entries, interval, jitter, max_backoff=600.0, run_for=None, shard_db=None,
+                     metrics_port=None):
+    """Entry point of a sharded worker process (local via ``--workers`` or remote via ``--worker-id``)"""
+    import asyncio
+    from sharding import ShardCoordinator, SharedRateLimiter
+    coordinator = ShardCoordinator(shard_db, worker_id)
+    set_alert_sink(coordinator.report_detection)
+    set_tixr_limiter(SharedRateLimiter.from_env(coordinator, urllib.parse.urlsplit(TIXR_BASE_URL).netloc))
+    scheduler = ShardWorkerScheduler(coordinator, interval, jitter, max_backoff, run_for=run_for, entries=entries,
+                                     metrics_port=metrics_port)
+    asyncio.run(scheduler.run())
+
+class ShardCoordinatorScheduler(DaemonScheduler):
+    """Supervises local worker processes and is the single notifier for all of them.
+
+    Workers (local, or on other hosts sharing ``SHARD_DB``) queue detections;
+    this loop drains the queue every ``poll_interval`` seconds, drops repeats
+    of the same sale within ``ALERT_COOLDOWN``, and sends the alerts. Bot
+    commands are also handled here. Dead local workers are restarted.
+    """
+
+    def __init__(self, workers: int, *args, shard_db: str = None, poll_interval: float = 0.5, **kwargs):
+        super().__init__(*args, **kwargs)
+        from sharding import ShardCoordinator
+        self.num_workers = workers
+        self.shard_db = shard_db
+        self.poll_interval = poll_interval
+        self.cooldown = float(os.getenv('ALERT_COOLDOWN', '300'))
+        self.coordinator = ShardCoordinator(shard_db)
+        self.processes = {}
+
+    def _start_worker(self, worker_id, index):
+        import multiprocessing
+        worker_metrics_port = self.metrics_port + 1 + index if self.metrics_port else None
+        process = multiprocessing.get_context('spawn').Process(
+            target=run_shard_worker, name=worker_id,
+            args=(worker_id, self.entries, self.interval, self.jitter, self.max_backoff, self.run_for,
+                  self.shard_db, worker_metrics_port)
+        )
+        process.start()
+        self.processes[worker_id] = (index, process)
+        logger.info(f"Started worker {worker_id} (pid {process.pid})")
+
+    def _supervise(self):
+        for worker_id, (index, process) in list(self.processes.items()):
+            if not process.is_alive() and process.exitcode != 0 and not self.stop_event.is_set():
+                logger.warning(f"Worker {worker_id} exited with {process.exitcode}; restarting it")
+                self._start_worker(worker_id, index)
+
+    def deliver_pending(self) -> int:
+        """Move queued detections into the alert outbox; returns how many were queued"""
+        sent = 0
+        for detection in self.coordinator.pending_detections():
+            # Enqueue before claiming: if this process dies in between, the
+            # detection is seen again and its idempotency key stops a second alert
+            fresh = self.coordinator.fresh_sale_ids(detection, self.cooldown)
+            if fresh:
+                # Filters are matched against the sales not alerted yet
+                sales = [sale for sale in detection['sales'] if sale['id'] in fresh]
+                enqueue_alert(f"detection:{detection['id']}:{detection['detected_at']:.6f}",
+                              alert_payload(detection['event_id'], detection['label'], detection['display_name'],
+                                            detection['event_url'], detection['collections'],
+                                            detection['num_tickets'], sales,
+                                            price=None if sales else detection['price']),
+                              detection['detected_at'])
+            self.coordinator.claim(detection, self.cooldown)
+            if not fresh:
+                logger.info(f"Duplicate detection for {detection['display_name']} from {detection['worker_id']}; skipped")
+                continue
+            sent += 1
+        return sent
+
+    async def _poll_loop(self):
+        import asyncio
+        hostname = socket.gethostname()
+        for index in range(self.num_workers):
+            self._start_worker(f"{hostname}-{index}", index)
+        while not self.stop_event.is_set():
+            try:
+                await asyncio.to_thread(self.deliver_pending)
+            except Exception as e:
+                logger.error(f"Error delivering detections: {e}")
+            self._supervise()
+            await self._sleep(self.poll_interval)
+
+    def _shutdown(self):
+        for worker_id, (_, process) in self.processes.items():
+            if process.is_alive():
+                process.terminate()  # SIGTERM: the worker finishes its tick and releases its lease
+        for worker_id, (_, process) in self.processes.items():
+            process.join(30)
+            if process.is_alive():
+                logger.warning(f"Worker {worker_id} did not stop; killing it")
+                process.kill()
+        # Detections reported while the workers were stopping
+        self.deliver_pending()
+        super()._shutdown()
+        self.coordinator.close()
+
+def run_single_check(entries=None):
+    """Run one registration check and one resale check, then exit (cron mode)"""
     # First check for new Telegram registrations
     try:
         logger.info("Checking for Telegram registrations...")
@@ -454,15 +1261,81 @@ if __name__ == "__main__":
     except Exception as e:
         logger.error(f"Error checking Telegram registrations: {e}")
     
-    # Check for Festival Passes resale tickets
+    # Check every watchlist entry for resale tickets
     try:
-        logger.info("Checking for Festival Passes resale tickets...")
-        result = check_festival_passes_resale()
+        logger.info("Checking watchlist for resale tickets...")
+        result = check_festival_passes_resale(entries)
         if result:
             logger.info("✅ Resale tickets found and notifications sent!")
         else:
             logger.info("No resale tickets found at this time")
     except Exception as e:
         logger.error(f"Error in main check: {e}")
+
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Tixr Festival Passes resale monitor")
+    parser.add_argument('--daemon', action='store_true',
+                        help="Keep polling in a long-running process instead of a single check")
+    parser.add_argument('--interval', type=float, default=float(os.getenv('POLL_INTERVAL', '20')),
+                        help="Base seconds between checks in daemon mode (env POLL_INTERVAL)")
+    parser.add_argument('--jitter', type=float, default=float(os.getenv('POLL_JITTER', '5')),
+                        help="Maximum random seconds added to each interval (env POLL_JITTER)")
+    parser.add_argument('--max-backoff', type=float, default=float(os.getenv('POLL_MAX_BACKOFF', '600')),
+                        help="Upper bound in seconds for the 403/429 backoff (env POLL_MAX_BACKOFF)")
+    parser.add_argument('--run-for', type=float, default=None,
+                        help="Stop the daemon after this many seconds (useful for CI runners)")
+    parser.add_argument('--watchlist', default=None,
+                        help="Path to the watchlist JSON (env WATCHLIST_FILE, default watchlist.json)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Shard the watchlist over this many worker processes plus one notifier (daemon mode)")
+    parser.add_argument('--worker-id', default=None,
+                        help="Run a single sharded worker, e.g. on another host sharing --shard-db")
+    parser.add_argument('--shard-db', default=None,
+                        help="Coordination database for sharded mode (env SHARD_DB, default state/shards.db)")
+    parser.add_argument('--capture', default=os.getenv('CAPTURE_DIR') or None,
+                        help="Archive every raw Tixr response under this directory for replay (env CAPTURE_DIR)")
+    parser.add_argument('--metrics-port', type=int, default=int(os.getenv('METRICS_PORT', '0')) or None,
+                        help="Serve Prometheus metrics on 127.0.0.1:PORT/metrics in daemon mode (env METRICS_PORT)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Command line entry point.
+
+    Transports, notifiers, asyncio and the HTML scanner are imported by the code
+    paths that use them, so a one-shot check only pays for what it touches.
+    """
+    args = parse_args(argv)
+    logger.info("Starting Tixr Festival Passes resale monitor...")
+
+    entries = load_watchlist(args.watchlist)
+    if args.capture:
+        # Through the environment so sharded worker processes capture too
+        os.environ['CAPTURE_DIR'] = args.capture
+
+    if args.worker_id:
+        run_shard_worker(args.worker_id, entries, args.interval, args.jitter, args.max_backoff, run_for=args.run_for,
+                         shard_db=args.shard_db, metrics_port=args.metrics_port)
+    elif args.workers is not None:
+        import asyncio
+        scheduler = ShardCoordinatorScheduler(args.workers, args.interval, args.jitter, args.max_backoff,
+                                              run_for=args.run_for, entries=entries, metrics_port=args.metrics_port,
+                                              shard_db=args.shard_db)
+        asyncio.run(scheduler.run())
+    elif args.daemon:
+        import asyncio
+        scheduler = DaemonScheduler(args.interval, args.jitter, args.max_backoff, run_for=args.run_for, entries=entries,
+                                    metrics_port=args.metrics_port)
+        asyncio.run(scheduler.run())
+    else:
+        # Deliveries left by an earlier run go out alongside this check
+        get_outbox()
+        run_single_check(entries)
+        close_outbox()
+        close_browser_pool()
+        close_email_notifier()
     
-    logger.info("Monitor check complete")
\ No newline at end of file
+    logger.info("Monitor check complete")
+
+if __name__ == "__main__":
+    main()
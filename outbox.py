@@ -0,0 +1,254 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    detected_at REAL,
+    created_at REAL
+);
+CREATE TABLE IF NOT EXISTS deliveries (
+    alert_id INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_at REAL NOT NULL,
+    lease_until REAL,
+    last_error TEXT,
+    delivered_at REAL,
+    PRIMARY KEY (alert_id, channel)
+);
+CREATE INDEX IF NOT EXISTS idx_deliveries_due ON deliveries (channel, state, next_at);
+CREATE TABLE IF NOT EXISTS delivered_recipients (
+    alert_id INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    PRIMARY KEY (alert_id, channel, recipient)
+);
+"""
+
+class AlertOutbox:
+    """Durable SQLite (WAL) queue between detection and notification.
+
+    ``enqueue`` stores an alert with one delivery row per channel in a single
+    transaction; an alert whose ``idempotency_key`` is already stored is
+    ignored, so replaying a detection cannot alert twice. Channel workers
+    ``claim`` due deliveries under a lease (an expired lease, e.g. after a
+    crash, makes the delivery claimable again), record each recipient reached
+    so a retry skips them, and either finish the delivery or schedule a retry
+    with exponential back-off until ``max_attempts``. Delivery is therefore
+    at-least-once per channel and at most once per recipient barring a crash
+    mid-send.
+    """
+
+    def __init__(self, path: str = None, lease: float = 120.0, max_attempts: int = None, retry_base: float = 5.0,
+                 retry_max: float = 600.0, retention_days: float = None):
+        self.path = path or os.getenv('OUTBOX_DB', os.path.join('state', 'outbox.db'))
+        self.lease = lease
+        self.max_attempts = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '8')) if max_attempts is None else max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        retention_days = float(os.getenv('OUTBOX_RETENTION_DAYS', '7')) if retention_days is None else retention_days
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        # Autocommit mode so BEGIN IMMEDIATE can be issued explicitly
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self.prune(time.time() - retention_days * 86400)
+
+    def _transaction(self, work):
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = work()
+            self._conn.execute('COMMIT')
+            return result
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
+
+    def enqueue(self, key: str, payload: dict, channels, detected_at: float = None, now: float = None):
+        """Store an alert for ``channels``; returns its id, or None if ``key`` was already enqueued"""
+        now = time.time() if now is None else now
+
+        def work():
+            cursor = self._conn.execute(
+                'INSERT OR IGNORE INTO alerts (idempotency_key, payload, detected_at, created_at) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(payload), now if detected_at is None else detected_at, now)
+            )
+            if not cursor.rowcount:
+                return None
+            self._conn.executemany(
+                'INSERT INTO deliveries (alert_id, channel, next_at) VALUES (?, ?, ?)',
+                [(cursor.lastrowid, channel, now) for channel in channels]
+            )
+            return cursor.lastrowid
+
+        with self._lock:
+            alert_id = self._transaction(work)
+            self._wakeup.notify_all()
+        if alert_id is None:
+            logger.info(f"Alert {key} already in the outbox; not enqueued again")
+        return alert_id
+
+    def claim(self, channel: str, now: float = None):
+        """Lease the oldest due delivery for ``channel``.
+
+        Returns a dict with the alert ``payload``, ``alert_id``, ``attempts``,
+        ``detected_at`` and the ``delivered`` recipients of earlier attempts,
+        or None when nothing is due.
+        """
+        now = time.time() if now is None else now
+
+        def work():
+            row = self._conn.execute(
+                'SELECT d.alert_id, d.attempts, a.payload, a.detected_at FROM deliveries d JOIN alerts a ON a.id = d.alert_id'
+                " WHERE d.channel = ? AND ((d.state = 'pending' AND d.next_at <= ?) OR (d.state = 'inflight' AND d.lease_until < ?))"
+                ' ORDER BY d.next_at LIMIT 1',
+                (channel, now, now)
+            ).fetchone()
+            if row is None:
+                return None
+            alert_id, attempts, payload, detected_at = row
+            self._conn.execute(
+                "UPDATE deliveries SET state = 'inflight', lease_until = ?, attempts = attempts + 1"
+                ' WHERE alert_id = ? AND channel = ?',
+                (now + self.lease, alert_id, channel)
+            )
+            delivered = {r[0] for r in self._conn.execute(
+                'SELECT recipient FROM delivered_recipients WHERE alert_id = ? AND channel = ?', (alert_id, channel)
+            )}
+            return {'alert_id': alert_id, 'channel': channel, 'attempts': attempts + 1, 'payload': json.loads(payload),
+                    'detected_at': detected_at, 'delivered': delivered}
+
+        with self._lock:
+            return self._transaction(work)
+
+    def finish(self, job, delivered=(), error: str = None, now: float = None) -> str:
+        """Record ``delivered`` recipients and complete ``job``, or schedule a retry on ``error``; returns the new state"""
+        now = time.time() if now is None else now
+        if error is None:
+            state, next_at = 'done', now
+        elif job['attempts'] >= self.max_attempts:
+            state, next_at = 'dead', now
+        else:
+            state, next_at = 'pending', now + min(self.retry_max, self.retry_base * 2 ** (job['attempts'] - 1))
+
+        def work():
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO delivered_recipients (alert_id, channel, recipient) VALUES (?, ?, ?)',
+                [(job['alert_id'], job['channel'], str(recipient)) for recipient in delivered]
+            )
+            self._conn.execute(
+                'UPDATE deliveries SET state = ?, next_at = ?, lease_until = NULL, last_error = ?, delivered_at = ?'
+                ' WHERE alert_id = ? AND channel = ?',
+                (state, next_at, error, now if state == 'done' else None, job['alert_id'], job['channel'])
+            )
+
+        with self._lock:
+            self._transaction(work)
+        if state == 'dead':
+            logger.error(f"Giving up on {job['channel']} alert {job['alert_id']} after {job['attempts']} attempts: {error}")
+        elif error is not None:
+            logger.warning(f"{job['channel']} alert {job['alert_id']} failed (attempt {job['attempts']}): {error};"
+                           f" retrying in {next_at - now:.0f}s")
+        return state
+
+    def next_due(self, channel: str):
+        """When the next pending or leased delivery of ``channel`` becomes claimable, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(CASE state WHEN 'pending' THEN next_at ELSE lease_until END) FROM deliveries"
+                " WHERE channel = ? AND state IN ('pending', 'inflight')", (channel,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def wait(self, timeout: float) -> None:
+        """Sleep until something is enqueued in this process or ``timeout`` passes"""
+        with self._wakeup:
+            self._wakeup.wait(timeout)
+
+    def notify(self) -> None:
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def counts(self):
+        """``{(channel, state): n}`` over all deliveries"""
+        with self._lock:
+            return {(channel, state): n for channel, state, n in self._conn.execute(
+                'SELECT channel, state, COUNT(*) FROM deliveries GROUP BY channel, state'
+            )}
+
+    def prune(self, before: float) -> int:
+        """Delete alerts created before ``before`` whose deliveries all finished; returns how many"""
+        def work():
+            ids = [(row[0],) for row in self._conn.execute(
+                'SELECT id FROM alerts WHERE created_at < ? AND NOT EXISTS (SELECT 1 FROM deliveries d'
+                " WHERE d.alert_id = alerts.id AND d.state IN ('pending', 'inflight'))", (before,)
+            )]
+            for table, column in (('delivered_recipients', 'alert_id'), ('deliveries', 'alert_id'), ('alerts', 'id')):
+                self._conn.executemany(f'DELETE FROM {table} WHERE {column} = ?', ids)
+            return len(ids)
+
+        with self._lock:
+            return self._transaction(work)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class OutboxWorker(threading.Thread):
+    """Drains one channel of the outbox: ``deliver(job)`` returns ``(delivered_recipients, error_or_None)``"""
+
+    def __init__(self, outbox: AlertOutbox, channel: str, deliver, poll_interval: float = 1.0, name: str = None):
+        super().__init__(name=name or f'outbox-{channel}', daemon=True)
+        self.outbox = outbox
+        self.channel = channel
+        self.deliver = deliver
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+        self._draining = False
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                job = self.outbox.claim(self.channel)
+            except sqlite3.Error as e:
+                logger.error(f"Outbox claim failed for {self.channel}: {e}")
+                job = None
+            if job is None:
+                if self._draining:
+                    return
+                next_due = self.outbox.next_due(self.channel)
+                delay = self.poll_interval if next_due is None else max(0.0, min(self.poll_interval, next_due - time.time()))
+                self.outbox.wait(delay)
+                continue
+            try:
+                delivered, error = self.deliver(job)
+            except Exception as e:
+                delivered, error = (), f"{type(e).__name__}: {e}"
+            self.outbox.finish(job, delivered, error)
+
+    def stop(self, drain: bool = True, timeout: float = 30.0) -> None:
+        """Stop the worker, first delivering whatever is due when ``drain`` is set"""
+        if drain:
+            self._draining = True
+        else:
+            self._stop_event.set()
+        self.outbox.notify()
+        self.join(timeout)
+        if self.is_alive():
+            logger.warning(f"Outbox worker {self.name} still busy after {timeout:.0f}s; leaving it to finish")
+            self._stop_event.set()
@@ -0,0 +1,90 @@
+import io
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+_ijson = None
+
+def load_ijson():
+    """Import the optional ijson package on first use; returns None if it is not installed"""
+    global _ijson
+    if _ijson is None:
+        try:
+            import ijson
+            _ijson = ijson
+        except ImportError:  # pragma: no cover
+            _ijson = False
+    return _ijson or None
+
+COLLECTION_ITEM = 'collectionConfiguration.collections.item'
+COLLECTIONS_ARRAY = 'collectionConfiguration.collections'
+SALE_ITEM = 'sales.item'
+SALES_ARRAY = 'sales'
+
+def _watched_ids(collections, collection_names, sale_ids):
+    ids = set()
+    for collection in collections:
+        if collection.get('name') in collection_names:
+            for sale in collection.get('sales') or []:
+                ids.add(sale.get('id') if isinstance(sale, dict) else sale)
+    return ids & sale_ids if sale_ids else ids
+
+def extract_event_payload(source, collection_names=(), sale_ids=()):
+    """Decode only the parts of an event payload the monitor looks at.
+
+    ``source`` is the raw body (bytes) or a binary file object. With ijson
+    installed the body is parsed incrementally: only
+    ``collectionConfiguration.collections`` and the ``sales`` entries whose ids
+    are watched are materialized, and parsing stops as soon as both arrays have
+    been read. Without ijson the whole body is decoded as before.
+
+    Returns a dict shaped like the API response with just those two keys (or
+    the full payload on the fallback path).
+    """
+    fp = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    ijson = load_ijson()
+    if ijson is None:
+        return json.load(fp)
+
+    collection_names = set(collection_names or ())
+    sale_ids = set(sale_ids or ())
+    # With only sale-id filters the watched set is known before parsing starts
+    watched = None if collection_names else sale_ids
+
+    collections = []
+    sales = []
+    builder = None
+    building = None
+    skip = False
+    collections_done = False
+    sales_done = False
+
+    for prefix, event, value in ijson.parse(fp, use_float=True):
+        if builder is not None:
+            if building == SALE_ITEM and prefix == 'sales.item.id' and watched is not None and value not in watched:
+                skip = True
+            if not skip:
+                builder.event(event, value)
+            if prefix == building and event == 'end_map':
+                if not skip:
+                    (collections if building == COLLECTION_ITEM else sales).append(builder.value)
+                builder = None
+                skip = False
+            continue
+
+        if event == 'start_map' and prefix in (COLLECTION_ITEM, SALE_ITEM):
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            building = prefix
+        elif event == 'end_array' and prefix == COLLECTIONS_ARRAY:
+            collections_done = True
+            if collection_names:
+                watched = _watched_ids(collections, collection_names, sale_ids)
+        elif event == 'end_array' and prefix == SALES_ARRAY:
+            sales_done = True
+
+        if collections_done and sales_done:
+            break
+
+    return {'collectionConfiguration': {'collections': collections}, 'sales': sales}
@@ -0,0 +1,216 @@
+import os
+import json
+import mmap
+import time
+import struct
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# timestamp, event id, sale id, price in cents (-1 unknown), quantity (-1 unknown)
+RECORD = struct.Struct('<dqqii')
+
+PRICE_KEYS = ('resalePrice', 'lowestResalePrice', 'minPrice', 'price', 'currentPrice', 'faceValue')
+QUANTITY_KEYS = ('resaleQuantity', 'availableQuantity', 'quantityAvailable', 'quantity', 'remaining')
+TIER_KEYS = ('tiers', 'prices', 'priceTiers')
+
+def _number(value):
+    if isinstance(value, dict):
+        value = value.get('amount', value.get('value'))
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def _first(sale, keys):
+    for key in keys:
+        value = _number(sale.get(key))
+        if value is not None:
+            return value
+    return None
+
+def listing_details(sale):
+    """``(name, price, quantity)`` of a sale dict from the event API; unknown values are None.
+
+    Sales with price tiers report the lowest tier price and the summed tier
+    quantities.
+    """
+    price = _first(sale, PRICE_KEYS)
+    quantity = _first(sale, QUANTITY_KEYS)
+    for key in TIER_KEYS:
+        tiers = sale.get(key)
+        if isinstance(tiers, list) and tiers:
+            prices = [p for p in (_first(t, PRICE_KEYS) for t in tiers if isinstance(t, dict)) if p is not None]
+            quantities = [q for q in (_first(t, QUANTITY_KEYS) for t in tiers if isinstance(t, dict)) if q is not None]
+            if prices:
+                price = min(prices)
+            if quantities and quantity is None:
+                quantity = sum(quantities)
+            break
+    return sale.get('name'), price, int(quantity) if quantity is not None else None
+
+class _Segment:
+    """Per-(event, sale) record numbers of one segment file, extended as the file grows"""
+
+    def __init__(self, path):
+        self.path = path
+        self.index = {}
+        self.indexed = 0
+
+    def refresh(self):
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        size -= size % RECORD.size
+        if size <= self.indexed:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self.indexed)
+            chunk = f.read(size - self.indexed)
+        number = self.indexed // RECORD.size
+        for _, event_id, sale_id, _, _ in RECORD.iter_unpack(chunk):
+            self.index.setdefault((event_id, sale_id), array('I')).append(number)
+            number += 1
+        self.indexed = size
+
+    def read(self, key, since, until):
+        numbers = self.index.get(key)
+        if not numbers:
+            return []
+        points = []
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), self.indexed, access=mmap.ACCESS_READ) as mm:
+            for number in numbers:
+                at, _, _, cents, quantity = RECORD.unpack_from(mm, number * RECORD.size)
+                if since <= at <= until:
+                    points.append((at, cents / 100 if cents >= 0 else None, quantity if quantity >= 0 else None))
+        return points
+
+class PriceHistory:
+    """Append-only time series of resale prices and quantities per sale.
+
+    Each change of a sale's price or quantity is appended as a fixed-size
+    binary record to a segment file per ``segment_seconds`` (one UTC day by
+    default) under ``path``; unchanged observations are not written. Segments
+    older than ``retention_days`` are deleted. A range query only opens the
+    segments overlapping the range, using a per-(event, sale) index of record
+    numbers built on first use; at most ``cached_segments`` indexes are kept
+    in memory. Appends are single ``O_APPEND`` writes, so sharded workers can
+    share the directory.
+    """
+
+    def __init__(self, path: str = None, retention_days: float = None, segment_seconds: int = 86400,
+                 cached_segments: int = 4):
+        self.path = path or os.getenv('PRICE_HISTORY_DIR', os.path.join('state', 'price_history'))
+        self.retention = 86400 * (float(os.getenv('PRICE_HISTORY_DAYS', '30')) if retention_days is None
+                                  else retention_days)
+        self.segment_seconds = segment_seconds
+        self.cached_segments = cached_segments
+        os.makedirs(self.path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._last = {}
+        self._segments = OrderedDict()
+        self._current_segment = None
+        self._names_path = os.path.join(self.path, 'names.json')
+        try:
+            with open(self._names_path, 'r') as f:
+                self._names = {tuple(int(part) for part in key.split(':')): name for key, name in json.load(f).items()}
+        except (OSError, ValueError):
+            self._names = {}
+
+    def _segment_path(self, segment):
+        return os.path.join(self.path, f"{segment}.bin")
+
+    def _segment(self, segment):
+        cached = self._segments.pop(segment, None) or _Segment(self._segment_path(segment))
+        self._segments[segment] = cached
+        while len(self._segments) > self.cached_segments:
+            self._segments.popitem(last=False)
+        return cached
+
+    def _prune(self, now):
+        oldest = int((now - self.retention) // self.segment_seconds)
+        for filename in os.listdir(self.path):
+            stem, ext = os.path.splitext(filename)
+            if ext == '.bin' and stem.isdigit() and int(stem) < oldest:
+                os.remove(os.path.join(self.path, filename))
+                self._segments.pop(int(stem), None)
+                logger.info(f"Price history segment {filename} expired")
+
+    def _save_names(self):
+        tmp_path = f"{self._names_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({f"{event_id}:{sale_id}": name for (event_id, sale_id), name in self._names.items()}, f)
+        os.replace(tmp_path, self._names_path)
+
+    def record(self, event_id, sales, now: float = None) -> int:
+        """Append the sales (dicts with ``id``, ``name``, ``price``, ``quantity``) whose listing changed; returns how many"""
+        now = time.time() if now is None else now
+        records = []
+        names_changed = False
+        with self._lock:
+            for sale in sales:
+                key = (int(event_id), int(sale['id']))
+                price, quantity = sale.get('price'), sale.get('quantity')
+                if self._last.get(key) != (price, quantity):
+                    self._last[key] = (price, quantity)
+                    records.append(RECORD.pack(now, key[0], key[1], round(price * 100) if price is not None else -1,
+                                               quantity if quantity is not None else -1))
+                name = sale.get('name')
+                if name and self._names.get(key) != name:
+                    self._names[key] = name
+                    names_changed = True
+            if records:
+                segment = int(now // self.segment_seconds)
+                if segment != self._current_segment:
+                    self._current_segment = segment
+                    self._prune(now)
+                fd = os.open(self._segment_path(segment), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+                try:
+                    os.write(fd, b''.join(records))
+                finally:
+                    os.close(fd)
+            if names_changed:
+                self._save_names()
+        return len(records)
+
+    def history(self, event_id, sale_id, since: float = None, until: float = None):
+        """``[(timestamp, price, quantity), ...]`` recorded for a sale in ``[since, until]`` (default: the last 24 h).
+
+        Only changes are stored, so the value at ``since`` is the last point
+        before it (see ``latest``).
+        """
+        until = time.time() if until is None else until
+        since = until - 86400 if since is None else since
+        key = (int(event_id), int(sale_id))
+        points = []
+        with self._lock:
+            for segment in range(int(since // self.segment_seconds), int(until // self.segment_seconds) + 1):
+                if not os.path.exists(self._segment_path(segment)):
+                    continue
+                cached = self._segment(segment)
+                cached.refresh()
+                points.extend(cached.read(key, since, until))
+        points.sort()
+        return points
+
+    def latest(self, event_id, sale_id, before: float = None):
+        """The last ``(timestamp, price, quantity)`` recorded for a sale at or before ``before``, or None"""
+        before = time.time() if before is None else before
+        oldest = before - self.retention
+        since = before - self.segment_seconds
+        while since + self.segment_seconds > oldest:
+            points = self.history(event_id, sale_id, since, before)
+            if points:
+                return points[-1]
+            before, since = since, since - self.segment_seconds
+        return None
+
+    def name(self, event_id, sale_id):
+        return self._names.get((int(event_id), int(sale_id)))
+
+    def close(self):
+        with self._lock:
+            self._segments.clear()
@@ -0,0 +1,88 @@
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class AdaptiveRateLimiter:
+    """Token bucket for one host whose rate adapts AIMD-style to throttling.
+
+    Every request calls ``acquire`` (blocking until a token is free) and then
+    ``record`` with the response status. Successes raise the rate additively
+    by ``increase`` up to ``max_rate``; a 403 or 429 multiplies it by
+    ``decrease`` down to ``min_rate`` and, with a ``Retry-After``, pauses the
+    bucket until then. Healthy periods run at the configured rate and hostile
+    ones slow down without any fixed sleeps.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0, min_rate: float = 0.05, max_rate: float = None,
+                 increase: float = 0.1, decrease: float = 0.5):
+        self.max_rate = max_rate or rate
+        self.min_rate = min(min_rate, self.max_rate)
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.increase = increase
+        self.decrease = decrease
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+        self.stats = {'acquired': 0, 'waited_seconds': 0.0, 'throttled': 0}
+
+    @classmethod
+    def from_env(cls):
+        """Limiter for tixr.com from TIXR_RATE/TIXR_BURST/TIXR_MIN_RATE/TIXR_RATE_STEP"""
+        return cls(
+            rate=float(os.getenv('TIXR_RATE', '2')),
+            burst=float(os.getenv('TIXR_BURST', '2')),
+            min_rate=float(os.getenv('TIXR_MIN_RATE', '0.05')),
+            increase=float(os.getenv('TIXR_RATE_STEP', '0.1')),
+        )
+
+    def acquire(self) -> float:
+        """Block until a request may be sent; returns the seconds waited"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now >= self.paused_until:
+                    self.tokens = min(self.burst, self.tokens + (now - max(self.updated, self.paused_until)) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        self.stats['acquired'] += 1
+                        self.stats['waited_seconds'] += waited
+                        return waited
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    wait = self.paused_until - now
+            time.sleep(wait)
+            waited += wait
+
+    def record(self, status_code, retry_after: float = None) -> None:
+        """Adapt the rate to a response; ``None`` (no response) leaves it unchanged"""
+        with self.lock:
+            if status_code in (403, 429):
+                previous = self.rate
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self.tokens = min(self.tokens, 0.0)
+                self.stats['throttled'] += 1
+                if retry_after:
+                    self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+                logger.warning(f"Tixr returned {status_code}; request rate {previous:.2f} -> {self.rate:.2f}/s"
+                               + (f", paused {retry_after:.0f}s" if retry_after else ""))
+            elif status_code is not None and status_code < 400:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def report(self) -> str:
+        with self.lock:
+            return (f"rate={self.rate:.2f}/s acquired={self.stats['acquired']} "
+                    f"waited={self.stats['waited_seconds']:.1f}s throttled={self.stats['throttled']}")
+
+def parse_retry_after(value):
+    """Seconds from a numeric ``Retry-After`` header, or None"""
+    try:
+        return max(0.0, float(value)) if value else None
+    except (TypeError, ValueError):
+        return None
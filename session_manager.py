@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import weakref
+import threading
+
+logger = logging.getLogger(__name__)
+
+TIXR_COOKIE_DOMAIN = '.tixr.com'
+
+def parse_cookie_header(raw_cookie: str):
+    """Split a raw ``Cookie`` header into ``(name, value)`` pairs, skipping malformed parts"""
+    pairs = []
+    for part in (raw_cookie or '').split(';'):
+        part = part.strip()
+        if '=' in part:
+            name, value = part.split('=', 1)
+            pairs.append((name.strip(), value.strip()))
+    return pairs
+
+class CookieJarManager:
+    """One shared, persisted Tixr cookie jar for every transport.
+
+    The seed cookie header is parsed once. Cookies refreshed by Tixr (the
+    ``datadome`` and ``tsession`` Set-Cookie responses) are harvested from
+    requests sessions and Playwright contexts, bumped into a new ``version``
+    and written to disk, so other transports pick them up on their next
+    request and a restart resumes with the warm session. The jar file also
+    records a hash of the seed header it was seeded from; when the configured
+    header changes (e.g. a new ``TIXR_COOKIE``) its cookies override the saved
+    ones, so a stale persisted jar never shadows a fresh seed.
+    """
+
+    def __init__(self, path: str = None, seed_header: str = None):
+        self.path = path or os.getenv('COOKIE_JAR_FILE', os.path.join('state', 'cookies.json'))
+        self._lock = threading.Lock()
+        self._cookies = {}
+        self.version = 0
+        self._dirty = False
+        # Keyed by the session itself: ids of closed sessions are reused by new ones
+        self._session_versions = weakref.WeakKeyDictionary()
+        self._seed = hashlib.blake2b(seed_header.encode(), digest_size=16).hexdigest() if seed_header else None
+        saved_seed = self._load()
+        if seed_header and (not self._cookies or saved_seed != self._seed):
+            seeded = []
+            for name, value in parse_cookie_header(seed_header):
+                self._cookies[name] = {'name': name, 'value': value, 'domain': TIXR_COOKIE_DOMAIN,
+                                       'path': '/', 'expires': None, 'secure': True}
+                seeded.append(name)
+            self.version += 1
+            # Saved with the new seed hash, so the next start keeps harvested refreshes
+            self._dirty = True
+            logger.info(f"Seeded cookie jar: {', '.join(seeded)}")
+
+    def _load(self):
+        """Read the saved cookies; returns the hash of the seed header they came from"""
+        try:
+            with open(self.path, 'r') as f:
+                saved = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        now = time.time()
+        for cookie in saved.get('cookies', []):
+            if cookie.get('expires') and cookie['expires'] < now:
+                continue
+            self._cookies[cookie['name']] = cookie
+        if self._cookies:
+            self.version += 1
+            logger.info(f"Loaded {len(self._cookies)} cookies from {self.path}")
+        return saved.get('seed')
+
+    def save(self) -> None:
+        """Write the jar to disk if anything changed since the last save"""
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = {'saved_at': time.time(), 'seed': self._seed, 'cookies': list(self._cookies.values())}
+            self._dirty = False
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"  # sharded workers save concurrently
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.path)
+
+    def _merge(self, name, value, domain, path, expires, secure, source):
+        current = self._cookies.get(name)
+        if current is not None and current['value'] == value:
+            return False
+        self._cookies[name] = {'name': name, 'value': value, 'domain': domain or TIXR_COOKIE_DOMAIN,
+                               'path': path or '/', 'expires': expires, 'secure': bool(secure)}
+        logger.info(f"Cookie {name} refreshed from {source}")
+        return True
+
+    def _bump(self, changed):
+        if changed:
+            self.version += 1
+            self._dirty = True
+
+    # --- requests sessions ---
+
+    def apply_to_session(self, session) -> None:
+        """Copy the jar into a requests session if it is behind the current version"""
+        with self._lock:
+            if self._session_versions.get(session) == self.version:
+                return
+            for cookie in self._cookies.values():
+                session.cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'], path=cookie['path'])
+            self._session_versions[session] = self.version
+
+    def harvest_session(self, session) -> None:
+        """Pick up cookies Tixr set on a requests session"""
+        with self._lock:
+            changed = False
+            for cookie in session.cookies:
+                if 'tixr.com' not in (cookie.domain or ''):
+                    continue
+                changed |= self._merge(cookie.name, cookie.value, cookie.domain, cookie.path,
+                                       cookie.expires, cookie.secure, 'HTTP session')
+            self._bump(changed)
+            if changed:
+                # This session already holds the new values
+                self._session_versions[session] = self.version
+
+    # --- Playwright contexts ---
+
+    def playwright_cookies(self):
+        """The jar as Playwright ``add_cookies`` dicts"""
+        with self._lock:
+            cookies = []
+            for cookie in self._cookies.values():
+                pw_cookie = {'name': cookie['name'], 'value': cookie['value'], 'domain': cookie['domain'],
+                             'path': cookie['path'], 'secure': True, 'httpOnly': False}
+                if cookie.get('expires'):
+                    pw_cookie['expires'] = cookie['expires']
+                cookies.append(pw_cookie)
+            return cookies
+
+    def harvest_playwright(self, cookies) -> None:
+        """Pick up cookies read back from a Playwright context with ``context.cookies()``"""
+        with self._lock:
+            changed = False
+            for cookie in cookies:
+                if 'tixr.com' not in cookie.get('domain', ''):
+                    continue
+                expires = cookie.get('expires')
+                changed |= self._merge(cookie['name'], cookie['value'], cookie.get('domain'), cookie.get('path'),
+                                       expires if expires and expires > 0 else None, cookie.get('secure'), 'browser')
+            self._bump(changed)
@@ -0,0 +1,335 @@
+import os
+import json
+import time
+import bisect
+import socket
+import sqlite3
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    host TEXT,
+    pid INTEGER,
+    heartbeat_at REAL
+);
+CREATE TABLE IF NOT EXISTS rate_slots (
+    host TEXT PRIMARY KEY,
+    next_at REAL,
+    rate REAL,
+    paused_until REAL
+);
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id INTEGER NOT NULL,
+    sale_ids TEXT NOT NULL,
+    num_tickets INTEGER NOT NULL,
+    label TEXT,
+    display_name TEXT,
+    event_url TEXT,
+    collections TEXT,
+    worker_id TEXT,
+    detected_at REAL,
+    delivered_at REAL,
+    price REAL,
+    sales TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_detections_pending ON detections (delivered_at, id);
+CREATE TABLE IF NOT EXISTS alerts_sent (
+    event_id INTEGER NOT NULL,
+    sale_id INTEGER NOT NULL,
+    sent_at REAL,
+    PRIMARY KEY (event_id, sale_id)
+);
+"""
+
+def _hash(key) -> int:
+    return int.from_bytes(hashlib.blake2b(str(key).encode(), digest_size=8).digest(), 'big')
+
+class HashRing:
+    """Consistent hash ring mapping event ids to worker ids.
+
+    Each worker is placed at ``replicas`` points on the ring, so when a worker
+    joins or leaves only about ``1/len(workers)`` of the events move.
+    """
+
+    def __init__(self, nodes=(), replicas: int = 160):
+        self.replicas = replicas
+        self._points = []
+        self._owners = []
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node) -> None:
+        for replica in range(self.replicas):
+            point = _hash(f"{node}#{replica}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def node_for(self, key):
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+class ShardCoordinator:
+    """SQLite coordination table shared by the sharded poller's processes.
+
+    Workers heartbeat a lease row and poll only the events the hash ring of
+    live workers assigns them, so ownership rebalances as workers come and go.
+    Every request to a host takes the next shared slot (``reserve_slot``),
+    spaced at one adaptive rate stored here (see ``SharedRateLimiter``),
+    which bounds the combined request rate no matter how many workers run.
+    Workers record detections here instead of alerting; the single notifier
+    process drains them and suppresses repeats per sale within a cooldown.
+    Workers on other hosts can join by sharing the database file.
+    """
+
+    def __init__(self, path: str = None, worker_id: str = None, lease_ttl: float = None):
+        self.path = path or os.getenv('SHARD_DB', os.path.join('state', 'shards.db'))
+        self.worker_id = worker_id
+        self.lease_ttl = float(os.getenv('SHARD_LEASE_TTL', '30')) if lease_ttl is None else lease_ttl
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode so BEGIN IMMEDIATE can be issued explicitly
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(detections)')}
+        for column, kind in (('price', 'REAL'), ('sales', 'TEXT')):
+            if column not in columns:
+                self._conn.execute(f'ALTER TABLE detections ADD COLUMN {column} {kind}')
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(rate_slots)')}
+        for column in ('rate', 'paused_until'):
+            if column not in columns:
+                self._conn.execute(f'ALTER TABLE rate_slots ADD COLUMN {column} REAL')
+
+    def _transaction(self, work):
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = work()
+                self._conn.execute('COMMIT')
+                return result
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    # --- Worker leases ---
+
+    def heartbeat(self, now: float = None) -> None:
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO workers (worker_id, host, pid, heartbeat_at) VALUES (?, ?, ?, ?)',
+                (self.worker_id, socket.gethostname(), os.getpid(), now)
+            )
+
+    def release(self) -> None:
+        """Drop this worker's lease so its events move to the others right away"""
+        with self._lock:
+            self._conn.execute('DELETE FROM workers WHERE worker_id = ?', (self.worker_id,))
+
+    def live_workers(self, now: float = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT worker_id FROM workers WHERE heartbeat_at >= ? ORDER BY worker_id', (now - self.lease_ttl,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def owned(self, entries, now: float = None):
+        """The entries the ring of live workers assigns to this worker"""
+        ring = HashRing(self.live_workers(now))
+        return [entry for entry in entries if ring.node_for(entry.event_id) == self.worker_id]
+
+    # --- Shared request pacing ---
+
+    def _slot(self, host: str, rate: float):
+        row = self._conn.execute('SELECT next_at, rate, paused_until FROM rate_slots WHERE host = ?', (host,)).fetchone()
+        next_at, stored_rate, paused_until = row if row else (None, None, None)
+        return next_at or 0.0, stored_rate or rate, paused_until or 0.0
+
+    def reserve_slot(self, host: str, rate: float) -> float:
+        """Reserve the next request slot for ``host`` across all processes; returns seconds until it.
+
+        Slots are spaced at the shared adaptive rate of ``host`` (``rate`` until
+        one is stored) and none start before a ``Retry-After`` pause ends.
+        """
+        def work():
+            now = time.time()
+            next_at, current, paused_until = self._slot(host, rate)
+            slot = max(now, next_at, paused_until)
+            self._conn.execute('INSERT OR REPLACE INTO rate_slots (host, next_at, rate, paused_until) VALUES (?, ?, ?, ?)',
+                               (host, slot + 1.0 / current, current, paused_until))
+            return slot - now
+
+        return self._transaction(work)
+
+    def adapt_rate(self, host: str, rate: float, adapt) -> float:
+        """Replace the shared rate of ``host`` with ``adapt(rate, paused_until)``'s ``(rate, paused_until)``; returns it"""
+        def work():
+            next_at, current, paused_until = self._slot(host, rate)
+            current, paused_until = adapt(current, paused_until)
+            self._conn.execute('INSERT OR REPLACE INTO rate_slots (host, next_at, rate, paused_until) VALUES (?, ?, ?, ?)',
+                               (host, next_at, current, paused_until))
+            return current
+
+        return self._transaction(work)
+
+    def host_rate(self, host: str, rate: float) -> float:
+        """The shared adaptive rate of ``host`` (``rate`` until one is stored)"""
+        with self._lock:
+            return self._slot(host, rate)[1]
+
+    # --- Detections ---
+
+    def report_detection(self, entry, event_url, num_tickets, sales=(), detected_at: float = None) -> None:
+        """Queue a detection of ``sales`` (summary dicts with ``id``, ``name``, ``price``, ``quantity``) for the notifier"""
+        sales = [{key: sale.get(key) for key in ('id', 'name', 'price', 'quantity')} for sale in sales]
+        prices = [sale['price'] for sale in sales if sale['price'] is not None]
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO detections (event_id, sale_ids, num_tickets, label, display_name, event_url, collections,'
+                ' worker_id, detected_at, price, sales) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (entry.event_id, json.dumps(sorted(sale['id'] for sale in sales)), num_tickets, entry.label,
+                 entry.display_name, event_url, json.dumps(list(entry.collections)), self.worker_id,
+                 time.time() if detected_at is None else detected_at, min(prices) if prices else None,
+                 json.dumps(sales))
+            )
+        logger.info(f"Detection for {entry.display_name} queued for the notifier")
+
+    def pending_detections(self, limit: int = 100):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, event_id, sale_ids, num_tickets, label, display_name, event_url, collections, worker_id,'
+                ' detected_at, price, sales FROM detections WHERE delivered_at IS NULL ORDER BY id LIMIT ?', (limit,)
+            ).fetchall()
+        columns = ('id', 'event_id', 'sale_ids', 'num_tickets', 'label', 'display_name', 'event_url', 'collections',
+                   'worker_id', 'detected_at', 'price', 'sales')
+        detections = []
+        for row in rows:
+            detection = dict(zip(columns, row))
+            detection['sale_ids'] = json.loads(detection['sale_ids'])
+            detection['collections'] = json.loads(detection['collections'])
+            detection['sales'] = json.loads(detection['sales'] or '[]')
+            detections.append(detection)
+        return detections
+
+    def _fresh(self, detection, cooldown: float, now: float):
+        fresh = []
+        for sale_id in detection['sale_ids'] or [0]:
+            row = self._conn.execute(
+                'SELECT sent_at FROM alerts_sent WHERE event_id = ? AND sale_id = ?', (detection['event_id'], sale_id)
+            ).fetchone()
+            if row is None or now - row[0] >= cooldown:
+                fresh.append(sale_id)
+        return fresh
+
+    def fresh_sale_ids(self, detection, cooldown: float, now: float = None):
+        """The sale ids ``claim`` would return, without marking anything"""
+        with self._lock:
+            return self._fresh(detection, cooldown, time.time() if now is None else now)
+
+    def claim(self, detection, cooldown: float, now: float = None):
+        """Mark ``detection`` delivered and return the sale ids not alerted within ``cooldown``.
+
+        Detections without sale ids (HTML fallback hits) are tracked under
+        sale id 0 for their event. An empty result means the alert is a
+        duplicate, e.g. two workers saw the same flip while ownership moved.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                fresh = self._fresh(detection, cooldown, now)
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO alerts_sent (event_id, sale_id, sent_at) VALUES (?, ?, ?)',
+                    [(detection['event_id'], sale_id, now) for sale_id in fresh]
+                )
+                self._conn.execute('UPDATE detections SET delivered_at = ? WHERE id = ?', (now, detection['id']))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return fresh
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class SharedRateLimiter:
+    """``AdaptiveRateLimiter`` for sharded workers, with its state in the coordination database.
+
+    Every request (each transport a check escalates through included) takes
+    the next slot of ``host`` through ``reserve_slot``, and every response
+    adapts one rate shared by all workers the same AIMD way, so the fleet as
+    a whole stays within ``TIXR_RATE`` and slows down together on 403/429.
+    """
+
+    def __init__(self, coordinator: ShardCoordinator, host: str, rate: float, min_rate: float = 0.05,
+                 max_rate: float = None, increase: float = 0.1, decrease: float = 0.5):
+        self.coordinator = coordinator
+        self.host = host
+        self.initial_rate = rate
+        self.max_rate = max_rate or rate
+        self.min_rate = min(min_rate, self.max_rate)
+        self.increase = increase
+        self.decrease = decrease
+        self._lock = threading.Lock()
+        self.stats = {'acquired': 0, 'waited_seconds': 0.0, 'throttled': 0}
+
+    @classmethod
+    def from_env(cls, coordinator: ShardCoordinator, host: str):
+        """Shared limiter for ``host`` from TIXR_RATE/TIXR_MIN_RATE/TIXR_RATE_STEP"""
+        return cls(
+            coordinator, host,
+            rate=float(os.getenv('TIXR_RATE', '2')),
+            min_rate=float(os.getenv('TIXR_MIN_RATE', '0.05')),
+            increase=float(os.getenv('TIXR_RATE_STEP', '0.1')),
+        )
+
+    @property
+    def rate(self) -> float:
+        return self.coordinator.host_rate(self.host, self.initial_rate)
+
+    def acquire(self) -> float:
+        """Block until this process's shared slot comes up; returns the seconds waited"""
+        wait = self.coordinator.reserve_slot(self.host, self.initial_rate)
+        if wait > 0:
+            time.sleep(wait)
+        with self._lock:
+            self.stats['acquired'] += 1
+            self.stats['waited_seconds'] += max(0.0, wait)
+        return max(0.0, wait)
+
+    def record(self, status_code, retry_after: float = None) -> None:
+        """Adapt the shared rate to a response; ``None`` (no response) leaves it unchanged"""
+        if status_code in (403, 429):
+            def adapt(rate, paused_until):
+                if retry_after:
+                    paused_until = max(paused_until, time.time() + retry_after)
+                return max(self.min_rate, rate * self.decrease), paused_until
+
+            rate = self.coordinator.adapt_rate(self.host, self.initial_rate, adapt)
+            with self._lock:
+                self.stats['throttled'] += 1
+            logger.warning(f"Tixr returned {status_code}; shared request rate now {rate:.2f}/s"
+                           + (f", paused {retry_after:.0f}s" if retry_after else ""))
+        elif status_code is not None and status_code < 400:
+            self.coordinator.adapt_rate(self.host, self.initial_rate,
+                                        lambda rate, paused_until: (min(self.max_rate, rate + self.increase), paused_until))
+
+    def report(self) -> str:
+        with self._lock:
+            stats = dict(self.stats)
+        return (f"shared_rate={self.rate:.2f}/s acquired={stats['acquired']} "
+                f"waited={stats['waited_seconds']:.1f}s throttled={stats['throttled']}")
@@ -0,0 +1,136 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class SaleStateStore:
+    """Persistent last-seen ``state``/``resaleState`` per sale, used to alert only on transitions.
+
+    Rows live in SQLite keyed by ``(event_id, sale_id)``. Opening the store does
+    no scanning; each event's rows are read with one indexed query the first
+    time that event is seen and cached in memory afterwards.
+    """
+
+    def __init__(self, path: str = None, cooldown: float = None):
+        self.path = path or os.getenv('STATE_DB', os.path.join('state', 'monitor_state.db'))
+        self.cooldown = float(os.getenv('ALERT_COOLDOWN', '300')) if cooldown is None else cooldown
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS sale_state ('
+            ' event_id INTEGER NOT NULL,'
+            ' sale_id INTEGER NOT NULL,'
+            ' state TEXT,'
+            ' resale_state TEXT,'
+            ' last_alert_at REAL,'
+            ' updated_at REAL,'
+            ' PRIMARY KEY (event_id, sale_id))'
+        )
+        self._conn.commit()
+        self._cache = {}
+
+    def _load_event(self, event_id):
+        rows = self._conn.execute(
+            'SELECT sale_id, state, resale_state, last_alert_at FROM sale_state WHERE event_id = ?',
+            (event_id,)
+        ).fetchall()
+        cached = {sale_id: (state, resale_state, last_alert_at) for sale_id, state, resale_state, last_alert_at in rows}
+        self._cache[event_id] = cached
+        return cached
+
+    def record(self, event_id, sales, now: float = None, changes: list = None, before_commit=None):
+        """Store the latest state of ``sales`` and return those that should alert.
+
+        ``sales`` are dicts with ``id``, ``state`` and ``resaleState`` (a sale
+        without ``state``, e.g. from a page marker, keeps its stored one). A sale
+        alerts when its ``resaleState`` becomes ``AVAILABLE`` (including sale ids
+        seen for the first time) and it has not alerted within the cooldown.
+        When ``changes`` is given, a description of every ``state`` or
+        ``resaleState`` change and of every new sale id of an already known
+        event is appended to it.
+
+        When there are alerts and ``before_commit`` is given, it is called with
+        them and a transition id before anything is stored, so they can be
+        queued first and a crash in between replays them instead of losing
+        them. The id names each alerting sale with its previous alert time: a
+        replay of the same transition gets the same id, every later one a new
+        id. If ``before_commit`` raises, nothing is stored.
+        """
+        now = time.time() if now is None else now
+        alerts = []
+        transition = []
+        staged = {}
+        updates = []
+        with self._lock:
+            known = self._cache.get(event_id)
+            if known is None:
+                known = self._load_event(event_id)
+            seen_before = bool(known)
+
+            for sale in sales:
+                sale_id = sale.get('id')
+                previous = known.get(sale_id)
+                state = sale.get('state', previous[0] if previous else '')
+                resale_state = sale.get('resaleState', '')
+                last_alert_at = previous[2] if previous else None
+                if changes is not None:
+                    if previous is None:
+                        if seen_before:
+                            changes.append(f"new sale {sale_id}")
+                    else:
+                        if previous[0] != state:
+                            changes.append(f"sale {sale_id} state {previous[0]}->{state}")
+                        if previous[1] != resale_state:
+                            changes.append(f"sale {sale_id} resaleState {previous[1]}->{resale_state}")
+
+                became_available = resale_state == 'AVAILABLE' and (previous is None or previous[1] != 'AVAILABLE')
+                cooled_down = last_alert_at is None or now - last_alert_at >= self.cooldown
+                if became_available:
+                    if cooled_down:
+                        alerts.append(sale)
+                        transition.append((sale_id, last_alert_at or 0.0))
+                        last_alert_at = now
+                    else:
+                        logger.info(f"Sale {sale_id} flipped to AVAILABLE within {self.cooldown:.0f}s cooldown; not alerting")
+
+                if previous is None or previous[:2] != (state, resale_state) or last_alert_at != previous[2]:
+                    staged[sale_id] = (state, resale_state, last_alert_at)
+                    updates.append((event_id, sale_id, state, resale_state, last_alert_at, now))
+
+            if alerts and before_commit is not None:
+                before_commit(alerts, ','.join(f"{sale_id}@{since:.6f}" for sale_id, since in sorted(transition)))
+            known.update(staged)
+            if updates:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO sale_state (event_id, sale_id, state, resale_state, last_alert_at, updated_at)'
+                    ' VALUES (?, ?, ?, ?, ?, ?)',
+                    updates
+                )
+                self._conn.commit()
+        return alerts
+
+    def resale_state(self, event_id, sale_id):
+        """The stored ``resaleState`` of a sale, or None if it was never recorded"""
+        with self._lock:
+            known = self._cache.get(event_id)
+            if known is None:
+                known = self._load_event(event_id)
+            previous = known.get(sale_id)
+        return previous[1] if previous else None
+
+    def forget(self, event_id) -> None:
+        """Drop the cached rows of ``event_id`` so the next ``record`` rereads them (another process may have written)"""
+        with self._lock:
+            self._cache.pop(event_id, None)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
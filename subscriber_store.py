@@ -0,0 +1,298 @@
+import os
+import time
+import sqlite3
+import threading
+
+from filter_index import FilterIndex, SubscriberFilter
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscribers (
+    chat_id TEXT PRIMARY KEY,
+    registered_at REAL
+);
+CREATE TABLE IF NOT EXISTS subscriber_filters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id TEXT NOT NULL,
+    event_id INTEGER,
+    collection TEXT NOT NULL DEFAULT '',
+    sale TEXT NOT NULL DEFAULT '',
+    max_price REAL,
+    min_quantity INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_filters_chat ON subscriber_filters (chat_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Personal data lives in its own database, which is never committed (see SubscriberStore)
+PRIVATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS private.subscriber_emails (
+    chat_id TEXT PRIMARY KEY,
+    email TEXT NOT NULL
+);
+"""
+
+class SubscriberStore:
+    """SQLite-backed subscriber list with per-user event/collection preferences.
+
+    Lookups hit the ``chat_id`` primary key. Registrations and removals are
+    buffered in memory and written in one transaction by ``flush``, so a batch
+    of Telegram updates costs a single commit.
+
+    A subscriber with no filters receives alerts for every event; otherwise
+    only for detections matching one of their filters (event, collection,
+    sale, max price, min quantity). Alert routing goes through an in-memory
+    ``FilterIndex`` loaded on first use and kept in step with every change.
+
+    Alert email addresses are kept apart in ``email_path``
+    (``SUBSCRIBER_EMAIL_DB``, default ``state/subscriber_emails.db``), attached
+    to the same connection, and no names are stored, so the subscriber
+    database itself only holds chat ids, filters and bot metadata and can be
+    committed to the repository.
+    """
+
+    MAX_FILTERS_PER_CHAT = 20
+
+    def __init__(self, path: str = None, legacy_file: str = 'chat_ids.txt', email_path: str = None):
+        self.path = path or os.getenv('SUBSCRIBER_DB', 'subscribers.db')
+        self.email_path = email_path or os.getenv('SUBSCRIBER_EMAIL_DB', os.path.join('state', 'subscriber_emails.db'))
+        directory = os.path.dirname(self.email_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('ATTACH DATABASE ? AS private', (self.email_path,))
+        self._conn.executescript(SCHEMA + PRIVATE_SCHEMA)
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(subscribers)')}
+        if 'email' in columns or 'first_name' in columns:
+            self._scrub_personal_data(columns)
+        if self._conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'subscriber_watches'").fetchone():
+            # Event/collection watches predate filters; carry them over once
+            self._conn.execute('INSERT INTO subscriber_filters (chat_id, event_id, collection)'
+                               ' SELECT chat_id, event_id, collection FROM subscriber_watches')
+            self._conn.execute('DROP TABLE subscriber_watches')
+        self._conn.commit()
+        self._index = None
+        self._pending_adds = {}
+        self._pending_removes = set()
+        if legacy_file:
+            self.import_chat_ids_file(legacy_file)
+
+    def _scrub_personal_data(self, columns) -> None:
+        """Clear the ``email`` (moved to the private database) and ``first_name`` columns of older versions"""
+        cleared = 0
+        with self._conn:
+            if 'email' in columns:
+                self._conn.execute('INSERT OR IGNORE INTO private.subscriber_emails (chat_id, email)'
+                                   ' SELECT chat_id, email FROM subscribers WHERE email IS NOT NULL')
+                moved = self._conn.execute('UPDATE subscribers SET email = NULL WHERE email IS NOT NULL').rowcount
+                if moved:
+                    print(f"Moved {moved} subscriber email(s) to {self.email_path}")
+                cleared += moved
+            if 'first_name' in columns:
+                cleared += self._conn.execute(
+                    'UPDATE subscribers SET first_name = NULL WHERE first_name IS NOT NULL').rowcount
+        if cleared:
+            # Rewrite the file so the old values do not linger in free pages
+            self._conn.execute('VACUUM main')
+
+    def import_chat_ids_file(self, path: str) -> int:
+        """One-time import of the old newline-separated ``chat_ids.txt``; returns rows added"""
+        with self._lock:
+            if self.get_meta('imported_chat_ids') or not os.path.exists(path):
+                return 0
+            with open(path, 'r') as f:
+                chat_ids = [line.strip() for line in f if line.strip()]
+            now = time.time()
+            cursor = self._conn.executemany(
+                'INSERT OR IGNORE INTO subscribers (chat_id, registered_at) VALUES (?, ?)',
+                [(chat_id, now) for chat_id in chat_ids]
+            )
+            self._conn.execute(
+                'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', ('imported_chat_ids', path)
+            )
+            self._conn.commit()
+            print(f"Imported {cursor.rowcount} chat IDs from {path}")
+            return cursor.rowcount
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value) -> None:
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+            self._conn.commit()
+
+    def is_subscribed(self, chat_id) -> bool:
+        chat_id = str(chat_id)
+        with self._lock:
+            if chat_id in self._pending_adds:
+                return True
+            if chat_id in self._pending_removes:
+                return False
+            row = self._conn.execute('SELECT 1 FROM subscribers WHERE chat_id = ?', (chat_id,)).fetchone()
+        return row is not None
+
+    def add(self, chat_id) -> bool:
+        """Queue a registration; returns False if the chat is already subscribed"""
+        chat_id = str(chat_id)
+        with self._lock:
+            if self.is_subscribed(chat_id):
+                return False
+            self._pending_removes.discard(chat_id)
+            self._pending_adds[chat_id] = time.time()
+        return True
+
+    def remove(self, chat_id) -> bool:
+        """Queue an unregistration; returns False if the chat was not subscribed"""
+        chat_id = str(chat_id)
+        with self._lock:
+            if not self.is_subscribed(chat_id):
+                return False
+            self._pending_adds.pop(chat_id, None)
+            self._pending_removes.add(chat_id)
+        return True
+
+    def flush(self) -> None:
+        """Write all queued registrations and removals in one transaction"""
+        with self._lock:
+            if not self._pending_adds and not self._pending_removes:
+                return
+            with self._conn:
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO subscribers (chat_id, registered_at) VALUES (?, ?)',
+                    list(self._pending_adds.items())
+                )
+                removed = [(chat_id,) for chat_id in self._pending_removes]
+                self._conn.executemany('DELETE FROM subscribers WHERE chat_id = ?', removed)
+                self._conn.executemany('DELETE FROM subscriber_filters WHERE chat_id = ?', removed)
+                self._conn.executemany('DELETE FROM private.subscriber_emails WHERE chat_id = ?', removed)
+            if self._index is not None:
+                for chat_id in self._pending_adds:
+                    self._index.add_subscriber(chat_id)
+                for chat_id in self._pending_removes:
+                    self._index.remove_subscriber(chat_id)
+            print(f"Subscriber store: {len(self._pending_adds)} added, {len(self._pending_removes)} removed")
+            self._pending_adds.clear()
+            self._pending_removes.clear()
+
+    def list_chat_ids(self):
+        self.flush()
+        with self._lock:
+            return [row[0] for row in self._conn.execute('SELECT chat_id FROM subscribers ORDER BY registered_at')]
+
+    def set_email(self, chat_id, email) -> bool:
+        """Set (or with ``None`` clear) a subscriber's alert email; False if not subscribed"""
+        self.flush()
+        chat_id = str(chat_id)
+        with self._lock, self._conn:
+            if not self.is_subscribed(chat_id):
+                return False
+            if email is None:
+                self._conn.execute('DELETE FROM private.subscriber_emails WHERE chat_id = ?', (chat_id,))
+            else:
+                self._conn.execute('INSERT OR REPLACE INTO private.subscriber_emails (chat_id, email) VALUES (?, ?)',
+                                   (chat_id, email))
+        return True
+
+    def get_email(self, chat_id):
+        with self._lock:
+            row = self._conn.execute('SELECT email FROM private.subscriber_emails WHERE chat_id = ?',
+                                     (str(chat_id),)).fetchone()
+        return row[0] if row else None
+
+    def emails_for(self, event_id=None, collections=(), sales=()):
+        """Email addresses of the subscribers ``subscribers_for`` would alert"""
+        chat_ids = self.subscribers_for(event_id, collections, sales)
+        if not chat_ids:
+            return []
+        emails = []
+        with self._lock:
+            for start in range(0, len(chat_ids), 500):
+                chunk = chat_ids[start:start + 500]
+                placeholders = ', '.join('?' for _ in chunk)
+                emails.extend(row[0] for row in self._conn.execute(
+                    f'SELECT email FROM private.subscriber_emails WHERE chat_id IN ({placeholders})', chunk
+                ))
+        return emails
+
+    def _filter_index(self) -> FilterIndex:
+        """The filter index, loaded from the database on first use (callers hold the lock, after ``flush``)"""
+        if self._index is None:
+            index = FilterIndex()
+            for (chat_id,) in self._conn.execute('SELECT chat_id FROM subscribers'):
+                index.add_subscriber(chat_id)
+            for row in self._conn.execute(
+                    'SELECT id, chat_id, event_id, collection, sale, max_price, min_quantity FROM subscriber_filters'):
+                index.add_filter(SubscriberFilter(*row))
+            self._index = index
+        return self._index
+
+    def add_filter(self, chat_id, event_id=None, collection='', sale='', max_price=None, min_quantity=None):
+        """Add an alert filter for a subscriber; returns it, or None if not subscribed or at the filter limit"""
+        self.flush()
+        chat_id = str(chat_id)
+        with self._lock:
+            index = self._filter_index()
+            if chat_id not in index.subscribers or len(index.by_chat.get(chat_id, ())) >= self.MAX_FILTERS_PER_CHAT:
+                return None
+            with self._conn:
+                cursor = self._conn.execute(
+                    'INSERT INTO subscriber_filters (chat_id, event_id, collection, sale, max_price, min_quantity)'
+                    ' VALUES (?, ?, ?, ?, ?, ?)',
+                    (chat_id, event_id, collection or '', sale or '', max_price, min_quantity)
+                )
+            f = SubscriberFilter(cursor.lastrowid, chat_id, event_id, collection or '', sale or '', max_price,
+                                 min_quantity)
+            index.add_filter(f)
+        return f
+
+    def remove_filter(self, chat_id, filter_id) -> bool:
+        """Remove one of a subscriber's filters by id; False if they have no such filter"""
+        chat_id = str(chat_id)
+        with self._lock:
+            index = self._filter_index()
+            if filter_id not in index.by_chat.get(chat_id, ()):
+                return False
+            with self._conn:
+                self._conn.execute('DELETE FROM subscriber_filters WHERE id = ?', (filter_id,))
+            index.remove_filter(filter_id)
+        return True
+
+    def clear_filters(self, chat_id) -> int:
+        """Remove all of a subscriber's filters; returns how many there were"""
+        chat_id = str(chat_id)
+        with self._lock:
+            index = self._filter_index()
+            filter_ids = list(index.by_chat.get(chat_id, ()))
+            with self._conn:
+                self._conn.execute('DELETE FROM subscriber_filters WHERE chat_id = ?', (chat_id,))
+            for filter_id in filter_ids:
+                index.remove_filter(filter_id)
+        return len(filter_ids)
+
+    def get_filters(self, chat_id):
+        """A subscriber's filters, oldest first"""
+        self.flush()
+        with self._lock:
+            return self._filter_index().filters_of(str(chat_id))
+
+    def subscribers_for(self, event_id=None, collections=(), sales=()):
+        """Chat ids that should hear about ``sales`` of ``event_id`` in ``collections``.
+
+        Everyone without filters, plus those with a filter matching the event,
+        collection and at least one of the sales (see ``FilterIndex.match``).
+        With no ``event_id`` everyone is returned.
+        """
+        self.flush()
+        with self._lock:
+            return list(self._filter_index().match(event_id, collections, sales))
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._conn.close()
@@ -1,43 +1,183 @@
-import requests
 import os
 import json
-import subprocess
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import http_client
+import metrics
+
+# Telegram allows roughly 30 messages/second overall and 1/second per chat
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', '30'))
+TELEGRAM_PER_CHAT_INTERVAL = float(os.getenv('TELEGRAM_PER_CHAT_INTERVAL', '1.0'))
+TELEGRAM_FANOUT_WORKERS = int(os.getenv('TELEGRAM_FANOUT_WORKERS', '16'))
+TELEGRAM_MAX_RETRIES = 3
+TELEGRAM_TIMEOUT = (5, 15)
+TELEGRAM_API_BASE = os.getenv('TELEGRAM_API_BASE', 'https://api.telegram.org').rstrip('/')
+
+class TokenBucket:
+    """Thread-safe token bucket; ``acquire`` blocks until a token is available"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+_global_bucket = TokenBucket(TELEGRAM_GLOBAL_RATE)
+_chat_last_sent = {}
+_chat_lock = threading.Lock()
+_session = None
+_session_lock = threading.Lock()
+
+def get_telegram_session():
+    """Return the shared pooled Telegram session, one keep-alive connection per fan-out worker"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = http_client.new_session('telegram', pool_maxsize=TELEGRAM_FANOUT_WORKERS, timeout=TELEGRAM_TIMEOUT)
+        return _session
+
+def wait_for_chat_slot(chat_id):
+    """Block until ``chat_id`` may receive another message under the per-chat limit"""
+    while True:
+        with _chat_lock:
+            now = time.monotonic()
+            ready_at = _chat_last_sent.get(chat_id, 0) + TELEGRAM_PER_CHAT_INTERVAL
+            if now >= ready_at:
+                _chat_last_sent[chat_id] = now
+                return
+            wait = ready_at - now
+        time.sleep(wait)
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_subscriber_store():
+    """Return the shared subscriber store, importing chat_ids.txt on first use"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            from subscriber_store import SubscriberStore
+            _store = SubscriberStore()
+        return _store
 
 def load_chat_ids():
-    """Load chat IDs from file, return as list"""
-    try:
-        with open('chat_ids.txt', 'r') as f:
-            chat_ids = [line.strip() for line in f.readlines() if line.strip()]
-            return chat_ids
-    except FileNotFoundError:
-        return []
-
-def save_chat_ids(chat_ids):
-    """Save chat IDs to file and commit to git"""
-    try:
-        # Write to file
-        with open('chat_ids.txt', 'w') as f:
-            for chat_id in chat_ids:
-                f.write(f"{chat_id}\n")
+    """Return all registered chat IDs as a list"""
+    return get_subscriber_store().list_chat_ids()
+
+def handle_update(bot_token, update):
+    """Dispatch the bot command in a single Telegram update"""
+    message = update.get('message') or {}
+    chat_id = message.get('chat', {}).get('id')
+    text = (message.get('text') or '').strip()
+    first_name = message.get('from', {}).get('first_name', 'User')
+    
+    if chat_id and text:
+        if text.lower() == '/register':
+            handle_registration(bot_token, chat_id, first_name)
+        elif text.lower() == '/unregister':
+            handle_unregistration(bot_token, chat_id, first_name)
+        elif text.lower() == '/status':
+            handle_status_check(bot_token, chat_id)
+        elif text.lower().split()[0] == '/email':
+            handle_email(bot_token, chat_id, text)
+        elif text.lower().split()[0] == '/filter':
+            handle_filter(bot_token, chat_id, text)
+
+def get_update_offset():
+    """Return the next update id to request, as durably stored in the subscriber store"""
+    return int(get_subscriber_store().get_meta('telegram_update_offset', 0))
+
+# Serializes update handling: webhook updates arrive on concurrent server threads
+_updates_lock = threading.Lock()
+# Ids of recently handled webhook updates, to drop Telegram's redeliveries
+_recent_webhook_updates = OrderedDict()
+RECENT_WEBHOOK_UPDATES = 1000
+
+def handle_updates(bot_token, updates):
+    """Process a ``getUpdates`` batch, then persist changes and advance the stored offset.
+
+    The offset is only stored after the batch is handled, so a crash replays
+    the batch instead of dropping it. Updates older than the stored offset
+    are ignored.
+    """
+    with _updates_lock:
+        store = get_subscriber_store()
+        offset = get_update_offset()
+        for update in updates:
+            update_id = update.get('update_id', 0)
+            if update_id < offset:
+                continue
+            try:
+                handle_update(bot_token, update)
+            except Exception as e:
+                print(f"Error handling Telegram update {update_id}: {e}")
+            offset = update_id + 1
         
-        # Commit to git
-        subprocess.run(['git', 'config', '--local', 'user.email', 'action@github.com'], check=True)
-        subprocess.run(['git', 'config', '--local', 'user.name', 'GitHub Action'], check=True)
-        subprocess.run(['git', 'add', 'chat_ids.txt'], check=True)
+        # Persist every registration change from this batch in one write
+        store.flush()
+        store.set_meta('telegram_update_offset', offset)
+        return offset
+
+def handle_webhook_update(bot_token, update):
+    """Process one webhook update unless it was handled recently; returns whether it was handled.
+
+    Webhook updates can arrive out of order and are never re-polled, so the
+    ``getUpdates`` offset does not apply; repeats are dropped by ``update_id``.
+    """
+    update_id = update.get('update_id')
+    with _updates_lock:
+        if update_id is not None and update_id in _recent_webhook_updates:
+            return False
+        try:
+            handle_update(bot_token, update)
+        except Exception as e:
+            print(f"Error handling Telegram update {update_id}: {e}")
+        get_subscriber_store().flush()
+        if update_id is not None:
+            _recent_webhook_updates[update_id] = True
+            while len(_recent_webhook_updates) > RECENT_WEBHOOK_UPDATES:
+                _recent_webhook_updates.popitem(last=False)
+        return True
+
+def fetch_updates(bot_token, offset=0, timeout=0):
+    """Call getUpdates from ``offset``, long-polling for up to ``timeout`` seconds"""
+    telegram_url = f"{TELEGRAM_API_BASE}/bot{bot_token}/getUpdates"
+    params = {'timeout': timeout, 'allowed_updates': json.dumps(['message'])}
+    if offset:
+        params['offset'] = offset
+    response = get_telegram_session().get(telegram_url, params=params, timeout=(5, timeout + 10))
+    
+    if response.status_code != 200:
+        print(f"Failed to get Telegram updates: {response.status_code}")
+        return None
         
-        # Only commit if there are changes
-        result = subprocess.run(['git', 'diff', '--cached', '--quiet'], capture_output=True)
-        if result.returncode != 0:  # There are changes to commit
-            subprocess.run(['git', 'commit', '-m', 'Update registered chat IDs'], check=True)
-            subprocess.run(['git', 'push'], check=True)
-            print("Chat IDs updated and committed to repository")
-        else:
-            print("No changes to chat IDs")
-            
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to commit chat IDs: {e}")
-    except Exception as e:
-        print(f"Error saving chat IDs: {e}")
+    data = response.json()
+    
+    if not data.get('ok'):
+        print("Telegram API error")
+        return None
+    return data.get('result', [])
 
 def check_telegram_registrations():
     """Check for new /register commands and manage subscriber list"""
@@ -48,136 +188,326 @@ def check_telegram_registrations():
         return
     
     try:
-        # Get updates from Telegram
-        telegram_url = f"https://api.telegram.org/bot{bot_token}/getUpdates"
-        response = requests.get(telegram_url)
-        
-        if response.status_code != 200:
-            print(f"Failed to get Telegram updates: {response.status_code}")
-            return
-            
-        data = response.json()
-        
-        if not data.get('ok'):
-            print("Telegram API error")
-            return
-            
-        # Process each message
-        for update in data.get('result', []):
-            message = update.get('message', {})
-            chat_id = message.get('chat', {}).get('id')
-            text = message.get('text', '').strip()
-            first_name = message.get('from', {}).get('first_name', 'User')
-            
-            if chat_id and text:
-                if text.lower() == '/register':
-                    handle_registration(bot_token, chat_id, first_name)
-                elif text.lower() == '/unregister':
-                    handle_unregistration(bot_token, chat_id, first_name)
-                elif text.lower() == '/status':
-                    handle_status_check(bot_token, chat_id)
-        
-        # Mark all updates as read by getting them with offset
-        if data.get('result'):
-            last_update_id = data['result'][-1]['update_id']
-            mark_read_url = f"https://api.telegram.org/bot{bot_token}/getUpdates?offset={last_update_id + 1}"
-            requests.get(mark_read_url)
-            
+        updates = fetch_updates(bot_token, get_update_offset())
+        if updates:
+            handle_updates(bot_token, updates)
     except Exception as e:
         print(f"Error checking Telegram registrations: {e}")
 
+class TelegramUpdateConsumer(threading.Thread):
+    """Background thread that handles bot commands as they arrive.
+
+    By default it long-polls ``getUpdates``; with ``webhook_port`` set it
+    instead serves a local HTTP endpoint for Telegram webhooks (put it behind
+    a TLS proxy and register it with ``setWebhook``). Either way the poller
+    thread is never blocked by bot traffic.
+    """
+
+    def __init__(self, bot_token, poll_timeout=25, webhook_port=None, webhook_secret=None):
+        super().__init__(name='telegram-updates', daemon=True)
+        self.bot_token = bot_token
+        self.poll_timeout = poll_timeout
+        self.webhook_port = webhook_port
+        self.webhook_secret = webhook_secret
+        self._stopping = threading.Event()
+        self._server = None
+
+    def run(self):
+        if self.webhook_port:
+            self._serve_webhook()
+        else:
+            self._long_poll()
+
+    def _long_poll(self):
+        print(f"Telegram long polling started (timeout={self.poll_timeout}s)")
+        failures = 0
+        while not self._stopping.is_set():
+            try:
+                updates = fetch_updates(self.bot_token, get_update_offset(), self.poll_timeout)
+                if updates is None:
+                    raise RuntimeError("getUpdates failed")
+                if updates:
+                    handle_updates(self.bot_token, updates)
+                failures = 0
+            except Exception as e:
+                failures += 1
+                wait = min(2 ** failures, 60)
+                print(f"Telegram update polling error: {e}; retrying in {wait}s")
+                self._stopping.wait(wait)
+
+    def _serve_webhook(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        consumer = self
+
+        class WebhookHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if consumer.webhook_secret and self.headers.get('X-Telegram-Bot-Api-Secret-Token') != consumer.webhook_secret:
+                    self.send_response(403)
+                    self.end_headers()
+                    return
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    update = json.loads(self.rfile.read(length) or b'{}')
+                    handle_webhook_update(consumer.bot_token, update)
+                    self.send_response(200)
+                except Exception as e:
+                    print(f"Error handling webhook update: {e}")
+                    self.send_response(500)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', self.webhook_port), WebhookHandler)
+        print(f"Telegram webhook server listening on 127.0.0.1:{self.webhook_port}")
+        self._server.serve_forever()
+
+    def stop(self, timeout=2.0):
+        """Ask the consumer to stop; an in-flight long poll is abandoned after ``timeout``"""
+        self._stopping.set()
+        if self._server is not None:
+            self._server.shutdown()
+        self.join(timeout)
+
+def start_update_consumer():
+    """Start a TelegramUpdateConsumer configured from the environment, or return None"""
+    bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
+    if not bot_token:
+        print("No Telegram bot token configured")
+        return None
+    webhook_port = os.getenv('TELEGRAM_WEBHOOK_PORT')
+    consumer = TelegramUpdateConsumer(
+        bot_token,
+        poll_timeout=int(os.getenv('TELEGRAM_POLL_TIMEOUT', '25')),
+        webhook_port=int(webhook_port) if webhook_port else None,
+        webhook_secret=os.getenv('TELEGRAM_WEBHOOK_SECRET'),
+    )
+    consumer.start()
+    return consumer
+
 def handle_registration(bot_token, chat_id, first_name):
-    """Handle /register command and automatically add to chat_ids.txt"""
-    
-    # Load current chat IDs from file
-    chat_id_list = load_chat_ids()
-    chat_id_str = str(chat_id)
+    """Handle /register command and add the chat to the subscriber store"""
     
-    if chat_id_str in chat_id_list:
+    if not get_subscriber_store().add(chat_id):
         # Already registered
         message = f"Hi {first_name}! 👋\n\nYou're already registered for festival pass notifications. You'll get alerted when resale tickets become available!"
     else:
-        # New registration - add to list and save
-        chat_id_list.append(chat_id_str)
-        save_chat_ids(chat_id_list)
         message = f"Hi {first_name}! 👋\n\nYou've been successfully registered for festival pass notifications! 🎟️\n\nYou'll automatically get alerted when resale tickets become available. No further action needed!"
     
-    send_telegram_message(bot_token, chat_id, message)
+    send_telegram_message(bot_token, chat_id, message, parse_mode=None)
 
 def handle_unregistration(bot_token, chat_id, first_name):
-    """Handle /unregister command and automatically remove from chat_ids.txt"""
+    """Handle /unregister command and remove the chat from the subscriber store"""
     
-    # Load current chat IDs from file
-    chat_id_list = load_chat_ids()
-    chat_id_str = str(chat_id)
-    
-    if chat_id_str in chat_id_list:
-        # Remove from list and save
-        chat_id_list.remove(chat_id_str)
-        save_chat_ids(chat_id_list)
+    if get_subscriber_store().remove(chat_id):
         message = f"Hi {first_name}! 👋\n\nYou've been successfully unregistered from festival pass notifications.\n\nYou won't receive any more alerts. Send /register if you want to sign up again!"
     else:
         message = f"Hi {first_name}! 👋\n\nYou're not currently registered for notifications.\n\nSend /register to sign up for festival pass alerts!"
     
-    send_telegram_message(bot_token, chat_id, message)
+    send_telegram_message(bot_token, chat_id, message, parse_mode=None)
 
 def handle_status_check(bot_token, chat_id):
     """Handle /status command"""
-    chat_id_list = load_chat_ids()
-    
-    if str(chat_id) in chat_id_list:
-        message = "✅ You are registered for notifications!\n\nCommands:\n/register - Register for notifications\n/unregister - Unregister\n/status - Check registration status"
+    if get_subscriber_store().is_subscribed(chat_id):
+        message = "✅ You are registered for notifications!\n\nCommands:\n/register - Register for notifications\n/unregister - Unregister\n/status - Check registration status\n/email - Also get alerts by email\n/filter - Only get alerts you care about"
     else:
         message = "❌ You are not registered for notifications.\n\nSend /register to sign up!\n\nCommands:\n/register - Register for notifications\n/unregister - Unregister\n/status - Check registration status"
     
-    send_telegram_message(bot_token, chat_id, message)
+    send_telegram_message(bot_token, chat_id, message, parse_mode=None)
 
-def send_telegram_message(bot_token, chat_id, message):
-    """Send a message to a specific chat ID"""
-    try:
-        telegram_url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        payload = {
-            'chat_id': chat_id,
-            'text': message,
-            'parse_mode': 'Markdown'
-        }
-        
-        response = requests.post(telegram_url, json=payload)
-        if response.status_code == 200:
-            print(f"Response sent to chat ID {chat_id}")
+def handle_email(bot_token, chat_id, text):
+    """Handle /email <address> (or /email off) to set where email alerts go"""
+    store = get_subscriber_store()
+    parts = text.split()
+    if len(parts) != 2:
+        current = store.get_email(chat_id)
+        message = f"Your alert email is {current}." if current else "You have no alert email set."
+        message += "\n\nSend /email you@example.com to set one, or /email off to stop email alerts."
+    elif parts[1].lower() == 'off':
+        store.set_email(chat_id, None)
+        message = "📭 Email alerts turned off."
+    elif '@' not in parts[1]:
+        message = "That doesn't look like an email address. Try /email you@example.com"
+    elif store.set_email(chat_id, parts[1]):
+        message = f"📧 Email alerts will also go to {parts[1]}."
+    else:
+        message = "Send /register first, then set your email with /email."
+    
+    send_telegram_message(bot_token, chat_id, message, parse_mode=None)
+
+FILTER_HELP = ("Send /filter add with any of:\n"
+               "event=<id> collection=\"<name>\" sale=<id or name> max=<price> qty=<min tickets>\n"
+               "e.g. /filter add collection=\"Festival Passes\" max=300\n\n"
+               "/filter - List your filters\n/filter remove <number> - Remove one\n/filter clear - Get every alert again")
+
+def handle_filter(bot_token, chat_id, text):
+    """Handle /filter [add <conditions> | remove <number> | clear] to narrow which alerts a subscriber gets"""
+    from filter_index import parse_filter
+
+    store = get_subscriber_store()
+    parts = text.split(None, 2)
+    action = parts[1].lower() if len(parts) > 1 else ''
+    filters = store.get_filters(chat_id)
+    if not store.is_subscribed(chat_id):
+        message = "Send /register first, then add filters with /filter."
+    elif action == 'add':
+        try:
+            fields = parse_filter(parts[2] if len(parts) > 2 else '')
+        except ValueError as e:
+            message = f"{e}\n\n{FILTER_HELP}"
         else:
-            print(f"Failed to send response to {chat_id}: {response.text}")
-            
-    except Exception as e:
-        print(f"Error sending message to {chat_id}: {e}")
+            f = store.add_filter(chat_id, **fields)
+            if f is None:
+                message = f"You already have {len(filters)} filters; remove one first."
+            else:
+                message = f"🔎 Added filter: {f.describe()}.\n\nYou'll only get alerts matching one of your filters."
+    elif action == 'remove':
+        try:
+            f = filters[int(parts[2]) - 1] if len(parts) > 2 and int(parts[2]) > 0 else None
+        except (ValueError, IndexError):
+            f = None
+        if f is not None and store.remove_filter(chat_id, f.id):
+            message = f"Removed filter: {f.describe()}."
+        else:
+            message = "No such filter. Send /filter to list yours."
+    elif action == 'clear':
+        store.clear_filters(chat_id)
+        message = "Filters cleared; you'll get every alert."
+    elif filters:
+        lines = '\n'.join(f"{i}. {f.describe()}" for i, f in enumerate(filters, 1))
+        message = f"Your filters:\n{lines}\n\n{FILTER_HELP}"
+    else:
+        message = f"You have no filters and get every alert.\n\n{FILTER_HELP}"
+    
+    send_telegram_message(bot_token, chat_id, message, parse_mode=None)
+
+def escape_markdown(text) -> str:
+    """Escape the characters Telegram's legacy Markdown treats as markup (e.g. ``_`` in names and URLs)"""
+    return ''.join('\\' + char if char in '_*`[' else char for char in str(text))
+
+def markdown_bold(text) -> str:
+    """``text`` in bold; inside the entity only ``*`` is markup, and it has to close and reopen it"""
+    return '*' + str(text).replace('*', '*\\**') + '*'
+
+def send_telegram_message(bot_token, chat_id, message, parse_mode='Markdown'):
+    """Send a message to a specific chat ID, retrying 429s and transient failures.
+
+    Command replies, which quote user text, go out with ``parse_mode=None``;
+    Markdown messages must escape such text with ``escape_markdown``.
+    Returns True when Telegram accepted the message.
+    """
+    telegram_url = f"{TELEGRAM_API_BASE}/bot{bot_token}/sendMessage"
+    payload = {
+        'chat_id': chat_id,
+        'text': message,
+    }
+    if parse_mode:
+        payload['parse_mode'] = parse_mode
+    session = get_telegram_session()
+
+    for attempt in range(TELEGRAM_MAX_RETRIES + 1):
+        try:
+            _global_bucket.acquire()
+            response = session.post(telegram_url, json=payload, timeout=TELEGRAM_TIMEOUT)
+            if response.status_code == 200:
+                print(f"Response sent to chat ID {chat_id}")
+                metrics.TELEGRAM_SENDS.inc(result='sent')
+                return True
+            if response.status_code == 429:
+                try:
+                    retry_after = response.json().get('parameters', {}).get('retry_after', 1)
+                except ValueError:
+                    retry_after = 1
+                print(f"Rate limited sending to {chat_id}; retrying after {retry_after}s")
+                metrics.TELEGRAM_SENDS.inc(result='rate_limited')
+                time.sleep(retry_after)
+                continue
+            if response.status_code < 500:
+                # 4xx other than 429 (blocked bot, bad chat id) will not succeed on retry
+                print(f"Failed to send response to {chat_id}: {response.text}")
+                metrics.TELEGRAM_SENDS.inc(result='rejected')
+                return False
+            print(f"Telegram error {response.status_code} for {chat_id} (attempt {attempt + 1})")
+        except Exception as e:
+            print(f"Error sending message to {chat_id} (attempt {attempt + 1}): {e}")
+        time.sleep(min(2 ** attempt, 8))
+
+    print(f"Giving up on chat ID {chat_id} after {TELEGRAM_MAX_RETRIES + 1} attempts")
+    metrics.TELEGRAM_SENDS.inc(result='failed')
+    return False
+
+def send_telegram_notification(event_url, label='Festival Passes', event_name=None, event_id=None, collections=(),
+                               detected_at=None, price=None, sales=(), exclude=()):
+    """Send Telegram notification to registered chat IDs when resale tickets are found.
 
-def send_telegram_notification(event_url):
-    """Send Telegram notification to all registered chat IDs when resale tickets are found"""
+    With ``event_id`` only subscribers without filters or with a filter
+    matching that event, one of ``collections`` and one of ``sales`` are
+    messaged. Messages fan out over a thread pool
+    sharing one pooled connection, paced by a global token bucket and a
+    per-chat interval. Returns fan-out latency stats in seconds (empty when
+    nothing was sent). ``detected_at`` (a ``time.monotonic()`` value) is used
+    for the detect-to-notify latency metric; ``price`` (the lowest listed
+    price) is included in the message when known. Chats in ``exclude`` (those
+    an earlier attempt reached) are skipped, and the chats messaged are
+    returned under ``delivered``.
+    """
     
     # Get bot token from environment
     bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
     if not bot_token:
         print("Telegram bot token not configured")
-        return
+        return {}
     
-    # Load chat IDs from file
-    chat_id_list = load_chat_ids()
+    # Load the chat IDs that want this event
+    exclude = {str(chat_id) for chat_id in exclude}
+    chat_id_list = [chat_id for chat_id in get_subscriber_store().subscribers_for(event_id, collections, sales)
+                    if chat_id and str(chat_id) not in exclude]
     
     if not chat_id_list:
         print("No registered chat IDs found")
-        return
+        return {}
     
-    message_text = f"🎟️ *FESTIVAL PASSES RESALE AVAILABLE!*\n\nCheck now: {event_url}\n\nHurry - they go fast!"
+    heading = f"{label.upper()} RESALE AVAILABLE!"
+    if event_name:
+        heading = f"{event_name}: {heading}"
+    price_line = f"From ${price:,.2f}\n\n" if price is not None else ""
+    message_text = (f"🎟️ {markdown_bold(heading)}\n\n{price_line}Check now: {escape_markdown(event_url)}"
+                    "\n\nHurry - they go fast!")
     
+    started = time.monotonic()
+
+    def deliver(chat_id):
+        wait_for_chat_slot(chat_id)
+        ok = send_telegram_message(bot_token, chat_id, message_text)
+        delivered = time.monotonic()
+        if ok and detected_at is not None:
+            metrics.DETECT_TO_NOTIFY_SECONDS.observe(delivered - detected_at, channel='telegram')
+        return chat_id, ok, delivered - started
+
     try:
-        # Send message to each registered chat ID
-        for chat_id in chat_id_list:
-            if chat_id:  # Skip empty strings
-                try:
-                    send_telegram_message(bot_token, chat_id, message_text)
-                        
-                except Exception as e:
-                    print(f"Failed to send Telegram message to {chat_id}: {e}")
-        
+        workers = max(1, min(TELEGRAM_FANOUT_WORKERS, len(chat_id_list)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='telegram-fanout') as pool:
+            results = list(pool.map(deliver, chat_id_list))
     except Exception as e:
-        print(f"Failed to send Telegram messages: {e}")
\ No newline at end of file
+        print(f"Failed to send Telegram messages: {e}")
+        return {'sent': 0, 'failed': len(chat_id_list), 'delivered': []}
+    metrics.TELEGRAM_FANOUT_SECONDS.observe(time.monotonic() - started)
+
+    latencies = [elapsed for _, ok, elapsed in results if ok]
+    stats = {'sent': len(latencies), 'failed': len(results) - len(latencies),
+             'delivered': [chat_id for chat_id, ok, _ in results if ok]}
+    if latencies:
+        stats.update({
+            'p50': percentile(latencies, 50),
+            'p90': percentile(latencies, 90),
+            'p99': percentile(latencies, 99),
+            'max': max(latencies),
+        })
+        print(
+            f"Telegram fan-out: {stats['sent']} sent, {stats['failed']} failed; "
+            f"latency p50={stats['p50']:.2f}s p90={stats['p90']:.2f}s p99={stats['p99']:.2f}s max={stats['max']:.2f}s"
+        )
+    else:
+        print(f"Telegram fan-out: all {stats['failed']} deliveries failed")
+    return stats
@@ -0,0 +1,116 @@
+import os
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+TIXR_BASE_URL = os.getenv('TIXR_BASE_URL', 'https://www.tixr.com').rstrip('/')
+DEFAULT_EVENT_QUERY = "col=&a=L&filter=55:NA|56:NA&sort=RECOMMENDED"
+
+@dataclass
+class WatchEntry:
+    """One watched Tixr event and the collections or sale ids to alert on"""
+    event_id: int
+    name: str = ''
+    event_path: str = ''
+    event_query: str = DEFAULT_EVENT_QUERY
+    collections: List[str] = field(default_factory=list)
+    sale_ids: Set[int] = field(default_factory=set)
+
+    @property
+    def api_url(self) -> str:
+        return f"{TIXR_BASE_URL}/api/events/{self.event_id}"
+
+    @property
+    def page_url(self) -> str:
+        path = self.event_path or f"/events/{self.event_id}"
+        return f"{TIXR_BASE_URL}{path}?{self.event_query}" if self.event_query else f"{TIXR_BASE_URL}{path}"
+
+    @property
+    def label(self) -> str:
+        """Human readable name of what is being watched, used in logs and alerts"""
+        if self.collections:
+            return ', '.join(self.collections)
+        return 'Watched Sales'
+
+    @property
+    def cache_key(self) -> tuple:
+        """Hashable identity of this entry, used to key per-entry fetch caches"""
+        return (self.event_id, tuple(self.collections), tuple(sorted(self.sale_ids)))
+
+    @property
+    def display_name(self) -> str:
+        return self.name or f"event {self.event_id}"
+
+    @classmethod
+    def from_dict(cls, raw: dict) -> 'WatchEntry':
+        if 'event_id' not in raw:
+            raise ValueError(f"Watchlist entry is missing 'event_id': {raw}")
+        collections = raw.get('collections') or []
+        if isinstance(collections, str):
+            collections = [collections]
+        entry = cls(
+            event_id=int(raw['event_id']),
+            name=raw.get('name', ''),
+            event_path=raw.get('event_path', ''),
+            event_query=raw.get('event_query', DEFAULT_EVENT_QUERY),
+            collections=list(collections),
+            sale_ids={int(sale_id) for sale_id in raw.get('sale_ids') or []},
+        )
+        if not entry.collections and not entry.sale_ids:
+            raise ValueError(f"Watchlist entry for event {entry.event_id} needs 'collections' or 'sale_ids'")
+        return entry
+
+DEFAULT_WATCH_ENTRY = WatchEntry(
+    event_id=135703,
+    name="Valley of the Seven Stars",
+    event_path="/groups/100x/events/valley-of-the-seven-stars-135703",
+    collections=['Festival Passes'],
+)
+
+def load_watchlist(path: Optional[str] = None) -> List[WatchEntry]:
+    """Load watch entries from JSON, falling back to the built-in default event.
+
+    The file holds ``{"events": [{"event_id": ..., "collections": [...],
+    "sale_ids": [...]}, ...]}``; its path comes from ``WATCHLIST_FILE``.
+    """
+    path = path or os.getenv('WATCHLIST_FILE', 'watchlist.json')
+    try:
+        with open(path, 'r') as f:
+            raw = json.load(f)
+    except FileNotFoundError:
+        logger.info(f"No watchlist at {path}; watching the default event only")
+        return [DEFAULT_WATCH_ENTRY]
+
+    raw_entries = raw.get('events', []) if isinstance(raw, dict) else raw
+    entries = [WatchEntry.from_dict(item) for item in raw_entries]
+    if not entries:
+        logger.warning(f"Watchlist {path} is empty; watching the default event only")
+        return [DEFAULT_WATCH_ENTRY]
+    logger.info(f"Loaded {len(entries)} watchlist entries from {path}")
+    return entries
+
+async def run_watchlist(entries, check_entry, max_workers: int = None):
+    """Evaluate every watch entry concurrently on a bounded worker pool.
+
+    ``check_entry(entry)`` is a blocking callable returning ``(status_code, found)``;
+    it runs on a thread so slow events never hold up the others. Request
+    pacing is left to ``check_entry`` (the monitor's shared Tixr rate
+    limiter). Returns a list of ``(entry, status_code, found)`` in watchlist order.
+    """
+    import asyncio  # Only needed for multi-event watchlists; keeps one-shot cold starts lighter
+    max_workers = max_workers or int(os.getenv('WATCHLIST_CONCURRENCY', '4'))
+    semaphore = asyncio.Semaphore(max(1, max_workers))
+
+    async def worker(entry):
+        async with semaphore:
+            try:
+                status_code, found = await asyncio.to_thread(check_entry, entry)
+            except Exception as e:
+                logger.error(f"Check failed for {entry.display_name}: {e}")
+                status_code, found = None, False
+            return entry, status_code, found
+
+    return await asyncio.gather(*(worker(entry) for entry in entries))